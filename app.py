@@ -1,21 +1,56 @@
 import base64
+import copy
+import functools
+import hashlib
 import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import diskcache
+import dill
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
+import plotly.io as pio
 import dash
 import dash_bootstrap_components as dbc
 import pandas as pd
+import pyarrow as pa
 import pytank as pt
 from pytank import Fetkovich, CarterTracy
+from pytank.functions.material_balance import (
+    calculated_pressure_fetkovich,
+    calculate_pressure_with_carter_tracy,
+    underground_withdrawal,
+)
+from pytank.functions.pvt_correlations import Bo_bw, comp_bw_nogas
+from pytank.functions.utilities import (
+    add_date_index_validation, interp_from_dates, normalize_date_freq)
 from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output, State
-from scipy.stats import stats
+from dash.dash_table.Format import Format, Scheme
+from dash.dependencies import Input, Output, State, MATCH
+from flask import Response, jsonify, request
+from pandas.api.types import union_categoricals
+from pandera import DataFrameSchema
+from pandera.errors import SchemaError
+from pyarrow import compute, feather, ipc
+from pydantic import PrivateAttr
+from scipy import optimize
+from scipy.stats import stats, t as student_t, truncnorm
 
 # Initialize the Dash app
 app = dash.Dash(__name__,
                 external_stylesheets=[dbc.themes.BOOTSTRAP],
-                suppress_callback_exceptions=True)
+                suppress_callback_exceptions=True,
+                compress=True)
 
 app.index_string = '''
 <!DOCTYPE html>
@@ -37,7 +72,7 @@ app.index_string = '''
 '''
 
 # app
-app.layout = html.Div([
+main_layout = html.Div([
     html.Div([
         html.Div([
             html.H1("Pytank View", style={
@@ -88,6 +123,45 @@ app.layout = html.Div([
                         'color': 'black',
                     }),
 
+                    html.Div([
+                        html.Label("Project"),
+                        dcc.Upload(
+                            id='open-project',
+                            children=html.Div([html.A('Open Project')]),
+                            style={
+                                'width': '100%',
+                                'height': '60px',
+                                'lineHeight': '60px',
+                                'borderWidth': '1px',
+                                'borderStyle': 'dashed',
+                                'borderRadius': '5px',
+                                'textAlign': 'center',
+                                'margin': '10px'
+                            },
+                            multiple=False
+                        ),
+                        html.Button(
+                            'Save Project',
+                            id='save-project-button',
+                            n_clicks=0,
+                            style={
+                                'width': '100%',
+                                'marginTop': '10px',
+                                'backgroundColor': '#ff551b',
+                                'color': 'white',
+                                'padding': '10px'
+                            }
+                        ),
+                        dcc.Download(id='project-download'),
+                        dcc.Loading(html.Div(id='project-status', style={
+                            'marginTop': '10px',
+                            'padding': '10px',
+                            'backgroundColor': '#d4edda',
+                            'border': '1px solid #c3e6cb',
+                            'borderRadius': '5px'
+                        }), type='dot'),
+                    ], style={'marginBottom': '20px'}),
+
                     html.Div([
                         html.Label("Upload Production CSV"),
                         dcc.Upload(
@@ -105,19 +179,85 @@ app.layout = html.Div([
                             },
                             multiple=False
                         ),
-                        html.Div(id='prod-upload-status', style={
+                        dcc.Loading(html.Div(
+                            'Upload production data to start.',
+                            id='prod-upload-status',
+                            style={
+                                'marginTop': '10px',
+                                'padding': '10px',
+                                'backgroundColor': '#d4edda',
+                                'border': '1px solid #c3e6cb',
+                                'borderRadius': '5px'
+                            }
+                        ), type='dot'),
+                        html.Progress(id='prod-upload-progress',
+                                      style={'display': 'none'}),
+                        dcc.Store(id='prod-data-key'),
+                    ], style={'marginBottom': '20px'}),
+
+                    html.Div([
+                        html.Label("Upload Pressure CSV"),
+                        dcc.Upload(
+                            id='upload-press-data',
+                            children=html.Div([html.A('Select Files')]),
+                            style={
+                                'width': '100%',
+                                'height': '60px',
+                                'lineHeight': '60px',
+                                'borderWidth': '1px',
+                                'borderStyle': 'dashed',
+                                'borderRadius': '5px',
+                                'textAlign': 'center',
+                                'margin': '10px'
+                            },
+                            multiple=False
+                        ),
+                        dcc.Loading(html.Div(
+                            'Upload pressure data to start.',
+                            id='press-upload-status',
+                            style={
+                                'marginTop': '10px',
+                                'padding': '10px',
+                                'backgroundColor': '#d4edda',
+                                'border': '1px solid #c3e6cb',
+                                'borderRadius': '5px'
+                            }
+                        ), type='dot'),
+                        html.Progress(id='press-upload-progress',
+                                      style={'display': 'none'}),
+                        dcc.Store(id='press-data-key'),
+                    ], style={'marginBottom': '20px'}),
+
+                    html.Div([
+                        html.Label("Append Production CSV"),
+                        dcc.Upload(
+                            id='append-prod-data',
+                            children=html.Div([html.A('Select Files')]),
+                            style={
+                                'width': '100%',
+                                'height': '60px',
+                                'lineHeight': '60px',
+                                'borderWidth': '1px',
+                                'borderStyle': 'dashed',
+                                'borderRadius': '5px',
+                                'textAlign': 'center',
+                                'margin': '10px'
+                            },
+                            multiple=False
+                        ),
+                        dcc.Loading(html.Div(id='prod-append-status', style={
                             'marginTop': '10px',
                             'padding': '10px',
                             'backgroundColor': '#d4edda',
                             'border': '1px solid #c3e6cb',
                             'borderRadius': '5px'
-                        }),
+                        }), type='dot'),
                     ], style={'marginBottom': '20px'}),
 
                     html.Div([
-                        html.Label("Upload Pressure CSV"),
+                        html.Label("Append Pressure CSV"),
                         dcc.Upload(
-                            id='upload-press-data',
+                            id='append-press-data',
                             children=html.Div([html.A('Select Files')]),
                             style={
                                 'width': '100%',
@@ -131,13 +271,13 @@ app.layout = html.Div([
                             },
                             multiple=False
                         ),
-                        html.Div(id='press-upload-status', style={
+                        dcc.Loading(html.Div(id='press-append-status', style={
                             'marginTop': '10px',
                             'padding': '10px',
                             'backgroundColor': '#d4edda',
                             'border': '1px solid #c3e6cb',
                             'borderRadius': '5px'
-                        }),
+                        }), type='dot'),
                     ], style={'marginBottom': '20px'}),
 
                     html.Div([
@@ -215,6 +355,14 @@ app.layout = html.Div([
                                 'color': 'white',
                                 'padding': '10px'
                             }
+                        ),
+                        html.Progress(id='well-progress',
+                                      style={'display': 'none'}),
+                        html.Button(
+                            'Cancel',
+                            id='well-cancel-button',
+                            n_clicks=0,
+                            style={'display': 'none'}
                         )
                     ], style={'textAlign': 'center', 'marginTop': '10px',
                               'marginBottom': '80px'}),
@@ -387,7 +535,8 @@ app.layout = html.Div([
                             },
                             multiple=False
                         ),
-                        html.Div(
+                        dcc.Loading(html.Div(
+                            'Upload fluid models data to start.',
                             id='fluid-upload-status',
                             style={
                                 'marginTop': '10px',
@@ -396,7 +545,10 @@ app.layout = html.Div([
                                 'border': '1px solid #c3e6cb',
                                 'borderRadius': '5px'
                             }
-                        ),
+                        ), type='dot'),
+                        html.Progress(id='fluid-upload-progress',
+                                      style={'display': 'none'}),
+                        dcc.Store(id='fluid-data-key'),
                         html.Div([
                             html.Label("Oil Temperature [°F]"),
                             dcc.Input(
@@ -1184,12 +1336,80 @@ app.layout = html.Div([
 
                                 ),
 
+                                html.Label('Regression Method'),
+                                dcc.Dropdown(
+                                    id='regression-method',
+                                    options=[
+                                        {'label': 'Least Squares',
+                                         'value': 'Least Squares'},
+                                        {'label': 'Theil-Sen',
+                                         'value': 'Theil-Sen'},
+                                        {'label': 'Huber', 'value': 'Huber'},
+                                        {'label': 'RANSAC', 'value': 'RANSAC'},
+                                    ],
+                                    value='Least Squares',
+                                    clearable=False,
+                                    style={'width': '90%'}
+                                ),
+                                html.Div(style={'height': '10px'}),
+
+                                html.Label('Confidence Intervals'),
+                                dcc.Dropdown(
+                                    id='regression-intervals',
+                                    options=[
+                                        {'label': 'None', 'value': 'None'},
+                                        {'label': 'Bootstrap',
+                                         'value': 'Bootstrap'},
+                                        {'label': 'Jackknife',
+                                         'value': 'Jackknife'},
+                                    ],
+                                    placeholder='Select option',
+                                    style={'width': '90%'}
+                                ),
+
+                                html.Div(
+                                    id='aditional-intervals', children=[
+                                        html.Div(id='intervals-input',
+                                                 children=[
+                                                     html.Label('Resamples',
+                                                                style={
+                                                                    'width':
+                                                                        '100%',
+                                                                }),
+                                                     dcc.Input(id='resamples',
+                                                               type='number',
+                                                               value=10000,
+                                                               min=1,
+                                                               style=
+                                                               {'width':
+                                                                    '60%'}),
+                                                     html.Label('Confidence '
+                                                                '[%]',
+                                                                style={
+                                                                    'width':
+                                                                        '100%',
+                                                                }),
+                                                     dcc.Input(id='confidence',
+                                                               type='number',
+                                                               value=90,
+                                                               min=1,
+                                                               max=99,
+                                                               style=
+                                                               {'width':
+                                                                    '60%'}),
+                                                 ], style={'display': 'none'}),
+                                        html.Div(style={'height': '10px'}),
+                                    ]
+                                ),
+
                                 html.Label("Analytic Method"),
                                 dcc.Dropdown(
                                     id='analytic-method',
                                     options=[
                                         {'label': 'Yes', 'value': 'Yes'},
                                         {'label': 'No', 'value': 'No'},
+                                        {'label': 'Optimize',
+                                         'value': 'Optimize'},
                                     ],
                                     placeholder='Select option',
                                     style={'width': '90%'}
@@ -1247,6 +1467,16 @@ app.layout = html.Div([
                                     placeholder='Select graphic',
                                     style={'width': '90%'}
                                 ),
+                                html.Label("Wells by Production"),
+                                dcc.Input(
+                                    id='top-wells',
+                                    type='number',
+                                    min=1,
+                                    step=1,
+                                    debounce=True,
+                                    placeholder='All wells',
+                                    style={'width': '60%'}
+                                ),
                                 html.Div([
                                     html.Button(
                                         'Submit',
@@ -1259,6 +1489,14 @@ app.layout = html.Div([
                                             'color': 'white',
                                             'padding': '10px'
                                         }
+                                    ),
+                                    html.Progress(id='analysis-progress',
+                                                  style={'display': 'none'}),
+                                    html.Button(
+                                        'Cancel',
+                                        id='analysis-cancel-button',
+                                        n_clicks=0,
+                                        style={'display': 'none'}
                                     )
                                 ], style={'textAlign': 'center',
                                           'marginTop': '10px',
@@ -1404,89 +1642,1586 @@ app.layout = html.Div([
                         'overflow': 'hidden'
                     })
                 ]),
-            ])
-        ])
-    ], style={
-        'height': '100vh',
-        'overflow': 'auto'
-    }),
-], style={
-    'height': '100vh',
-    'overflow': 'hidden'
-})
-
-"------------------------ Callback Files CSVs --------------------------------"
-
-
-def parse_data(contents, filename):
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    try:
-        if 'csv' in filename:
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-        else:
-            return None
-    except Exception as e:
-        return None
-    return df
-
-
-@app.callback(
-    [Output('prod-upload-status',
-            'children'),
-     Output('press-upload-status', 'children'),
-     Output('fluid-upload-status', 'children')],
-    [Input('upload-prod-data', 'contents'),
-     Input('upload-press-data', 'contents'),
-     Input('upload-fluid-data', 'contents')],
-    [State('upload-prod-data', 'filename'),
-     State('upload-press-data', 'filename'),
-     State('upload-fluid-data', 'filename')]
-)
-def update_upload_status(upload_prod, upload_press, upload_fluid,
-                         filename_prod, filename_press, filename_fluid):
-    # Initial statuses
-    prod_status = 'Upload production data to start.'
-    press_status = 'Upload pressure data to start.'
-    fluid_status = 'Upload fluid models data to start.'
-
-    # Process production data
-    if upload_prod:
-        df_prod = parse_data(upload_prod, filename_prod)
-        if df_prod is not None:
-            prod_status = f'{filename_prod} uploaded successfully!'
-        else:
-            prod_status = 'There was an error processing the production data.'
-
-    # Process pressure data
-    if upload_press:
-        df_press = parse_data(upload_press, filename_press)
-        if df_press is not None:
-            press_status = f'{filename_press} uploaded successfully!'
-        else:
-            press_status = 'There was an error processing the pressure data.'
+                # Batch Module
+                html.Div([
+                    html.Div([
+                        html.H1("Batch Module", style={
+                            'textAlign': 'center',
+                            'marginTop': '10px',
+                            'backgroundColor': '#F7FF4F',
+                            'padding': '10px',
+                            'borderRadius': '5px'
+                        }),
+                        html.Div([
+                            html.Div([
+                                html.H2("Configuration",
+                                        style={
+                                            'textAlign': 'center',
+                                            'marginTop': '0px',
+                                            'fontSize': '30px',
+                                            'width': '100%',
+                                            'padding': '10px',
+                                            'boxSizing': 'border-box',
+                                        }),
+                                html.Label("Upload Tanks CSV"),
+                                dcc.Upload(
+                                    id='upload-batch-data',
+                                    children=html.Div([html.A('Select Files')]),
+                                    style={
+                                        'width': '100%',
+                                        'height': '60px',
+                                        'lineHeight': '60px',
+                                        'borderWidth': '1px',
+                                        'borderStyle': 'dashed',
+                                        'borderRadius': '5px',
+                                        'textAlign': 'center',
+                                        'margin': '10px'
+                                    },
+                                    multiple=False
+                                ),
+                                html.Div(
+                                    'Upload a CSV with one tank per row, or '
+                                    'add the tanks to the table.',
+                                    id='batch-upload-status', style={
+                                    'marginTop': '10px',
+                                    'padding': '10px',
+                                    'backgroundColor': '#d4edda',
+                                    'border': '1px solid #c3e6cb',
+                                    'borderRadius': '5px'
+                                }),
+                                html.Button(
+                                    'Add Tank',
+                                    id='add-batch-tank-button',
+                                    n_clicks=0,
+                                    style={
+                                        'width': '100%',
+                                        'marginTop': '10px',
+                                        'marginBottom': '10px'
+                                    }
+                                ),
+                                html.Label("Analysis frequency"),
+                                dcc.Dropdown(
+                                    id='batch-freq',
+                                    options=[
+                                        {'label': 'Quarterly (3 months)',
+                                         'value': '3M'},
+                                        {'label': 'Biannual (6 months)',
+                                         'value': '6M'},
+                                        {'label': 'Annual (12 months)',
+                                         'value': '12M'},
+                                    ],
+                                    placeholder='Select frequency',
+                                    style={'width': '100%'}
+                                ),
+                                html.Div(style={'height': '10px'}),
 
-    # Process PVT data
-    if upload_fluid:
-        df_fluid = parse_data(upload_fluid, filename_fluid)
-        if df_fluid is not None:
-            fluid_status = f'{filename_fluid} uploaded successfully!'
-        else:
-            fluid_status = ('There was an error processing the '
-                            'fluid models data.')
+                                html.Label("Position Date frequency"),
+                                dcc.Dropdown(
+                                    id='batch-position',
+                                    options=[
+                                        {'label': 'begin', 'value': 'begin'},
+                                        {'label': 'middle', 'value': 'middle'},
+                                        {'label': 'end', 'value': 'end'},
+                                    ],
+                                    placeholder='Position of the month according to frequency',
+                                    style={'width': '100%'}
+                                ),
+                                html.Div(style={'height': '10px'}),
 
-    return prod_status, press_status, fluid_status
+                                html.Label('Pressure adjustment'),
+                                dcc.Dropdown(
+                                    id='batch-smooth',
+                                    options=[
+                                        {'label': 'Yes', 'value': 'Yes'},
+                                        {'label': 'No', 'value': 'no'},
+                                    ],
+                                    placeholder='Adjusted',
+                                    style={'width': '100%'}
+                                ),
+                                html.Label('Degree', style={'width': '100%'}),
+                                dcc.Input(id='batch-k',
+                                          type='number',
+                                          placeholder='Enter degree',
+                                          style={'width': '60%'}),
+                                html.Label('Smoothing factor',
+                                           style={'width': '100%'}),
+                                dcc.Input(id='batch-s',
+                                          type='number',
+                                          placeholder='Enter factor',
+                                          style={'width': '60%'}),
+                                html.Div([
+                                    html.Button(
+                                        'Submit',
+                                        id='batch-submit-button',
+                                        n_clicks=0,
+                                        style={
+                                            'width': '70%',
+                                            'marginTop': '20px',
+                                            'backgroundColor': '#ff551b',
+                                            'color': 'white',
+                                            'padding': '10px'
+                                        }
+                                    ),
+                                    html.Progress(id='batch-progress',
+                                                  style={'display': 'none'}),
+                                    html.Button(
+                                        'Cancel',
+                                        id='batch-cancel-button',
+                                        n_clicks=0,
+                                        style={'display': 'none'}
+                                    )
+                                ], style={'textAlign': 'center',
+                                          'marginTop': '10px',
+                                          'width': '100%',
+                                          'padding': '20px',
+                                          'boxSizing': 'border-box'}),
+                            ], style={
+                                'width': '20%',
+                                'padding': '20px',
+                                'borderRight': '1px solid black',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto',
+                                'backgroundColor': '#E5E5E5'
+                            }),
+
+                            html.Div([
+                                html.H2(
+                                    "Results Area",
+                                    style={
+                                        'textAlign': 'center',
+                                        'marginBottom': '10px',
+                                        'backgroundColor': '#C2C2C2',
+                                        'padding': '7px',
+                                        'marginTop': '-20px'
+                                    }
+                                ),
+                                html.P(
+                                    "Each row of the table is a tank, "
+                                    "analyzed with the wells and fluid "
+                                    "models of the other modules. Write the "
+                                    "wells of a tank separated by commas, or "
+                                    "leave them empty to use the wells of "
+                                    "the Well module. Carter Tracy aquifers "
+                                    "do not use the aquifer radius. The "
+                                    "summary shows the original oil in "
+                                    "place of the Havlena and Odeh "
+                                    "regression of every tank.",
+                                    style={
+                                        'fontSize': '16px',
+                                        'lineHeight': '1.5',
+                                        'textAlign': 'justify',
+                                        'marginBottom': '10px'
+                                    }
+                                ),
+                                dash_table.DataTable(
+                                    id='batch-table',
+                                    columns=[
+                                        {'name': 'Tank', 'id': 'name'},
+                                        {'name': 'Wells', 'id': 'wells'},
+                                        {'name': 'Initial Pressure [PSI]',
+                                         'id': 'pi', 'type': 'numeric'},
+                                        {'name': 'Initial Water Saturation',
+                                         'id': 'swo', 'type': 'numeric'},
+                                        {'name': 'Water Compressibility',
+                                         'id': 'cw', 'type': 'numeric'},
+                                        {'name': 'Formation Compressibility',
+                                         'id': 'cf', 'type': 'numeric'},
+                                        {'name': 'Aquifer Model',
+                                         'id': 'aquifer',
+                                         'presentation': 'dropdown'},
+                                        {'name': 'Aquifer Radius [ft]',
+                                         'id': 'aq_radius',
+                                         'type': 'numeric'},
+                                        {'name': 'Reservoir Radius [ft]',
+                                         'id': 'res_radius',
+                                         'type': 'numeric'},
+                                        {'name': 'Aquifer Thickness [ft]',
+                                         'id': 'aq_thickness',
+                                         'type': 'numeric'},
+                                        {'name': 'Aquifer Porosity [dec]',
+                                         'id': 'aq_por', 'type': 'numeric'},
+                                        {'name': 'Total Compressibility',
+                                         'id': 'ct', 'type': 'numeric'},
+                                        {'name': 'Theta [sexagesimal]',
+                                         'id': 'theta', 'type': 'numeric'},
+                                        {'name': 'Permeability [darcy]',
+                                         'id': 'k', 'type': 'numeric'},
+                                        {'name': 'Water Viscosity [cp]',
+                                         'id': 'water_visc',
+                                         'type': 'numeric'},
+                                    ],
+                                    data=[],
+                                    editable=True,
+                                    row_deletable=True,
+                                    dropdown={
+                                        'aquifer': {
+                                            'options': [
+                                                {'label': 'None',
+                                                 'value': 'None'},
+                                                {'label': 'Fetkovich',
+                                                 'value': 'Fetkovich'},
+                                                {'label': 'Carter Tracy',
+                                                 'value': 'Carter Tracy'},
+                                            ],
+                                            'clearable': False
+                                        }
+                                    },
+                                    style_table={'overflowX': 'auto'},
+                                    style_header={
+                                        'backgroundColor': 'rgb(230, 230, 230)',
+                                        'fontWeight': 'bold',
+                                        'textAlign': 'center'
+                                    },
+                                    style_cell={
+                                        'textAlign': 'center',
+                                        'whiteSpace': 'normal',
+                                        'height': 'auto',
+                                        'minWidth': '100px'
+                                    },
+                                ),
+                                html.Div(
+                                    id='batch-info-content',
+                                    style={
+                                        'overflowY': 'auto',
+                                        'marginTop': '20px'
+                                    }
+                                )
+                            ], id='batch-results', style={
+                                'width': '80%',
+                                'padding': '20px',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto'
+                            }),
+                        ], style={
+                            'display': 'flex',
+                            'flexDirection': 'row',
+                            'height': '100Vh',
+                            'marginBottom': '20px'
+                        })
+                    ], style={
+                        'height': '100vh',
+                        'overflow': 'hidden'
+                    })
+                ]),
+                # Sensitivity Module
+                html.Div([
+                    html.Div([
+                        html.H1("Sensitivity Module", style={
+                            'textAlign': 'center',
+                            'marginTop': '10px',
+                            'backgroundColor': '#F7FF4F',
+                            'padding': '10px',
+                            'borderRadius': '5px'
+                        }),
+                        html.Div([
+                            html.Div([
+                                html.H2("Configuration",
+                                        style={
+                                            'textAlign': 'center',
+                                            'marginTop': '0px',
+                                            'fontSize': '30px',
+                                            'width': '100%',
+                                            'padding': '10px',
+                                            'boxSizing': 'border-box',
+                                        }),
+                                html.Label("Aquifer Model"),
+                                dcc.Dropdown(
+                                    id='sweep-aquifer-model',
+                                    options=[
+                                        {'label': 'Fetkovich',
+                                         'value': 'Fetkovich'},
+                                        {'label': 'Carter Tracy',
+                                         'value': 'Carter Tracy'},
+                                    ],
+                                    placeholder='Select Aquifer Model',
+                                    style={'width': '100%'}
+                                ),
+                                html.Div([
+                                    html.Button(
+                                        'Submit',
+                                        id='sweep-submit-button',
+                                        n_clicks=0,
+                                        style={
+                                            'width': '70%',
+                                            'marginTop': '20px',
+                                            'backgroundColor': '#ff551b',
+                                            'color': 'white',
+                                            'padding': '10px'
+                                        }
+                                    ),
+                                    html.Progress(id='sweep-progress',
+                                                  style={'display': 'none'}),
+                                    html.Button(
+                                        'Cancel',
+                                        id='sweep-cancel-button',
+                                        n_clicks=0,
+                                        style={'display': 'none'}
+                                    )
+                                ], style={'textAlign': 'center',
+                                          'marginTop': '10px',
+                                          'width': '100%',
+                                          'padding': '20px',
+                                          'boxSizing': 'border-box'}),
+                            ], style={
+                                'width': '20%',
+                                'padding': '20px',
+                                'borderRight': '1px solid black',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto',
+                                'backgroundColor': '#E5E5E5'
+                            }),
+
+                            html.Div([
+                                html.H2(
+                                    "Results Area",
+                                    style={
+                                        'textAlign': 'center',
+                                        'marginBottom': '10px',
+                                        'backgroundColor': '#C2C2C2',
+                                        'padding': '7px',
+                                        'marginTop': '-20px'
+                                    }
+                                ),
+                                html.P(
+                                    "The sweep evaluates every combination "
+                                    "of the aquifer parameters over the "
+                                    "material balance of the last analysis "
+                                    "of the Analysis module. Each parameter "
+                                    "takes Steps values from Min to Max, "
+                                    "with one step it keeps the Min value. "
+                                    "The combinations are ranked by the R2 "
+                                    "of the Havlena and Odeh regression, the "
+                                    "best aquifer gives the straightest "
+                                    "line.",
+                                    style={
+                                        'fontSize': '16px',
+                                        'lineHeight': '1.5',
+                                        'textAlign': 'justify',
+                                        'marginBottom': '10px'
+                                    }
+                                ),
+                                dash_table.DataTable(
+                                    id='sweep-table',
+                                    columns=[
+                                        {'name': 'Parameter', 'id': 'label',
+                                         'editable': False},
+                                        {'name': 'Min', 'id': 'min',
+                                         'type': 'numeric'},
+                                        {'name': 'Max', 'id': 'max',
+                                         'type': 'numeric'},
+                                        {'name': 'Steps', 'id': 'steps',
+                                         'type': 'numeric'},
+                                    ],
+                                    data=[],
+                                    editable=True,
+                                    style_table={'overflowX': 'auto'},
+                                    style_header={
+                                        'backgroundColor': 'rgb(230, 230, 230)',
+                                        'fontWeight': 'bold',
+                                        'textAlign': 'center'
+                                    },
+                                    style_cell={
+                                        'textAlign': 'center',
+                                        'whiteSpace': 'normal',
+                                        'height': 'auto',
+                                    },
+                                ),
+                                html.Div(
+                                    id='sweep-info-content',
+                                    style={
+                                        'overflowY': 'auto',
+                                        'marginTop': '20px'
+                                    }
+                                )
+                            ], id='sweep-results', style={
+                                'width': '80%',
+                                'padding': '20px',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto'
+                            }),
+                        ], style={
+                            'display': 'flex',
+                            'flexDirection': 'row',
+                            'height': '100Vh',
+                            'marginBottom': '20px'
+                        })
+                    ], style={
+                        'height': '100vh',
+                        'overflow': 'hidden'
+                    })
+                ]),
+                # Monte Carlo Module
+                html.Div([
+                    html.Div([
+                        html.H1("Monte Carlo Module", style={
+                            'textAlign': 'center',
+                            'marginTop': '10px',
+                            'backgroundColor': '#F7FF4F',
+                            'padding': '10px',
+                            'borderRadius': '5px'
+                        }),
+                        html.Div([
+                            html.Div([
+                                html.H2("Configuration",
+                                        style={
+                                            'textAlign': 'center',
+                                            'marginTop': '0px',
+                                            'fontSize': '30px',
+                                            'width': '100%',
+                                            'padding': '10px',
+                                            'boxSizing': 'border-box',
+                                        }),
+                                html.Label('Realizations',
+                                           style={'width': '100%'}),
+                                dcc.Input(id='mc-runs',
+                                          type='number',
+                                          value=1000,
+                                          min=1,
+                                          placeholder='Enter realizations',
+                                          style={'width': '60%'}),
+                                html.Label('Seed', style={'width': '100%'}),
+                                dcc.Input(id='mc-seed',
+                                          type='number',
+                                          placeholder='Enter seed',
+                                          style={'width': '60%'}),
+                                html.Div([
+                                    html.Button(
+                                        'Submit',
+                                        id='mc-submit-button',
+                                        n_clicks=0,
+                                        style={
+                                            'width': '70%',
+                                            'marginTop': '20px',
+                                            'backgroundColor': '#ff551b',
+                                            'color': 'white',
+                                            'padding': '10px'
+                                        }
+                                    ),
+                                    html.Progress(id='mc-progress',
+                                                  style={'display': 'none'}),
+                                    html.Button(
+                                        'Cancel',
+                                        id='mc-cancel-button',
+                                        n_clicks=0,
+                                        style={'display': 'none'}
+                                    )
+                                ], style={'textAlign': 'center',
+                                          'marginTop': '10px',
+                                          'width': '100%',
+                                          'padding': '20px',
+                                          'boxSizing': 'border-box'}),
+                            ], style={
+                                'width': '20%',
+                                'padding': '20px',
+                                'borderRight': '1px solid black',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto',
+                                'backgroundColor': '#E5E5E5'
+                            }),
+
+                            html.Div([
+                                html.H2(
+                                    "Results Area",
+                                    style={
+                                        'textAlign': 'center',
+                                        'marginBottom': '10px',
+                                        'backgroundColor': '#C2C2C2',
+                                        'padding': '7px',
+                                        'marginTop': '-20px'
+                                    }
+                                ),
+                                html.P(
+                                    "Each realization samples the "
+                                    "parameters of the tank and its aquifer "
+                                    "from their distributions and computes "
+                                    "the original oil in place of the "
+                                    "Havlena and Odeh regression over the "
+                                    "material balance of the last analysis "
+                                    "of the Analysis module. Uniform uses "
+                                    "Min and Max, Triangular also uses Most "
+                                    "Likely, and Normal uses Most Likely as "
+                                    "the mean and Std. Dev., truncated to "
+                                    "Min and Max when they are given. P90 "
+                                    "is the value exceeded by 90% of the "
+                                    "realizations.",
+                                    style={
+                                        'fontSize': '16px',
+                                        'lineHeight': '1.5',
+                                        'textAlign': 'justify',
+                                        'marginBottom': '10px'
+                                    }
+                                ),
+                                dash_table.DataTable(
+                                    id='mc-table',
+                                    columns=[
+                                        {'name': 'Parameter', 'id': 'label',
+                                         'editable': False},
+                                        {'name': 'Distribution',
+                                         'id': 'distribution',
+                                         'presentation': 'dropdown'},
+                                        {'name': 'Min', 'id': 'min',
+                                         'type': 'numeric'},
+                                        {'name': 'Most Likely', 'id': 'mode',
+                                         'type': 'numeric'},
+                                        {'name': 'Max', 'id': 'max',
+                                         'type': 'numeric'},
+                                        {'name': 'Std. Dev.', 'id': 'std',
+                                         'type': 'numeric'},
+                                    ],
+                                    data=[],
+                                    editable=True,
+                                    dropdown={
+                                        'distribution': {
+                                            'options': [
+                                                {'label': 'Fixed',
+                                                 'value': 'Fixed'},
+                                                {'label': 'Uniform',
+                                                 'value': 'Uniform'},
+                                                {'label': 'Triangular',
+                                                 'value': 'Triangular'},
+                                                {'label': 'Normal',
+                                                 'value': 'Normal'},
+                                            ],
+                                            'clearable': False
+                                        }
+                                    },
+                                    style_table={'overflowX': 'auto'},
+                                    style_header={
+                                        'backgroundColor': 'rgb(230, 230, 230)',
+                                        'fontWeight': 'bold',
+                                        'textAlign': 'center'
+                                    },
+                                    style_cell={
+                                        'textAlign': 'center',
+                                        'whiteSpace': 'normal',
+                                        'height': 'auto',
+                                    },
+                                ),
+                                html.Div(
+                                    id='mc-info-content',
+                                    style={
+                                        'overflowY': 'auto',
+                                        'marginTop': '20px'
+                                    }
+                                )
+                            ], id='mc-results', style={
+                                'width': '80%',
+                                'padding': '20px',
+                                'boxSizing': 'border-box',
+                                'height': '100vh',
+                                'overflowY': 'auto'
+                            }),
+                        ], style={
+                            'display': 'flex',
+                            'flexDirection': 'row',
+                            'height': '100Vh',
+                            'marginBottom': '20px'
+                        })
+                    ], style={
+                        'height': '100vh',
+                        'overflow': 'hidden'
+                    })
+                ]),
+            ])
+        ])
+    ], style={
+        'height': '100vh',
+        'overflow': 'auto'
+    }),
+], style={
+    'height': '100vh',
+    'overflow': 'hidden'
+})
+
+
+def serve_layout():
+    # Every page load gets its own session id to key the server-side store
+    return html.Div([
+        dcc.Store(id='session-id', data=str(uuid.uuid4())),
+        main_layout
+    ])
+
+
+app.layout = serve_layout
+
+"------------------------------ Figure Template ------------------------------"
+# Style shared by the figures, registered as the default template. It is a
+# compact copy of plotly_white with the axes of the app, so a figure does not
+# validate and send the whole plotly_white template and only sets its titles
+# and traces.
+AXIS_STYLE = dict(
+    title=dict(font=dict(size=18, family='Arial, sans-serif')),
+    tickfont=dict(size=14, family='Arial, sans-serif'),
+    showgrid=True,
+    gridcolor='#D1D1D1',
+    gridwidth=1,
+    griddash='dash',
+    linecolor='black',
+    mirror=True
+)
+
+
+def pytank_template():
+    white = pio.templates['plotly_white']
+    template = go.layout.Template(
+        layout=white.layout,
+        # Only the trace types drawn by the app
+        data={trace_type: white.data[trace_type] for trace_type in
+              ('scatter', 'scattergl', 'bar', 'histogram', 'heatmap')}
+    )
+    for key in ('coloraxis', 'colorscale', 'geo', 'mapbox', 'polar',
+                'scene', 'ternary'):
+        template.layout[key] = None
+    template.layout.xaxis.update(AXIS_STYLE)
+    template.layout.yaxis.update(AXIS_STYLE)
+    return template
+
+
+pio.templates['pytank'] = pytank_template()
+pio.templates.default = 'pytank'
+
+
+def header_annotation(text):
+    return dict(
+        text=text,
+        xref="paper",
+        yref="paper",
+        x=0.5,
+        xanchor="center",
+        y=1.15,
+        yanchor="top",
+        showarrow=False,
+        font=dict(size=22)
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def skeleton_layout(title, x_title, y_title, header, x_type):
+    # Validated once, every figure gets a deep copy
+    return go.Layout(
+        title=title,
+        xaxis=dict(title=x_title, type=x_type),
+        yaxis=dict(title=y_title),
+        annotations=[header_annotation(header)] if header else []
+    ).to_plotly_json()
+
+
+def figure_skeleton(title, x_title, y_title, header=None, x_type='-'):
+    return go.Figure(layout=copy.deepcopy(
+        skeleton_layout(title, x_title, y_title, header, x_type)))
+
+
+"------------------------------ Figure Encoding ------------------------------"
+# Callback outputs are serialized with orjson, and the numeric arrays of the
+# figures are sent as base64 typed arrays, which plotly.js decodes without
+# parsing the text of every number. The responses are compressed with brotli
+# or gzip by flask-compress (compress=True in the app).
+pio.json.config.default_engine = 'orjson'
+
+# numpy dtypes that plotly.js reads as typed arrays, other numbers go as f8
+TYPED_ARRAY_DTYPES = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+
+
+def typed_array(values):
+    values = np.asarray(values)
+    if values.dtype.name not in TYPED_ARRAY_DTYPES:
+        values = values.astype(float)
+    values = np.ascontiguousarray(values,
+                                  dtype=values.dtype.newbyteorder('<'))
+    array = {'dtype': TYPED_ARRAY_DTYPES[values.dtype.name],
+             'bdata': base64.b64encode(values.data).decode()}
+    if values.ndim > 1:
+        array['shape'] = ','.join(map(str, values.shape))
+    return array
+
+
+def encode_arrays(value):
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'iuf':
+        return typed_array(value)
+    if isinstance(value, dict):
+        return {key: encode_arrays(item) for key, item in value.items()}
+    return value
+
+
+def typed_figure(fig):
+    # Dict of the figure with the numeric arrays of its traces encoded
+    fig = fig.to_plotly_json() if isinstance(fig, go.Figure) else fig
+    return dict(fig, data=[encode_arrays(trace) for trace in fig['data']])
+
+"------------------------------ Session Store --------------------------------"
+# Results are kept in a disk-backed store shared by every gunicorn worker, so
+# a session can be served by any worker. Entries expire after SESSION_TTL
+# seconds without use and the least recently used ones are culled once the
+# store grows past SESSION_SIZE_LIMIT bytes. Values go through dill because
+# the pytank vectors carry pandera schemas built with lambdas.
+CACHE_DIR = os.environ.get('PYTANK_CACHE_DIR',
+                           os.path.join(tempfile.gettempdir(), 'pytank_cache'))
+SESSION_TTL = int(os.environ.get('PYTANK_SESSION_TTL', 4 * 60 * 60))
+# Data keyed by file content is not tied to a session and lives longer
+CACHE_TTL = int(os.environ.get('PYTANK_CACHE_TTL', 30 * 24 * 60 * 60))
+SESSION_SIZE_LIMIT = int(os.environ.get('PYTANK_SESSION_SIZE_LIMIT', 2 ** 30))
+
+session_store = diskcache.Cache(
+    os.path.join(CACHE_DIR, 'sessions'),
+    size_limit=SESSION_SIZE_LIMIT,
+    eviction_policy='least-recently-used'
+)
+
+
+def get_session_data(session_id, key):
+    store_key = f'{session_id}:{key}'
+    value = session_store.get(store_key)
+    if value is None:
+        return None
+    # Reading an entry keeps it alive for another SESSION_TTL seconds
+    session_store.touch(store_key, expire=SESSION_TTL)
+    return dill.loads(value)
+
+
+def set_session_data(session_id, key, value):
+    session_store.set(f'{session_id}:{key}', dill.dumps(value),
+                      expire=SESSION_TTL, tag=session_id)
+
+
+"----------------------------- Background Jobs -------------------------------"
+# The uploads and the Well, Analysis, Batch, Sensitivity and Monte Carlo
+# callbacks run as background jobs in their own processes, so they are not bound by the
+# gunicorn worker timeout and the request workers stay free. The browser
+# polls for progress and the result.
+background_manager = dash.DiskcacheManager(
+    diskcache.Cache(os.path.join(CACHE_DIR, 'jobs')),
+    expire=SESSION_TTL
+)
+
+PROGRESS_STYLE = {'width': '70%', 'marginTop': '10px'}
+CANCEL_STYLE = {
+    'width': '70%',
+    'marginTop': '10px',
+    'backgroundColor': 'red',
+    'color': 'white',
+    'padding': '10px'
+}
+
+
+def job_controls(name):
+    # Disables the submit button and shows the progress bar and the cancel
+    # button while the job runs
+    return dict(
+        manager=background_manager,
+        running=[
+            (Output(f'{name}-submit-button', 'disabled'), True, False),
+            (Output(f'{name}-progress', 'style'), PROGRESS_STYLE,
+             {'display': 'none'}),
+            (Output(f'{name}-cancel-button', 'style'), CANCEL_STYLE,
+             {'display': 'none'}),
+        ],
+        cancel=[Input(f'{name}-cancel-button', 'n_clicks')],
+        progress=[Output(f'{name}-progress', 'value'),
+                  Output(f'{name}-progress', 'max')],
+    )
+
+
+"------------------------ Callback Files CSVs --------------------------------"
+# Uploaded files are parsed once, when they are uploaded, and the DataFrame is
+# kept in a cache keyed by the hash of the file content. The submit callbacks
+# only receive that key and read the parsed DataFrame back from the cache.
+UPLOAD_CACHE_SIZE_LIMIT = int(os.environ.get('PYTANK_UPLOAD_CACHE_SIZE_LIMIT',
+                                             2 ** 31))
+# The files are decoded and parsed in chunks of INGEST_CHUNK_ROWS rows and the
+# parsing stops once the DataFrame takes more than INGEST_MEMORY_LIMIT bytes.
+INGEST_CHUNK_ROWS = int(os.environ.get('PYTANK_INGEST_CHUNK_ROWS', 200000))
+INGEST_MEMORY_LIMIT = int(os.environ.get('PYTANK_INGEST_MEMORY_LIMIT',
+                                         2 ** 30))
+UPLOAD_LIMIT_TEXT = (f' Files are limited to {INGEST_MEMORY_LIMIT // 2 ** 20}'
+                     f' MB in memory.')
+
+DATE_COLUMNS = ['START_DATETIME', 'DATE']
+LABEL_COLUMNS = ['ITEM_NAME', 'WELLBORE']
+COLUMN_DTYPES = {
+    # Production
+    'ITEM_NAME': str,
+    'OIL_CUM': 'float64',
+    'WATER_CUM': 'float64',
+    'GAS_CUM': 'float64',
+    # Pressure
+    'WELLBORE': str,
+    'PRESSURE_DATUM': 'float64',
+    # PVT
+    'Pressure': 'float64',
+    'Bo': 'float64',
+    'Bg': 'float64',
+    'GOR': 'float64',
+    'uo': 'float64',
+}
+
+upload_cache = diskcache.Cache(
+    os.path.join(CACHE_DIR, 'uploads'),
+    size_limit=UPLOAD_CACHE_SIZE_LIMIT,
+    eviction_policy='least-recently-used'
+)
+
+
+class Base64Stream(io.RawIOBase):
+    # Binary stream over the base64 text of an upload. The text is decoded a
+    # block at a time, so the decoded file never exists whole in memory.
+    block_size = 4 * 2 ** 20
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.position = contents.index(',') + 1
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self.buffer) < len(b) and self.position < len(
+                self.contents):
+            end = self.position + self.block_size
+            self.buffer += base64.b64decode(self.contents[self.position:end])
+            self.position = end
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def content_hash(contents):
+    sha = hashlib.sha1()
+    for start in range(0, len(contents), Base64Stream.block_size):
+        sha.update(
+            contents[start:start + Base64Stream.block_size].encode('utf-8'))
+    return sha.hexdigest()
+
+
+def optimize_dtypes(df):
+    # Dates are parsed once here and repeated labels (well names) are stored
+    # as categories. Numeric columns keep their precision.
+    for col in df.select_dtypes(include='object').columns:
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col])
+        elif col in LABEL_COLUMNS or df[col].nunique() < 0.5 * len(df):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def concat_chunks(chunks):
+    # Chunks only share categories once they are unified
+    for col in chunks[0].select_dtypes(include='category').columns:
+        categories = union_categoricals(
+            [chunk[col] for chunk in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return optimize_dtypes(pd.concat(chunks, ignore_index=True))
+
+
+def parse_csv(source, progress=None):
+    # Parses a CSV path or text stream in chunks of INGEST_CHUNK_ROWS rows
+    chunks = []
+    rows = 0
+    memory = 0
+    for chunk in pd.read_csv(source, dtype=COLUMN_DTYPES,
+                             chunksize=INGEST_CHUNK_ROWS):
+        for col in chunk.columns.intersection(DATE_COLUMNS):
+            chunk[col] = pd.to_datetime(chunk[col])
+        for col in chunk.columns.intersection(LABEL_COLUMNS):
+            chunk[col] = chunk[col].astype('category')
+
+        rows += len(chunk)
+        memory += chunk.memory_usage(deep=True).sum()
+        if memory > INGEST_MEMORY_LIMIT:
+            raise MemoryError(f'The file exceeds {INGEST_MEMORY_LIMIT} bytes')
+        chunks.append(chunk)
+
+        if progress is not None:
+            progress(rows)
+    return concat_chunks(chunks)
+
+
+def parse_contents(contents, progress=None):
+    stream = Base64Stream(contents)
+    text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8')
+
+    def report(rows):
+        if progress is not None:
+            # Share of the upload read so far and rows parsed
+            progress(min(stream.position, len(contents)) / len(contents),
+                     rows)
+    return parse_csv(text, report)
+
+
+def parse_data(contents, filename, progress=None):
+    # Key of the parsed file, or the error that stopped it
+    key = content_hash(contents)
+    # Files already parsed are only kept alive in the cache
+    if upload_cache.touch(key, expire=CACHE_TTL):
+        return key, None
+    if 'csv' not in filename:
+        return None, f'{filename} is not a CSV file.'
+    try:
+        df = parse_contents(contents, progress)
+    except MemoryError:
+        return None, f'{filename} is too large.' + UPLOAD_LIMIT_TEXT
+    except ValueError as e:
+        # Malformed CSV, encoding or column types
+        return None, f'{filename} could not be read: {e}'
+    upload_cache.set(key, df, expire=CACHE_TTL)
+    return key, None
+
+
+def get_uploaded_data(key):
+    if key is None:
+        return None
+    return upload_cache.get(key)
+
+
+def upload_controls(name):
+    # Shows the progress of the parsing of the file while the job runs
+    return dict(
+        manager=background_manager,
+        running=[(Output(f'{name}-upload-progress', 'style'), PROGRESS_STYLE,
+                  {'display': 'none'})],
+        progress=[Output(f'{name}-upload-progress', 'value'),
+                  Output(f'{name}-upload-progress', 'max')],
+    )
+
+
+def upload_status(set_progress, contents, filename):
+    # Status and key of an uploaded file
+    def progress(share, rows):
+        set_progress((round(100 * share), 100))
+
+    key, error = parse_data(contents, filename, progress)
+    if error is not None:
+        return error, None
+    return f'{filename} uploaded successfully!', key
+
+
+@app.callback(
+    [Output('prod-upload-status', 'children'),
+     Output('prod-data-key', 'data')],
+    Input('upload-prod-data', 'contents'),
+    State('upload-prod-data', 'filename'),
+    prevent_initial_call=True,
+    background=True,
+    **upload_controls('prod')
+)
+def update_prod_upload(set_progress, contents, filename):
+    return upload_status(set_progress, contents, filename)
+
+
+@app.callback(
+    [Output('press-upload-status', 'children'),
+     Output('press-data-key', 'data')],
+    Input('upload-press-data', 'contents'),
+    State('upload-press-data', 'filename'),
+    prevent_initial_call=True,
+    background=True,
+    **upload_controls('press')
+)
+def update_press_upload(set_progress, contents, filename):
+    return upload_status(set_progress, contents, filename)
+
+
+@app.callback(
+    [Output('fluid-upload-status', 'children'),
+     Output('fluid-data-key', 'data')],
+    Input('upload-fluid-data', 'contents'),
+    State('upload-fluid-data', 'filename'),
+    prevent_initial_call=True,
+    background=True,
+    **upload_controls('fluid')
+)
+def update_fluid_upload(set_progress, contents, filename):
+    return upload_status(set_progress, contents, filename)
+
+
+def append_status(contents, filename, base_key, data_name):
+    # Status and key of the file with the appended rows
+    if base_key is None:
+        return f'Upload the {data_name} data first.', dash.no_update
+    delta_key, error = parse_data(contents, filename)
+    if error is not None:
+        return error, dash.no_update
+    key = append_data(base_key, delta_key)
+    if key is None:
+        return (f'There was an error appending the {data_name} data. The '
+                f'file needs the columns of the uploaded one.',
+                dash.no_update)
+    return f'{filename} appended successfully!', key
+
+
+@app.callback(
+    [Output('prod-append-status', 'children'),
+     Output('prod-data-key', 'data', allow_duplicate=True)],
+    Input('append-prod-data', 'contents'),
+    [State('append-prod-data', 'filename'),
+     State('prod-data-key', 'data')],
+    prevent_initial_call=True
+)
+def append_prod_data(contents, filename, prod_key):
+    return append_status(contents, filename, prod_key, 'production')
+
+
+@app.callback(
+    [Output('press-append-status', 'children'),
+     Output('press-data-key', 'data', allow_duplicate=True)],
+    Input('append-press-data', 'contents'),
+    [State('append-press-data', 'filename'),
+     State('press-data-key', 'data')],
+    prevent_initial_call=True
+)
+def append_press_data(contents, filename, press_key):
+    return append_status(contents, filename, press_key, 'pressure')
+
+
+"----------------------------- Well Data Cache -------------------------------"
+# The normalized production and pressure vectors of the wells are saved as
+# Feather files keyed by the uploaded files and the frequencies. A later
+# session with the same files memory-maps them and rebuilds the wells without
+# parsing the CSVs or running pt.create_wells again.
+WELL_CACHE_SIZE_LIMIT = int(os.environ.get('PYTANK_WELL_CACHE_SIZE_LIMIT',
+                                           2 ** 31))
+WELL_COL = 'WELL_BORE'
+DATE_COL = 'START_DATETIME'
+FREQ_COL = 'FREQ'
+
+well_cache = diskcache.Cache(
+    os.path.join(CACHE_DIR, 'wells'),
+    size_limit=WELL_CACHE_SIZE_LIMIT,
+    eviction_policy='least-recently-used'
+)
+
+
+def well_cache_key(prod_key, press_key, freq_prod, freq_press):
+    return f'{prod_key}:{press_key}:{freq_prod}:{freq_press}'
+
+
+def well_freq(value):
+    # Frequency of the dropdowns of the Well module, as a string or None
+    return str(value) if value and value != 'None' else None
+
+
+def vectors_to_frame(wells, attribute):
+    frames = []
+    for well in wells:
+        vector = getattr(well, attribute)
+        if vector is not None:
+            df = vector.data.rename_axis(DATE_COL).reset_index()
+            df[WELL_COL] = well.name
+            df[FREQ_COL] = vector.freq
+            frames.append(df)
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df[WELL_COL] = df[WELL_COL].astype('category')
+    df[FREQ_COL] = df[FREQ_COL].astype('category')
+    return df
+
+
+def save_well_table(key, attribute, df):
+    buffer = io.BytesIO()
+    # Uncompressed, so the file can be memory-mapped when it is read
+    feather.write_feather(df, buffer, compression='uncompressed')
+    buffer.seek(0)
+    well_cache.set(f'{key}:{attribute}', buffer, read=True, expire=CACHE_TTL)
+
+
+def save_wells(key, wells):
+    for attribute in ('prod_data', 'press_data'):
+        df = vectors_to_frame(wells, attribute)
+        if df is not None:
+            save_well_table(key, attribute, df)
+
+
+def read_well_table(key, attribute):
+    handle = well_cache.get(f'{key}:{attribute}', read=True)
+    if handle is None:
+        return None
+    with handle:
+        # Small entries live inside the cache database and have no file
+        if hasattr(handle, 'name'):
+            return feather.read_table(handle.name, memory_map=True)
+        return feather.read_table(handle)
+
+
+def load_vectors(key, attribute, vector_class):
+    table = read_well_table(key, attribute)
+    if table is None:
+        return {}
+    return table_vectors(table, vector_class)
+
+
+def table_vectors(table, vector_class, validate=False):
+    # The rows of each well are contiguous, so each well only converts its
+    # slice of the memory-mapped table instead of a copy of the whole table
+    codes, names = pd.factorize(table.column(WELL_COL).to_pandas())
+    starts = np.flatnonzero(np.diff(codes)) + 1
+    bounds = zip(np.r_[0, starts], np.r_[starts, len(codes)])
+    columns = [col for col in table.column_names
+               if col not in (WELL_COL, FREQ_COL)]
+
+    # The vectors share the schema, so the session stores it only once
+    schema = vector_class.model_fields['data_schema'].default
+    if validate:
+        # The checks of the vectors of pytank, the columns of all the wells
+        # at once and the dates of each well with its frequency
+        frame = add_date_index_validation(schema, None).validate(
+            table.select(columns).to_pandas().set_index(DATE_COL))
+    vectors = {}
+    for start, end in bounds:
+        rows = table.slice(start, end - start)
+        freq = rows.column(FREQ_COL)[0].as_py()
+        if validate:
+            data = frame.iloc[start:end]
+            add_date_index_validation(DataFrameSchema(), freq).validate(
+                pd.DataFrame(index=data.index))
+        else:
+            data = rows.select(columns).to_pandas().set_index(DATE_COL)
+        # The data was validated when the wells were built, validating it
+        # again with pandera takes most of the time of loading the wells
+        vectors[names[codes[start]]] = vector_class.model_construct(
+            freq=freq, data=data, data_schema=schema)
+    return vectors
+
+
+def load_well_data(key, attribute, well_name):
+    # Data of one well, only its rows are read from the memory-mapped file
+    table = read_well_table(key, attribute)
+    if table is None:
+        return None
+    table = table.filter(compute.equal(table[WELL_COL], well_name))
+    return table.to_pandas().drop(columns=[WELL_COL, FREQ_COL]).set_index(
+        DATE_COL)
+
+
+def sorted_wells(wells):
+    # pt.create_wells takes the names from a set, whose order changes between
+    # processes. The tables, colours and ties of the figures follow the order
+    # of the wells.
+    return sorted(wells, key=lambda well: well.name)
 
 
-def parse_contents(contents):
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    return pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+def load_wells(key):
+    if f'{key}:prod_data' not in well_cache and (
+            f'{key}:press_data' not in well_cache):
+        return None
+    prod_vectors = load_vectors(key, 'prod_data', pt.ProdVector)
+    press_vectors = load_vectors(key, 'press_data', pt.PressVector)
+    return sorted_wells(pt.Well(name=name,
+                                prod_data=prod_vectors.get(name),
+                                press_data=press_vectors.get(name))
+                        for name in set(prod_vectors).union(press_vectors))
+
+
+def get_wells(prod_key, press_key, freq_prod, freq_press):
+    # The Feather files are shared by the gunicorn workers and the background
+    # jobs, so changing the selected wells loads them instead of building them
+    key = well_cache_key(prod_key, press_key, freq_prod, freq_press)
+    wells = load_wells(key)
+    if wells is None:
+        # Appended files only rebuild the wells of their new rows
+        wells = append_wells(prod_key, press_key, freq_prod, freq_press)
+    if wells is None:
+        # Production and pressure data parsed when they were uploaded
+        prod_data = get_uploaded_data(prod_key)
+        press_data = get_uploaded_data(press_key)
+        if prod_data is None or press_data is None:
+            return None
+
+        wells = sorted_wells(pt.create_wells(
+            df_prod=prod_data,
+            df_press=press_data,
+            freq_prod=freq_prod,
+            freq_press=freq_press
+        ))
+        save_wells(key, wells)
+    return wells
+
+
+"---------------------------- Incremental Update -----------------------------"
+# The rows of a new period are uploaded as an appended file. Its key stands
+# for the base file with the new rows, which replace the rows of the same
+# well and date. The wells of the appended files are built from the wells of
+# the base files, and only the wells with new rows are normalized again.
+#
+# Nearly all the time of pt.Analysis goes to interpolating the cumulative
+# production of each pressure row. append_wells saves those values with the
+# appended wells, recomputing only the wells with new rows, and the analysis
+# of those wells reads them. The averages of the periods and the influx of
+# water come from all of them, as in pytank.
+PROD_COLUMNS = ['OIL_CUM', 'WATER_CUM', 'GAS_CUM', 'LIQ_CUM']
+INTERP_COLUMNS = ['OIL_CUM', 'WATER_CUM', 'GAS_CUM']
+
+
+def data_columns(df):
+    # Well and date columns of an uploaded production or pressure file
+    label = next((col for col in LABEL_COLUMNS if col in df.columns), None)
+    date = next((col for col in DATE_COLUMNS if col in df.columns), None)
+    return label, date
+
+
+def append_data(base_key, delta_key):
+    key = hashlib.sha1(f'{base_key}:{delta_key}'.encode()).hexdigest()
+    if upload_cache.touch(f'{key}:append', expire=CACHE_TTL):
+        upload_cache.touch(key, expire=CACHE_TTL)
+        return key
+    delta = get_uploaded_data(delta_key)
+    if delta is None or None in data_columns(delta):
+        return None
+
+    # The base file is not kept when its wells come from a project, then
+    # the appended wells can only be built from those wells
+    base = get_uploaded_data(base_key)
+    if base is not None:
+        label, date = data_columns(base)
+        if label is None or date is None or not set(base.columns).issubset(
+                delta.columns):
+            return None
+        delta = delta[base.columns]
+        replaced = pd.MultiIndex.from_frame(base[[label, date]]).isin(
+            pd.MultiIndex.from_frame(delta[[label, date]]))
+        # The merged file is kept for when the wells of the base files expired
+        upload_cache.set(key, concat_chunks([base[~replaced].copy(), delta]),
+                         expire=CACHE_TTL)
+    upload_cache.set(f'{key}:append', (base_key, delta_key),
+                     expire=CACHE_TTL)
+    return key
+
+
+def prod_vector(data, freq):
+    # Same vector as pt.create_wells
+    if freq is None:
+        return pt.ProdVector(freq=None, data=data)
+    data = normalize_date_freq(df=data, freq=freq, cols_fill_na=PROD_COLUMNS,
+                               method_no_cols='ffill')
+    try:
+        return pt.ProdVector(freq=freq, data=data)
+    except SchemaError:
+        return pt.ProdVector(freq=None, data=data)
+
+
+def merge_vector_data(old, new):
+    if old is None:
+        return new
+    # Revised rows go back to their date, the interpolations need the dates
+    # in order
+    return pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+
+
+def append_wells(prod_key, press_key, freq_prod, freq_press):
+    prod_append = upload_cache.get(f'{prod_key}:append')
+    press_append = upload_cache.get(f'{press_key}:append')
+    if prod_append is None and press_append is None:
+        return None
+    base_prod = prod_append[0] if prod_append else prod_key
+    base_press = press_append[0] if press_append else press_key
+    base_wells = get_wells(base_prod, base_press, freq_prod, freq_press)
+    prod_delta = get_uploaded_data(prod_append[1]) if prod_append else None
+    press_delta = get_uploaded_data(press_append[1]) if press_append else None
+    if base_wells is None or (prod_append and prod_delta is None) or (
+            press_append and press_delta is None):
+        return None
+
+    wells = {well.name: well for well in base_wells}
+    changed = set()
+    if prod_delta is not None:
+        for name, rows in prod_delta.groupby('ITEM_NAME', observed=True,
+                                             sort=False):
+            data = rows.set_index('START_DATETIME')[INTERP_COLUMNS]
+            data['LIQ_CUM'] = data['OIL_CUM'] + data['WATER_CUM']
+            well = wells.get(name)
+            old = None
+            if well is not None and well.prod_data is not None:
+                old = well.prod_data.data
+            changed.add(name)
+            wells[name] = pt.Well(
+                name=name,
+                prod_data=prod_vector(merge_vector_data(old, data), freq_prod),
+                press_data=None if well is None else well.press_data
+            )
+    if press_delta is not None:
+        for name, rows in press_delta.groupby('WELLBORE', observed=True,
+                                              sort=False):
+            data = rows.rename(columns={'DATE': 'START_DATETIME'}).set_index(
+                'START_DATETIME')
+            well = wells.get(name)
+            old = None
+            if well is not None and well.press_data is not None:
+                old = well.press_data.data
+            changed.add(name)
+            wells[name] = pt.Well(
+                name=name,
+                prod_data=None if well is None else well.prod_data,
+                press_data=pt.PressVector(freq=freq_press,
+                                          data=merge_vector_data(old, data))
+            )
+
+    wells = sorted_wells(wells.values())
+    key = well_cache_key(prod_key, press_key, freq_prod, freq_press)
+    save_wells(key, wells)
+    # The wells without new rows keep the interpolations of the base wells
+    interpolations = load_interpolations(
+        well_cache_key(base_prod, base_press, freq_prod, freq_press))
+    if interpolations is None:
+        interpolations = well_interpolations(wells)
+    else:
+        interpolations = pd.concat([
+            interpolations[~interpolations[WELL_COL].isin(list(changed))],
+            well_interpolations([well for well in wells
+                                 if well.name in changed])
+        ], ignore_index=True)
+    save_well_table(key, 'interp', interpolations)
+    return wells
+
+
+def well_interpolations(wells):
+    # Cumulative production at the pressure dates of each well, the values
+    # of pt.Analysis with one interp_from_dates per well instead of per row
+    frames = [pd.DataFrame({
+        WELL_COL: pd.Series(dtype=str),
+        DATE_COL: pd.Series(dtype='datetime64[ns]'),
+        **{col: pd.Series(dtype=float) for col in INTERP_COLUMNS}
+    })]
+    for well in wells:
+        if well.press_data is None:
+            continue
+        dates = well.press_data.data.index
+        df = pd.DataFrame({WELL_COL: well.name, DATE_COL: dates})
+        prod = None if well.prod_data is None else well.prod_data.data
+        for col in INTERP_COLUMNS:
+            # Wells without production have no withdrawal, as in pytank
+            if prod is None or prod.empty:
+                df[col] = 0.0
+            else:
+                df[col] = interp_from_dates(
+                    pd.Series(dates), pd.Series(prod.index), prod[col],
+                    left=0.0)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_interpolations(wells_key):
+    table = read_well_table(wells_key, 'interp')
+    if table is None:
+        return None
+    df = table.to_pandas()
+    df[WELL_COL] = df[WELL_COL].astype(str)
+    return df
+
+
+class IncrementalAnalysis(pt.Analysis):
+    # pt.Analysis of the wells of appended files, with the interpolations
+    # saved by append_wells instead of interpolating every pressure row
+    wells_key: Optional[str] = None
+
+    def __init__(self, tank_class, wells_key, **settings):
+        super().__init__(tank_class, **settings)
+        self.wells_key = wells_key
+
+    def _calc_uw(self):
+        keys = [WELL_COL, DATE_COL]
+        saved = load_interpolations(self.wells_key)
+        df_press = self.tank_class.get_pressure_df().merge(
+            saved.drop_duplicates(keys), on=keys, how='left')
+        df_press.fillna({col: 0.0 for col in INTERP_COLUMNS}, inplace=True)
+
+        uw_well = []
+        for well, group in df_press.groupby(WELL_COL):
+            group['UW'] = underground_withdrawal(
+                group, 'OIL_CUM', 'WATER_CUM', 'GAS_CUM', 'Bo', 'Bw', 'Bg',
+                'GOR', 'RS_bw')
+            uw_well.append(group)
+        return pd.concat(uw_well, ignore_index=True)
+
+
+def tank_analysis(tank_class, wells_key=None, **settings):
+    # Only the wells of appended files have saved interpolations, the others
+    # run pt.Analysis as it is
+    if wells_key is not None and f'{wells_key}:interp' in well_cache:
+        return IncrementalAnalysis(tank_class, wells_key, **settings)
+    return pt.Analysis(tank_class=tank_class, **settings)
+
+
+"------------------------------ Well Figures ---------------------------------"
+# The well vectors can hold decades of daily data. Each trace is reduced to
+# WELL_PLOT_POINTS points, keeping the minimum and the maximum of each bucket
+# of rows, and zooming a graph loads the rows of the visible window again.
+WELL_PLOT_POINTS = int(os.environ.get('PYTANK_WELL_PLOT_POINTS', 2000))
+
+# Title, y axis title and columns of the graph of each vector
+WELL_FIGURES = {
+    'prod_data': ('Production vs Time', 'Production [BBL]',
+                  ['OIL_CUM', 'WATER_CUM', 'LIQ_CUM']),
+    'press_data': ('Pressure vs Time', 'Pressure [PSI]', None),
+}
+
+
+def min_max_downsample(x, y, n_out):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out:
+        return x, y
+    size = -(-n // max(n_out // 2, 1))
+    n_buckets = -(-n // size)
+    buckets = np.full(n_buckets * size, np.nan)
+    buckets[:n] = y
+    buckets = buckets.reshape(n_buckets, size)
+    start = np.arange(n_buckets) * size
+    # A missing value is only kept when the whole bucket is missing
+    missing = np.isnan(buckets)
+    low = start + np.argmin(np.where(missing, np.inf, buckets), axis=1)
+    high = start + np.argmax(np.where(missing, -np.inf, buckets), axis=1)
+    index = np.unique(np.concatenate([[0, n - 1], low, high]))
+    index = index[index < n]
+    return x[index], y[index]
+
+
+def well_figure(df, vector, x_range=None):
+    title, y_title, columns = WELL_FIGURES[vector]
+    columns = [col for col in columns or df.columns if col in df.columns]
+
+    dates = df.index.to_numpy()
+    if x_range is not None:
+        visible = ((dates >= pd.Timestamp(x_range[0]).to_datetime64())
+                   & (dates <= pd.Timestamp(x_range[1]).to_datetime64()))
+        df = df[visible]
+        dates = dates[visible]
+
+    fig = figure_skeleton(title, 'Date', y_title, x_type='date')
+    for col in columns:
+        x, y = min_max_downsample(dates, df[col], WELL_PLOT_POINTS)
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=col))
+    # Keeps the zoom of the user when the data of the window arrives
+    fig.update_layout(template='pytank', uirevision=vector)
+    return fig
+
+
+def well_graph(well_name, vector, df):
+    return dcc.Graph(
+        id={'type': 'well-graph', 'well': well_name, 'vector': vector},
+        figure=typed_figure(well_figure(df, vector))
+    )
+
+
+def well_row(well_name, prod_data_df, press_data_df):
+    well_info_display = [html.H4(f"Well: {well_name}")]
+
+    # Container for both production and pressure graphs
+    row_layout = []
+
+    # Check if production data exists
+    if not prod_data_df.empty:
+        prod_graph = well_graph(well_name, 'prod_data', prod_data_df)
+        row_layout.append(
+            dbc.Col(
+                html.Div([
+                    prod_graph
+                ]),
+                width=6
+            )
+        )
+    else:
+        row_layout.append(
+            dbc.Col(
+                html.Div([
+                    html.P("No production data available.")
+                ]),
+                width=6
+            )
+        )
+
+    # Check if pressure data exists
+    if not press_data_df.empty:
+        press_graph = well_graph(well_name, 'press_data',
+                                 press_data_df)
+        row_layout.append(
+            dbc.Col(
+                html.Div([
+                    press_graph
+                ]
+                ),
+                width=6
+            )
+        )
+    else:
+        if len(row_layout) == 1:
+            row_layout.append(
+                dbc.Col(
+                    html.Div([
+                        html.P("No pressure data available.")
+                    ]),
+                    width=6
+                )
+            )
+
+    well_info_display.append(
+        dbc.Row(row_layout)
+    )
+    return well_info_display
+
+
+# The Well module lists the wells in a paginated table, graphs are only
+# rendered for the selected ones
+WELL_PAGE_SIZE = 15
+WELL_GRAPHS_LIMIT = 10
+
+
+def well_index_table(wells):
+    rows = [
+        {'Well': well.name,
+         'Production Records': 0 if well.prod_data is None
+         else len(well.prod_data.data),
+         'Pressure Records': 0 if well.press_data is None
+         else len(well.press_data.data)}
+        for well in sorted(wells, key=lambda well: well.name)
+    ]
+    return dash_table.DataTable(
+        id='well-index-table',
+        columns=[{"name": i, "id": i}
+                 for i in ['Well', 'Production Records', 'Pressure Records']],
+        data=rows,
+        row_selectable='multi',
+        selected_rows=[0] if rows else [],
+        page_action='native',
+        page_size=WELL_PAGE_SIZE,
+        sort_action='native',
+        filter_action='native',
+        style_table={'overflowX': 'auto'},
+        style_header={
+            'backgroundColor': 'rgb(230, 230, 230)',
+            'fontWeight': 'bold',
+            'textAlign': 'center'
+        },
+        style_cell={
+            'textAlign': 'center',
+            'whiteSpace': 'normal',
+            'height': 'auto',
+        },
+    )
 
 
 "----------------------------- Callback Well ---------------------------------"
 
 
+def well_name_input(index, value=None):
+    return dcc.Input(
+        id={'type': 'well-name', 'index': index},
+        type='text',
+        value=value,
+        placeholder='Enter well name',
+        style={'width': '100%'}
+    )
+
+
 @app.callback(
     Output('dynamic-well-inputs', 'children'),
     [Input('add-well-button', 'n_clicks'),
@@ -1505,13 +3240,7 @@ def update_well_inputs(add_clicks, remove_clicks, current_children):
     if button_id == 'add-well-button' and add_clicks > 0:
         new_index = len([child for child in current_children if
                          isinstance(child, dcc.Input)])
-        new_input = dcc.Input(
-            id={'type': 'well-name', 'index': new_index},
-            type='text',
-            placeholder='Enter well name',
-            style={'width': '100%'}
-        )
-        return current_children + [new_input]
+        return current_children + [well_name_input(new_index)]
 
     if button_id == 'remove-well-button' and remove_clicks > 0 and len(
             current_children) > 1:
@@ -1520,43 +3249,38 @@ def update_well_inputs(add_clicks, remove_clicks, current_children):
     return current_children
 
 
-# Global variables
-global_wells_info = None
-global_oil_model = None
-global_water_model = None
-global_tank = None
-global_analysis = None
-
-
 @app.callback(
     Output('well-info-content', 'children'),
     Input('well-submit-button', 'n_clicks'),
-    State('upload-prod-data', 'contents'),
-    State('upload-press-data', 'contents'),
+    State('prod-data-key', 'data'),
+    State('press-data-key', 'data'),
     State('freq-prod', 'value'),
     State('freq-press', 'value'),
-    State('dynamic-well-inputs', 'children')
+    State('dynamic-well-inputs', 'children'),
+    State('session-id', 'data'),
+    background=True,
+    **job_controls('well')
 )
-def update_output_well(n_clicks, prod_content, press_content, freq_prod,
-                       freq_press, well_inputs):
-    if n_clicks > 0 and prod_content is not None and press_content is not None:
-        # Process production and pressure data
-        prod_data = parse_contents(prod_content)
-        press_data = parse_contents(press_content)
-
+def update_output_well(set_progress, n_clicks, prod_key, press_key, freq_prod,
+                       freq_press, well_inputs, session_id):
+    if n_clicks > 0 and prod_key is not None and press_key is not None:
         # Ensure frequencies are handled as strings
-        freq_prod = str(
-            freq_prod) if freq_prod and freq_prod != 'None' else None
-        freq_press = str(
-            freq_press) if freq_press and freq_press != 'None' else None
-
-        # Create wells
-        wells = pt.create_wells(
-            df_prod=prod_data,
-            df_press=press_data,
-            freq_prod=freq_prod,
-            freq_press=freq_press
-        )
+        freq_prod = well_freq(freq_prod)
+        freq_press = well_freq(freq_press)
+
+        # No value shows an indeterminate bar while the wells are built
+        set_progress((None, None))
+
+        # Create wells, or reuse the ones built for these files and
+        # frequencies
+        wells = get_wells(prod_key, press_key, freq_prod, freq_press)
+        if wells is None:
+            return [html.P("The uploaded files expired. Please upload "
+                           "them again.", style={'color': 'red'})]
+        # The zoomed graphs read the data of their well from these files
+        set_session_data(session_id, 'wells_key',
+                         well_cache_key(prod_key, press_key, freq_prod,
+                                        freq_press))
 
         # Get well names from input fields
         my_wells = [input['props']['value'] for input
@@ -1564,236 +3288,222 @@ def update_output_well(n_clicks, prod_content, press_content, freq_prod,
                     and input['props']['value'].strip()]
 
         # Search wells
-        global global_wells_info
-        global_wells_info = pt.search_wells(
+        wells_info = pt.search_wells(
             wells=wells,
             well_names=my_wells
         )
+        set_session_data(session_id, 'wells_info', wells_info)
 
-        well_info_display = []
-
-        for well in global_wells_info:
-            # Check if prod_data and press_data exist and are not None
-            prod_data_df = well.prod_data.data if well.prod_data is not None \
-                else pd.DataFrame()
-            press_data_df = well.press_data.data if (well.press_data is not
-                                                     None) else pd.DataFrame()
-
-            well_info_display.append(html.H4(f"Well: {well.name}"))
-
-            # Container for both production and pressure graphs
-            row_layout = []
-
-            # Check if production data exists
-            if not prod_data_df.empty:
-                prod_graph = dcc.Graph(
-                    figure={
-                        'data': [
-                            {'x': prod_data_df.index,
-                             'y': prod_data_df[col],
-                             'type': 'line', 'name': col}
-                            for col in ['OIL_CUM', 'WATER_CUM', 'LIQ_CUM']
-                            if col in prod_data_df.columns
-                        ],
-                        'layout': {
-                            'title': {
-                                'text': 'Production vs Time',
-                                'font': {
-                                    'size': 18,
-                                    'family': 'Arial, sans-serif',
-                                    'color': 'black',
-                                    'weight': 'bold'
-                                }
-                            },
-                            'xaxis': {'title': 'Date',
-                                      'titlefont': {'size': 14,
-                                                    'family': 'Arial, sans-serif'},
-                                      'tickfont': {'size': 12,
-                                                   'family': 'Arial, sans-serif'},
-                                      'showgrid': True,
-                                      'gridcolor': '#D1D1D1',
-                                      'gridwidth': 1,
-                                      'griddash': 'dash',
-                                      'linecolor': 'black',
-                                      'mirror': True,
-                                      'type': 'date'
-                                      },
-                            'yaxis': {'title': 'Production [BBL]',
-                                      'titlefont': {'size': 14,
-                                                    'family': 'Arial, sans-serif'},
-                                      'tickfont': {'size': 12,
-                                                   'family': 'Arial, sans-serif'},
-                                      'showgrid': True,
-                                      'gridcolor': '#D1D1D1',
-                                      'gridwidth': 1,
-                                      'griddash': 'dash',
-                                      'linecolor': 'black',
-                                      'mirror': True
-                                      },
-                            'template': 'plotly_white',
-                        }
-                    }
-                )
-                row_layout.append(
-                    dbc.Col(
-                        html.Div([
-                            prod_graph
-                        ]),
-                        width=6
-                    )
-                )
-            else:
-                row_layout.append(
-                    dbc.Col(
-                        html.Div([
-                            html.P("No production data available.")
-                        ]),
-                        width=6
-                    )
-                )
+        if wells_info:
+            well_info_display = [
+                well_index_table(wells_info),
+                # Filled with the graphs of the wells selected in the table
+                html.Div(id='well-graphs-content')
+            ]
+        else:
+            well_info_display = [html.P("No well data available.")]
 
-            # Check if pressure data exists
-            if not press_data_df.empty:
-                press_graph = dcc.Graph(
-                    figure={
-                        'data': [
-                            {'x': press_data_df.index,
-                             'y': press_data_df[col],
-                             'type': 'line', 'name': col}
-                            for col in press_data_df.columns
-                        ],
-                        'layout': {
-                            'title': {
-                                'text': 'Pressure vs Time',
-                                'font': {
-                                    'size': 18,
-                                    'family': 'Arial, sans-serif',
-                                    'color': 'black',
-                                    'weight': 'bold'
-                                }
-                            },
-                            'xaxis': {'title': 'Date',
-                                      'titlefont': {'size': 14,
-                                                    'family': 'Arial, sans-serif'},
-                                      'tickfont': {'size': 12,
-                                                   'family': 'Arial, sans-serif'},
-                                      'showgrid': True,
-                                      'gridcolor': '#D1D1D1',
-                                      'gridwidth': 1,
-                                      'griddash': 'dash',
-                                      'linecolor': 'black',
-                                      'mirror': True,
-                                      'type': 'date'
-                                      },
-                            'yaxis': {'title': 'Pressure [PSI]',
-                                      'titlefont': {'size': 14,
-                                                    'family': 'Arial, sans-serif'},
-                                      'tickfont': {'size': 12,
-                                                   'family': 'Arial, sans-serif'},
-                                      'showgrid': True,
-                                      'gridcolor': '#D1D1D1',
-                                      'gridwidth': 1,
-                                      'griddash': 'dash',
-                                      'linecolor': 'black',
-                                      'mirror': True
-                                      },
-                            'template': 'plotly_white',
-                        }
-                    }
-                )
-                row_layout.append(
-                    dbc.Col(
-                        html.Div([
-                            press_graph
-                        ]
-                        ),
-                        width=6
-                    )
-                )
-            else:
-                if len(row_layout) == 1:
-                    row_layout.append(
-                        dbc.Col(
-                            html.Div([
-                                html.P("No pressure data available.")
-                            ]),
-                            width=6
-                        )
-                    )
+        found_wells = [well.name for well in wells_info]
+        not_found_wells = [well_name for well_name in my_wells if
+                           well_name not in found_wells]
 
-            # Append the row of columns to well_info_display
+        if not_found_wells:
             well_info_display.append(
-                dbc.Row(row_layout)
+                dbc.Alert(
+                    f"The following wells were not found: {', '.join(not_found_wells)}. Check the name carefully.",
+                    color="warning",
+                    dismissable=True,
+                    is_open=True,
+                    style={'margin-top': '20px'}
+                )
             )
 
-            found_wells = [well.name for well in global_wells_info]
-            not_found_wells = [well_name for well_name in my_wells if
-                               well_name not in found_wells]
-
-            if not_found_wells:
-                well_info_display.append(
-                    dbc.Alert(
-                        f"The following wells were not found: {', '.join(not_found_wells)}. Check the name carefully.",
-                        color="warning",
-                        dismissable=True,
-                        is_open=True,
-                        style={'margin-top': '20px'}
-                    )
-                )
+        return well_info_display
+
+
+@app.callback(
+    Output('well-graphs-content', 'children'),
+    Input('well-index-table', 'selected_rows'),
+    State('well-index-table', 'data'),
+    State('session-id', 'data')
+)
+def update_well_graphs(selected_rows, rows, session_id):
+    # Graphs are only built for the selected wells, read from the Feather
+    # files of the wells
+    wells_key = get_session_data(session_id, 'wells_key')
+    if not selected_rows or wells_key is None:
+        return []
+
+    well_graphs = []
+    for row in sorted(selected_rows)[:WELL_GRAPHS_LIMIT]:
+        well_name = rows[row]['Well']
+        prod_data_df = load_well_data(wells_key, 'prod_data', well_name)
+        press_data_df = load_well_data(wells_key, 'press_data', well_name)
+        well_graphs += well_row(
+            well_name,
+            prod_data_df if prod_data_df is not None else pd.DataFrame(),
+            press_data_df if press_data_df is not None else pd.DataFrame()
+        )
 
-        return well_info_display if well_info_display else [
-            html.P("No well data available.")]
+    if len(selected_rows) > WELL_GRAPHS_LIMIT:
+        well_graphs.append(html.P(
+            f"Only the first {WELL_GRAPHS_LIMIT} selected wells are shown."))
+    return well_graphs
+
+
+@app.callback(
+    Output({'type': 'well-graph', 'well': MATCH, 'vector': MATCH}, 'figure'),
+    Input({'type': 'well-graph', 'well': MATCH, 'vector': MATCH},
+          'relayoutData'),
+    State({'type': 'well-graph', 'well': MATCH, 'vector': MATCH}, 'id'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+def update_well_graph_window(relayout_data, graph_id, session_id):
+    # Zooming sends the range of the x axis, the rows of that window are
+    # downsampled again so the zoomed graph shows them at full resolution
+    if not relayout_data:
+        return dash.no_update
+    if 'xaxis.autorange' in relayout_data:
+        x_range = None
+    elif 'xaxis.range[0]' in relayout_data:
+        x_range = (relayout_data['xaxis.range[0]'],
+                   relayout_data['xaxis.range[1]'])
+    elif 'xaxis.range' in relayout_data:
+        x_range = relayout_data['xaxis.range']
+    else:
+        return dash.no_update
+
+    wells_key = get_session_data(session_id, 'wells_key')
+    if wells_key is None:
+        return dash.no_update
+    df = load_well_data(wells_key, graph_id['vector'], graph_id['well'])
+    if df is None or df.empty:
+        return dash.no_update
+    return typed_figure(well_figure(df, graph_id['vector'], x_range))
 
 
 "-------------------------- Callback Fluid Models --------------------------"
 
+# Interpolation arrays of the PVT tables, shared by every oil model of the
+# same table in this worker
+PVT_MEMO_SIZE = 16
+PVT_COLUMNS = ('Bo', 'Bg', 'GOR')
+pvt_memo = OrderedDict()
+pvt_memo_lock = threading.Lock()
+
+
+def pvt_table(data_pvt):
+    key = hashlib.sha1(pd.util.hash_pandas_object(
+        data_pvt[['Pressure', *PVT_COLUMNS]], index=False).values).hexdigest()
+    with pvt_memo_lock:
+        if key in pvt_memo:
+            pvt_memo.move_to_end(key)
+            return pvt_memo[key]
+
+    pvt = data_pvt.sort_values('Pressure')
+    pressure = pvt['Pressure'].to_numpy(dtype=float)
+    if len(pressure) < 2:
+        raise ValueError('The PVT table needs at least two pressures.')
+    if not (np.diff(pressure) > 0).all():
+        raise ValueError('The pressures of the PVT table must be different.')
+    table = {'Pressure': pressure}
+    for column in PVT_COLUMNS:
+        table[column] = pvt[column].to_numpy(dtype=float)
+    for values in table.values():
+        values.flags.writeable = False
+
+    with pvt_memo_lock:
+        pvt_memo[key] = table
+        while len(pvt_memo) > PVT_MEMO_SIZE:
+            pvt_memo.popitem(last=False)
+    return table
+
+
+def interpolate_pvt(table, column, pressure):
+    # Linear like interp1d, the end segments extrapolate the pressures out of
+    # the table
+    x = table['Pressure']
+    y = table[column]
+    pressure = np.asarray(pressure, dtype=float)
+    high = np.clip(np.searchsorted(x, pressure), 1, len(x) - 1)
+    low = high - 1
+    slope = (y[high] - y[low]) / (x[high] - x[low])
+    return slope * (pressure - x[low]) + y[low]
+
+
+class InterpolatedOilModel(pt.OilModel):
+    # The arrays are built once per PVT table instead of an interp1d on every
+    # lookup, and are pickled with the model in the session
+    _table: dict = PrivateAttr(default=None)
+
+    def model_post_init(self, context):
+        self._table = pvt_table(self.data_pvt)
+
+    def _interpolated_column_at_pressure(self, column_name, pressure):
+        return interpolate_pvt(self._table, column_name, pressure)
+
+
+def fluid_models(fluid_df, temp_oil, salinity_water, temp_water, units):
+    # Create oil and water models
+    oil_model = InterpolatedOilModel(
+        data_pvt=fluid_df,
+        temperature=temp_oil
+    )
+
+    # Units
+    if units == 'Field':
+        units = 1
+    elif units == 'English':
+        units = 0
+
+    water_model = pt.WaterModel(
+        salinity=salinity_water,
+        temperature=temp_water,
+        unit=units
+    )
+    return oil_model, water_model
+
 
 @app.callback(
     Output('fluid-info-content',
            'children'),
     Input('fluid-submit-button', 'n_clicks'),
-    State('upload-fluid-data', 'contents'),
+    State('fluid-data-key', 'data'),
     State('temp-oil', 'value'),
     State('salinity-water', 'value'),
     State('temp-water', 'value'),
-    State('units', 'value')
+    State('units', 'value'),
+    State('session-id', 'data')
 )
-def display_fluid_models_data(n_clicks, fluid_contents, temp_oil,
-                              salinity_water, temp_water, units):
+def display_fluid_models_data(n_clicks, fluid_key, temp_oil,
+                              salinity_water, temp_water, units, session_id):
     if n_clicks > 0:
-        if not (fluid_contents and temp_oil and salinity_water
+        if not (fluid_key and temp_oil and salinity_water
                 and temp_water and units):
             return html.Div("Please ensure all fields are filled out "
                             "correctly.",
                             style={'color': 'red'})
 
-        fluid_df = parse_contents(fluid_contents)
+        fluid_df = get_uploaded_data(fluid_key)
 
         if fluid_df is None or fluid_df.empty:
             return html.Div("Error in reading uploaded files or file"
                             " is empty. Please try again.",
                             style={'color': 'red'})
 
-        global global_oil_model, global_water_model
-        # Create oil and water models
-        global_oil_model = pt.OilModel(
-            data_pvt=fluid_df,
-            temperature=temp_oil
-        )
-
-        # Units
-        if units == 'Field':
-            units = 1
-        elif units == 'English':
-            units = 0
+        try:
+            oil_model, water_model = fluid_models(fluid_df, temp_oil,
+                                                  salinity_water, temp_water,
+                                                  units)
+        except ValueError as e:
+            return html.Div(f"Error in the PVT table: {e}",
+                            style={'color': 'red'})
 
-        global_water_model = pt.WaterModel(
-            salinity=salinity_water,
-            temperature=temp_water,
-            unit=units
-        )
+        set_session_data(session_id, 'oil_model', oil_model)
+        set_session_data(session_id, 'water_model', water_model)
 
-        df = global_oil_model.data_pvt
+        df = oil_model.data_pvt
 
         # Add units to columns
         df = df.rename(columns={
@@ -1874,7 +3584,8 @@ def update_additional_inputs(aquifer_model):
      State('carter-tracy-aq-thickness', 'value'),
      State('carter-tracy-theta', 'value'),
      State('carter-tracy-aq-perm', 'value'),
-     State('carter-tracy-water-visc', 'value')]
+     State('carter-tracy-water-visc', 'value'),
+     State('session-id', 'data')]
 )
 def update_output_tank(n_clicks,
                        tank_name,
@@ -1901,7 +3612,8 @@ def update_output_tank(n_clicks,
                        carter_tracy_aq_thickness,
                        carter_tracy_theta,
                        carter_tracy_aq_perm,
-                       carter_tracy_water_visc):
+                       carter_tracy_water_visc,
+                       session_id):
     if n_clicks > 0:
         if not all([tank_name,
                     initial_pressure,
@@ -1915,7 +3627,15 @@ def update_output_tank(n_clicks,
                 style={'color': 'red'}
             )
 
-        global global_wells_info, global_oil_model, global_water_model, global_tank, global_tank_df_press
+        wells_info = get_session_data(session_id, 'wells_info')
+        oil_model = get_session_data(session_id, 'oil_model')
+        water_model = get_session_data(session_id, 'water_model')
+
+        if wells_info is None or oil_model is None or water_model is None:
+            return html.Div(
+                "Please submit the Well and Fluid Models modules first.",
+                style={'color': 'red'}
+            )
 
         # Set aquifer to None if 'None' is selected
         if aquifer_model == 'None':
@@ -1945,17 +3665,23 @@ def update_output_tank(n_clicks,
             )
             name_aquifer = 'Carter Tracy Model'
 
-        global_tank = pt.Tank(
+        tank = pt.Tank(
             name=tank_name,
-            wells=global_wells_info,
-            oil_model=global_oil_model,
-            water_model=global_water_model,
+            wells=wells_info,
+            oil_model=oil_model,
+            water_model=water_model,
             pi=initial_pressure,
             swo=initial_water_saturation,
             cw=water_compressibility,
             cf=formation_compressibility,
             aquifer=aquifer_model
         )
+        set_session_data(session_id, 'tank', tank)
+        # Identifies this tank in the keys of the analysis results
+        set_session_data(session_id, 'tank_key', str(uuid.uuid4()))
+        # Files of the wells of the tank, for their saved interpolations
+        set_session_data(session_id, 'tank_wells_key',
+                         get_session_data(session_id, 'wells_key'))
 
         # Tank Information Display
         tank_info_display = html.Div(
@@ -1964,7 +3690,7 @@ def update_output_tank(n_clicks,
                     [
                         # Title Section
                         html.H4(
-                            f"{global_tank.name}",
+                            f"{tank.name}",
                             style={
                                 'textAlign': 'center',
                                 'marginBottom': '20px',
@@ -2123,6 +3849,1129 @@ def update_output_tank(n_clicks,
     return ""
 
 
+"--------------------------- Analysis Results ------------------------------"
+# The material balance of an analysis is computed once and every frame used by
+# the figures is derived from it. The results are kept in the session store,
+# keyed by the tank and the analysis configuration.
+
+
+def analysis_config_key(tank_key, freq, position, smooth, k, s):
+    return hashlib.sha1(
+        repr((tank_key, freq, position, smooth, k, s)).encode()
+    ).hexdigest()
+
+
+def compute_analysis_results(analysis):
+    mat_bal = analysis.mat_bal_df()
+    mat_bal['START_DATETIME'] = pd.to_datetime(mat_bal['START_DATETIME'])
+    mat_bal = mat_bal.sort_values(by='START_DATETIME')
+
+    # Same frames as Analysis.campbell_data and Analysis.havlena_oded_data
+    campbell = pd.DataFrame({
+        'Np': mat_bal['OIL_CUM_TANK'],
+        'F/Eo+Efw': mat_bal['UW'] / (mat_bal['Eo'] + mat_bal['Efw'])
+    })
+    havlena = pd.DataFrame({
+        'Eo+Efw': mat_bal['Eo'] + mat_bal['Efw'],
+        'F-We': mat_bal['UW'] - mat_bal['Cumulative We']
+    })
+
+    pressure = analysis.tank_class.get_pressure_df()
+    pressure['START_DATETIME'] = pd.to_datetime(pressure['START_DATETIME'])
+    pressure = pressure.sort_values(by='START_DATETIME', kind='stable')
+
+    production = analysis.tank_class.get_production_df()
+    production['START_DATETIME'] = pd.to_datetime(
+        production['START_DATETIME'])
+    production = production.sort_values(by='START_DATETIME', kind='stable')
+
+    name_aquifer = ''
+    if isinstance(analysis.tank_class.aquifer, Fetkovich):
+        name_aquifer = 'Fetkovich Model'
+    elif isinstance(analysis.tank_class.aquifer, CarterTracy):
+        name_aquifer = 'Carter Tracy Model'
+
+    return {
+        'tank_name': analysis.tank_class.name,
+        'name_aquifer': name_aquifer,
+        'smooth': analysis.smooth,
+        'mat_bal': mat_bal,
+        'campbell': campbell,
+        'havlena': havlena,
+        'pressure': pressure,
+        'production': production,
+    }
+
+
+def havlena_regression(havlena):
+    # The slope of F-We over Eo+Efw is the original oil in place
+    return stats.linregress(havlena['Eo+Efw'], havlena['F-We'])
+
+
+def get_analysis_results(session_id, analysis, config_key):
+    results = get_session_data(session_id, 'analysis_results')
+    if results is None or results['key'] != config_key:
+        results = compute_analysis_results(analysis)
+        results['key'] = config_key
+        set_session_data(session_id, 'analysis_results', results)
+    return results
+
+
+"--------------------------- Regression Intervals ----------------------------"
+# Confidence intervals of the Campbell and Havlena and Odeh regressions. Each
+# resample is a row of indexes of the points, and the regressions of all the
+# rows are computed at once, in blocks of REGRESSION_BLOCK_SIZE values.
+RESAMPLING_METHODS = ('Bootstrap', 'Jackknife')
+REGRESSION_MAX_RESAMPLES = 100000
+REGRESSION_BLOCK_SIZE = 2 ** 22
+# Points of the x axis where the band is computed
+REGRESSION_BAND_POINTS = 50
+
+
+def regression_interval_options(intervals, resamples, confidence):
+    # None without intervals or with values out of range
+    resamples = batch_number(resamples)
+    confidence = batch_number(confidence)
+    if (intervals not in RESAMPLING_METHODS or confidence is None
+            or not 0 < confidence < 100):
+        return None
+    if intervals == 'Bootstrap' and (resamples is None or resamples < 1):
+        return None
+    return {'method': intervals,
+            'resamples': int(min(resamples or 0, REGRESSION_MAX_RESAMPLES)),
+            'confidence': confidence}
+
+
+def linregress_rows(x, y):
+    # Slope and intercept of the least squares line of each row
+    x_mean = x.mean(axis=1, keepdims=True)
+    y_mean = y.mean(axis=1, keepdims=True)
+    x_dev = x - x_mean
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (x_dev * (y - y_mean)).sum(axis=1) / (x_dev ** 2).sum(axis=1)
+    return slope, y_mean[:, 0] - slope * x_mean[:, 0]
+
+
+def linregress_points(x, y):
+    slope, intercept = linregress_rows(x[None, :], y[None, :])
+    return slope[0], intercept[0]
+
+
+def resampled_fits(x, y, options):
+    n = len(x)
+    if options['method'] == 'Jackknife':
+        # Row i leaves out the point i
+        columns = np.arange(n - 1)
+        index = columns + (columns >= np.arange(n)[:, None])
+        return linregress_rows(x[index], y[index])
+
+    # The same resamples on every submit
+    rng = np.random.default_rng(0)
+    rows = max(1, REGRESSION_BLOCK_SIZE // n)
+    fits = []
+    for start in range(0, options['resamples'], rows):
+        index = rng.integers(0, n, size=(min(rows, options['resamples'] -
+                                             start), n))
+        fits.append(linregress_rows(x[index], y[index]))
+    return (np.concatenate([slope for slope, _ in fits]),
+            np.concatenate([intercept for _, intercept in fits]))
+
+
+def regression_interval(x, y, options):
+    # Intervals of slope and intercept and band of the line, None when there
+    # are too few points
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if options is None or len(x) < 3:
+        return None
+    slope, intercept = linregress_points(x, y)
+    slopes, intercepts = resampled_fits(x, y, options)
+    band_x = np.linspace(x.min(), x.max(), REGRESSION_BAND_POINTS)
+    fit = np.concatenate([[slope, intercept], intercept + slope * band_x])
+    estimates = np.column_stack([slopes, intercepts,
+                                 intercepts[:, None] +
+                                 slopes[:, None] * band_x])
+
+    alpha = (100 - options['confidence']) / 2
+    if options['method'] == 'Bootstrap':
+        low, high = np.nanpercentile(estimates, [alpha, 100 - alpha], axis=0)
+    else:
+        # Jackknife standard error around the fit of all the points
+        n = len(x)
+        error = np.sqrt((n - 1) / n * np.nansum(
+            (estimates - np.nanmean(estimates, axis=0)) ** 2, axis=0))
+        error *= student_t.ppf(1 - alpha / 100, n - 2)
+        low, high = fit - error, fit + error
+    return {
+        'confidence': options['confidence'],
+        'slope': (low[0], high[0]),
+        'intercept': (low[1], high[1]),
+        'x': band_x,
+        'lower': low[2:],
+        'upper': high[2:],
+    }
+
+
+"----------------------------- Robust Regression -----------------------------"
+# Alternatives to least squares for the straight lines of the Campbell and
+# Havlena and Odeh graphs. The points whose residual is more than
+# ROBUST_THRESHOLD times the robust standard deviation of the residuals are
+# outliers, they are left out of the confidence intervals.
+REGRESSION_METHODS = ('Least Squares', 'Theil-Sen', 'Huber', 'RANSAC')
+ROBUST_THRESHOLD = 3
+# Theil-Sen takes the median slope of every pair of points up to this number
+# of pairs, and of as many random pairs above it
+ROBUST_MAX_PAIRS = 10 ** 6
+HUBER_C = 1.345
+HUBER_MAX_ITERATIONS = 50
+RANSAC_TRIALS = 1000
+
+
+def mad_scale(residuals):
+    # Standard deviation of normal residuals from their median absolute
+    # deviation
+    return 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+
+
+def pair_lines(x, y, i, j):
+    # Slope and intercept of the line through the points i and j
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (y[j] - y[i]) / (x[j] - x[i])
+    valid = np.isfinite(slope)
+    return slope[valid], (y[i] - slope * x[i])[valid]
+
+
+def random_pairs(n, size, rng):
+    i = rng.integers(0, n, size)
+    j = rng.integers(0, n, size)
+    return i[i != j], j[i != j]
+
+
+def theil_sen_fit(x, y, rng):
+    n = len(x)
+    if n * (n - 1) // 2 <= ROBUST_MAX_PAIRS:
+        i, j = np.triu_indices(n, 1)
+    else:
+        i, j = random_pairs(n, ROBUST_MAX_PAIRS, rng)
+    slope = np.median(pair_lines(x, y, i, j)[0])
+    return slope, np.median(y - slope * x)
+
+
+def huber_fit(x, y):
+    # Iteratively reweighted least squares from the least squares line
+    slope, intercept = linregress_points(x, y)
+    for _ in range(HUBER_MAX_ITERATIONS):
+        residuals = y - intercept - slope * x
+        scale = mad_scale(residuals)
+        if not scale > 0:
+            break
+        weights = np.minimum(1, HUBER_C * scale / np.maximum(
+            np.abs(residuals), np.finfo(float).tiny))
+        x_mean = np.average(x, weights=weights)
+        y_mean = np.average(y, weights=weights)
+        new_slope = (np.sum(weights * (x - x_mean) * (y - y_mean)) /
+                     np.sum(weights * (x - x_mean) ** 2))
+        new_intercept = y_mean - new_slope * x_mean
+        converged = np.allclose([new_slope, new_intercept],
+                                [slope, intercept], rtol=1e-10, atol=0)
+        slope, intercept = new_slope, new_intercept
+        if converged:
+            break
+    return slope, intercept
+
+
+def ransac_fit(x, y, rng):
+    # The line through a pair of points with the most inliers, fitted again
+    # by least squares to its inliers
+    slope, intercept = linregress_points(x, y)
+    limit = ROBUST_THRESHOLD * mad_scale(y - intercept - slope * x)
+    slopes, intercepts = pair_lines(x, y,
+                                    *random_pairs(len(x), RANSAC_TRIALS, rng))
+    if not len(slopes):
+        return slope, intercept
+    # Inliers of every candidate line, in blocks of rows
+    rows = max(1, REGRESSION_BLOCK_SIZE // len(x))
+    counts = []
+    for start in range(0, len(slopes), rows):
+        residuals = (y - intercepts[start:start + rows, None] -
+                     slopes[start:start + rows, None] * x)
+        counts.append((np.abs(residuals) <= limit).sum(axis=1))
+    best = np.argmax(np.concatenate(counts))
+    inliers = np.abs(y - intercepts[best] - slopes[best] * x) <= limit
+    if inliers.sum() < 2:
+        return slope, intercept
+    return linregress_points(x[inliers], y[inliers])
+
+
+def robust_fit(x, y, method):
+    # Slope, intercept and outliers of the line of a robust method
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # The same random pairs on every submit
+    rng = np.random.default_rng(0)
+    if method == 'Theil-Sen':
+        slope, intercept = theil_sen_fit(x, y, rng)
+    elif method == 'Huber':
+        slope, intercept = huber_fit(x, y)
+    else:
+        slope, intercept = ransac_fit(x, y, rng)
+    residuals = y - intercept - slope * x
+    outliers = np.abs(residuals) > ROBUST_THRESHOLD * mad_scale(residuals)
+    return slope, intercept, outliers
+
+
+def regression_line(x, y, options):
+    # Slope, intercept and outliers of the regression method of the options
+    method = options.get('regression')
+    if method in REGRESSION_METHODS[1:] and len(x) > 2:
+        return robust_fit(x, y, method)
+    slope, intercept, r, p, se = stats.linregress(x, y)
+    return slope, intercept, np.zeros(len(x), dtype=bool)
+
+
+def add_regression_points(fig, x, y, outliers):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    fig.add_trace(go.Scatter(
+        x=x[~outliers],
+        y=y[~outliers],
+        mode='markers',
+        marker=dict(color='blue', size=10),
+        name='Data Points'
+    ))
+    if outliers.any():
+        fig.add_trace(go.Scatter(
+            x=x[outliers],
+            y=y[outliers],
+            mode='markers',
+            marker=dict(color='grey', size=10, symbol='x'),
+            name='Outliers'
+        ))
+
+
+def add_confidence_band(fig, interval, color):
+    fig.add_trace(go.Scatter(
+        x=interval['x'],
+        y=interval['lower'],
+        mode='lines',
+        line=dict(width=0),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=interval['x'],
+        y=interval['upper'],
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor=color,
+        name="{:g}% Confidence Band".format(interval['confidence'])
+    ))
+
+
+def analytic_data(tank, mat_bal, poes, aquifer=None):
+    # Analysis.analytic_method(poes, option='data') over the cached material
+    # balance, so the inferred POES can change without recomputing it. The
+    # aquifer replaces the one of the tank.
+    if aquifer is None:
+        aquifer = tank.aquifer
+    press_calc = []
+    if isinstance(aquifer, Fetkovich):
+        press_calc = calculated_pressure_fetkovich(
+            mat_bal['OIL_CUM_TANK'],
+            mat_bal['WATER_CUM_TANK'],
+            tank.cf,
+            tank.water_model.temperature,
+            tank.water_model.salinity,
+            tank.oil_model.data_pvt,
+            aquifer.aq_radius,
+            aquifer.res_radius,
+            aquifer.aq_thickness,
+            aquifer.aq_por,
+            aquifer.theta,
+            aquifer.k,
+            aquifer.water_visc,
+            tank.pi,
+            tank.swo,
+            poes,
+            'Pressure',
+            'Bo',
+        )
+    elif isinstance(aquifer, CarterTracy):
+        press_calc = calculate_pressure_with_carter_tracy(
+            mat_bal['OIL_CUM_TANK'],
+            mat_bal['WATER_CUM_TANK'],
+            tank.cf,
+            tank.water_model.temperature,
+            tank.water_model.salinity,
+            tank.oil_model.data_pvt,
+            aquifer.res_radius,
+            aquifer.aq_thickness,
+            aquifer.aq_por,
+            aquifer.theta,
+            aquifer.aq_perm,
+            aquifer.water_visc,
+            mat_bal['Time_Step'],
+            tank.pi,
+            tank.swo,
+            poes,
+            'Pressure',
+            'Bo',
+        )
+
+    # Add the first date with the initial pressure
+    dates = mat_bal[['START_DATETIME', 'PRESSURE_DATUM']]
+    new_date = mat_bal['START_DATETIME'].min() - pd.Timedelta(days=365)
+    n_row = pd.DataFrame({'START_DATETIME': new_date}, index=[0])
+    data = pd.concat([n_row, dates]).reset_index(drop=True)
+    data.loc[0, 'PRESSURE_DATUM'] = tank.pi
+    data['PRESS_CALC'] = press_calc
+    return data[['START_DATETIME', 'PRESSURE_DATUM', 'PRESS_CALC']]
+
+
+"------------------------------ Analytic Fit ---------------------------------"
+# The Optimize option of the analytic method fits the POES and the size and
+# permeability of the aquifer to the observed pressures by least squares over
+# the vector of pressure residuals. The parameters are fitted as logarithms,
+# so they stay positive and have similar scales. A new submit of the same
+# analysis reuses the last fit, or continues it if it ran out of evaluations.
+ANALYTIC_FIT_MAX_EVALS = int(os.environ.get('PYTANK_ANALYTIC_FIT_MAX_EVALS',
+                                            100))
+# Decades the parameters can move from their starting values
+ANALYTIC_FIT_DECADES = 3
+# Decades from the starting values of the grid that picks the first point of
+# a new fit, the calculated pressures are not monotonic in the aquifer values
+ANALYTIC_FIT_SCAN = (-1, 0, 1)
+# Relative step of the finite differences of the Jacobian, in logarithms
+ANALYTIC_FIT_DIFF_STEP = 1e-2
+# Newton iterations and relative tolerance of the pressure of each time step
+ANALYTIC_NEWTON_ITERATIONS = 50
+ANALYTIC_NEWTON_TOLERANCE = 1e-10
+ANALYTIC_FIT_PARAMETERS = {
+    Fetkovich: {'aq_radius': 'Aquifer Radius [ft]',
+                'k': 'Permeability [darcy]'},
+    CarterTracy: {'aq_thickness': 'Aquifer Thickness [ft]',
+                  'aq_perm': 'Permeability [darcy]'},
+}
+
+
+def fitted_aquifer(aquifer, names, values):
+    aquifer = copy.copy(aquifer)
+    for name, value in zip(names, values):
+        setattr(aquifer, name, value)
+    return aquifer
+
+
+def analytic_influx(tank, aquifer, p, cw, last_press, cum, time, past_time):
+    # Cumulative influx of water of aquifer_fetkovich and
+    # aquifer_carter_tracy, the values of the aquifer can be arrays
+    ct = tank.cf + cw
+    f = aquifer['theta'] / 360
+    if isinstance(tank.aquifer, Fetkovich):
+        wi = (np.pi / 5.615) * (aquifer['aq_radius'] ** 2
+                                - aquifer['res_radius'] ** 2) * (
+            aquifer['aq_thickness'] * aquifer['aq_por'])
+        wei = ct * wi * tank.pi * f
+        rd = aquifer['aq_radius'] / aquifer['res_radius']
+        j = (0.00708 * aquifer['k'] * aquifer['aq_thickness'] * f) / (
+            aquifer['water_visc'] * np.log(np.abs(rd)))
+        pa = tank.pi * (1 - (cum / wei))
+        pr_avg = (last_press + p) / 2
+        return cum + (wei / tank.pi) * (1 - np.exp(
+            (-1 * j * tank.pi * 365) / wei)) * (pa - pr_avg)
+
+    b = 1.119 * aquifer['aq_por'] * ct * (aquifer['res_radius'] ** 2) * (
+        aquifer['aq_thickness'] * f)
+    cte = 0.006328 * aquifer['aq_perm'] / (
+        aquifer['aq_por'] * aquifer['water_visc'] * ct
+        * (aquifer['res_radius'] ** 2))
+    td = time * cte
+    td2 = past_time * cte
+    pr_d = 0.5 * (np.log(td) + 0.80907)
+    pr_deriv = 1 / (2 * td)
+    return cum + (td - td2) * ((b * (tank.pi - p) - cum * pr_deriv)
+                               / (pr_d - td2 * pr_deriv))
+
+
+def analytic_pressures(tank, mat_bal, poes, values):
+    # calculated_pressure_fetkovich and calculate_pressure_with_carter_tracy
+    # for arrays of POES and aquifer values at once. The time steps stay
+    # sequential, each one solved by Newton iterations over all the arrays
+    # instead of an fsolve per value. Pressures that do not converge are NaN.
+    aquifer = {**vars(tank.aquifer), **values}
+    table = pvt_table(tank.oil_model.data_pvt)
+    temperature = tank.water_model.temperature
+    salinity = tank.water_model.salinity
+    boi = interpolate_pvt(table, 'Bo', tank.pi)
+    oil_cum = mat_bal['OIL_CUM_TANK'].to_numpy(dtype=float)
+    water_cum = mat_bal['WATER_CUM_TANK'].to_numpy(dtype=float)
+    times = mat_bal['Time_Step'].to_numpy(dtype=float)
+
+    pressure = np.full(np.shape(poes), float(tank.pi))
+    cum = np.zeros(np.shape(poes))
+    past_time = 0.0
+    calculated = [pressure]
+    for n_p, wp, time in zip(oil_cum, water_cum, times):
+        last_press = pressure
+
+        def ebm(p):
+            cw = comp_bw_nogas(p, temperature, salinity, unit=1)
+            bw = Bo_bw(p, temperature, salinity, unit=1)
+            we = analytic_influx(tank, aquifer, p, cw, last_press, cum, time,
+                                 past_time)
+            bo = interpolate_pvt(table, 'Bo', p)
+            efw = boi * (((cw * tank.swo) + tank.cf) / (1 - tank.swo)) * (
+                tank.pi - p)
+            return poes * ((bo - boi) + efw) + we * bw - (n_p * bo + wp * bw)
+
+        # From the last pressure, like the fsolve of pytank
+        p = last_press.copy()
+        converged = np.zeros(np.shape(p), dtype=bool)
+        with np.errstate(all='ignore'):
+            for _ in range(ANALYTIC_NEWTON_ITERATIONS):
+                value = ebm(p)
+                h = 1e-7 * np.maximum(np.abs(p), 1)
+                step = value * h / (ebm(p + h) - value)
+                p = np.where(converged, p, p - step)
+                converged |= np.abs(step) <= ANALYTIC_NEWTON_TOLERANCE * (
+                    np.abs(p) + 1)
+                if converged.all():
+                    break
+            pressure = np.where(converged, p, np.nan)
+            cw = comp_bw_nogas(pressure, temperature, salinity, unit=1)
+            cum = analytic_influx(tank, aquifer, pressure, cw, last_press,
+                                  cum, time, past_time)
+        past_time = time
+        calculated.append(pressure)
+    return np.stack(calculated, axis=-1)
+
+
+def fit_analytic(tank, mat_bal, poes, start=None, evaluations=0):
+    names = list(ANALYTIC_FIT_PARAMETERS[type(tank.aquifer)])
+    initial = np.log([poes] + [getattr(tank.aquifer, name) for name in names])
+    lower = initial - ANALYTIC_FIT_DECADES * np.log(10)
+    upper = initial + ANALYTIC_FIT_DECADES * np.log(10)
+    if 'aq_radius' in names:
+        # The aquifer surrounds the reservoir
+        i = names.index('aq_radius') + 1
+        lower[i] = max(lower[i], np.log(tank.aquifer.res_radius * 1.01))
+        upper[i] = max(upper[i], lower[i] + 1)
+    observed = mat_bal['PRESSURE_DATUM'].to_numpy(dtype=float)
+    valid = np.isfinite(observed)
+
+    # Residuals of every evaluated point, the scan and the Jacobian evaluate
+    # many points in one call and least_squares reuses them
+    evaluated = {}
+
+    def evaluate(points):
+        values = np.exp(points)
+        calculated = analytic_pressures(
+            tank, mat_bal, values[:, 0],
+            {name: values[:, i + 1] for i, name in enumerate(names)})
+        # The first column is the initial pressure. Unsolved pressures count
+        # as losing the whole initial pressure.
+        errors = np.nan_to_num((calculated[:, 1:] - observed)[:, valid],
+                               nan=tank.pi, posinf=tank.pi, neginf=-tank.pi)
+        for point, error in zip(points, errors):
+            evaluated[point.tobytes()] = error
+        return errors
+
+    def steps(x):
+        # Forward differences of least_squares with diff_step, stepping back
+        # at the upper bounds
+        h = ANALYTIC_FIT_DIFF_STEP * np.maximum(1, np.abs(x))
+        return np.where(x + h > upper, -h, h)
+
+    def residuals(x):
+        if x.tobytes() not in evaluated:
+            # The points of its Jacobian cost almost nothing in the same call
+            evaluate(np.vstack([x, x + np.diag(steps(x))]))
+        return evaluated[x.tobytes()]
+
+    def jacobian(x):
+        h = steps(x)
+        points = x + np.diag(h)
+        missing = [point for point in points
+                   if point.tobytes() not in evaluated]
+        if missing:
+            evaluate(np.array(missing))
+        errors = np.array([evaluated[point.tobytes()] for point in points])
+        return ((errors - residuals(x)) / h[:, np.newaxis]).T
+
+    if start is None:
+        scan = np.array([
+            np.clip(initial + np.log(10) * np.array(offsets), lower, upper)
+            for offsets in itertools.product(ANALYTIC_FIT_SCAN,
+                                             repeat=len(initial))])
+        start = scan[np.argmin(np.sum(evaluate(scan) ** 2, axis=1))]
+    x0 = np.clip(start, lower, upper)
+    fit = optimize.least_squares(residuals, x0, jac=jacobian,
+                                 bounds=(lower, upper),
+                                 max_nfev=ANALYTIC_FIT_MAX_EVALS)
+    values = np.exp(fit.x)
+    aquifer = fitted_aquifer(tank.aquifer, names, values[1:])
+    return {
+        'x': fit.x,
+        # 0 when the evaluations ran out before converging
+        'status': fit.status,
+        # Evaluations of all the submits of the fit
+        'evaluations': evaluations + fit.nfev,
+        'poes': values[0],
+        'parameters': {ANALYTIC_FIT_PARAMETERS[type(tank.aquifer)][name]:
+                       value for name, value in zip(names, values[1:])},
+        'rmse': np.sqrt(np.mean(fit.fun ** 2)),
+        'data': analytic_data(tank, mat_bal, values[0], aquifer),
+    }
+
+
+def get_analytic_fit(session_id, results, tank, poes):
+    key = (results['key'], poes)
+    last = get_session_data(session_id, 'analytic_fit')
+    if last is not None and last['key'] == key and last['status'] > 0:
+        return last
+
+    if poes is None:
+        # The Havlena and Odeh POES, when it is physical
+        poes = havlena_regression(results['havlena']).slope
+        if not poes > 0:
+            return None
+    start = None
+    evaluations = 0
+    if last is not None and last['key'] == key:
+        start = last['x']
+        evaluations = last['evaluations']
+    fit = fit_analytic(tank, results['mat_bal'], poes, start, evaluations)
+    fit['key'] = key
+    set_session_data(session_id, 'analytic_fit', fit)
+    return fit
+
+
+"--------------------------- Analysis Figures ------------------------------"
+# Builders of the figures of the Analysis module. Only the figures of the
+# selected layout are built.
+
+
+def campbell_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    x1_c, y1_c, x2_c, y2_c = options['campbell_points']
+    campbell_custom = options['campbell_custom']
+    data2 = results['campbell']
+    # Campbell Plot
+    fig_campbell = figure_skeleton('Campbell Graph',
+                                   'Np Cumulative Oil Production [MMStb]',
+                                   'F/Eo+Efw',
+                                   f"Campbell of {tank_name}")
+    if campbell_custom == 'Yes':
+        fig_campbell.add_trace(go.Scatter(
+            x=data2["Np"],
+            y=data2["F/Eo+Efw"],
+            mode='markers',
+            marker=dict(color='blue', size=10),
+            name='Data Points'
+        ))
+        # Custom line
+        slope = (y2_c - y1_c) / (x2_c - x1_c)
+        intercept = y1_c - slope * x1_c
+        x_values = np.linspace(min(data2["Np"]), max(data2["Np"]), 100)
+        y_values = slope * x_values + intercept
+        fig_campbell.add_trace(go.Scatter(
+            x=x_values,
+            y=y_values,
+            mode='lines',
+            line=dict(color='red'),
+            name='Custom Line'
+        ))
+
+        fig_campbell.add_annotation(
+            x=data2["Np"].min(),
+            y=data2["F/Eo+Efw"].max(),
+            text="Graph that gives an<br>idea of the energy<br>"
+                 "contribution of an aquifer",
+            showarrow=True,
+            font=dict(size=12, color='black'),
+            bgcolor='grey',
+            bordercolor='black'
+        )
+    else:
+        slope2, intercept2, outliers = regression_line(
+            data2["Np"], data2["F/Eo+Efw"], options)
+        add_regression_points(fig_campbell, data2["Np"], data2["F/Eo+Efw"],
+                              outliers)
+        interval = regression_interval(data2["Np"][~outliers],
+                                       data2["F/Eo+Efw"][~outliers],
+                                       options.get('intervals'))
+        if interval is not None:
+            add_confidence_band(fig_campbell, interval,
+                                'rgba(0, 128, 0, 0.2)')
+        fig_campbell.add_trace(go.Scatter(
+            x=data2["Np"],
+            y=slope2 * np.array(data2["Np"]) + intercept2,
+            mode='lines',
+            line=dict(color='green'),
+            name='Regression Line'
+        ))
+
+        text = ("Graph that gives an<br>idea of the energy"
+                "<br>contribution of an aquifer")
+        if interval is not None:
+            text += ("<br>{:g}% CI Slope: {:.4g} to {:.4g}"
+                     "<br>{:g}% CI Intercept: {:.4g} to {:.4g}").format(
+                interval['confidence'], *interval['slope'],
+                interval['confidence'], *interval['intercept'])
+        if outliers.any():
+            text += f"<br>Outliers: {outliers.sum()}"
+        fig_campbell.add_annotation(
+            x=data2["Np"].min(),
+            y=data2["F/Eo+Efw"].max(),
+            text=text,
+            showarrow=True,
+            font=dict(size=12, color='black'),
+            bgcolor='skyblue',
+            bordercolor='black'
+        )
+    return fig_campbell
+
+
+def havlena_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    x1_h, y1_h, x2_h, y2_h = options['havlena_points']
+    havlena_custom = options['havlena_custom']
+    name_aquifer = results['name_aquifer']
+    # Havlena Plot
+    fig_havlena = figure_skeleton(f'Graphical Method - {name_aquifer}',
+                                  'Eo+Efw', 'F-We',
+                                  f"Havlena and Odeh of {tank_name}")
+    data = results['havlena']
+    if havlena_custom == 'Yes':
+        fig_havlena.add_trace(go.Scatter(
+            x=data["Eo+Efw"],
+            y=data["F-We"],
+            mode='markers',
+            marker=dict(color='blue', size=10),
+            name='Data Points'
+        ))
+        # Custom line with selected points
+        slope = (y2_h - y1_h) / (x2_h - x1_h)
+        intercept = y1_h - slope * x1_h
+        x_values = np.linspace(min(data["Eo+Efw"]), max(data["Eo+Efw"]),
+                               100)
+        y_values = slope * x_values + intercept
+
+        fig_havlena.add_trace(go.Scatter(
+            x=x_values,
+            y=y_values,
+            mode='lines',
+            line=dict(color='green', width=3, dash='dash'),
+            name='Custom Line'
+        ))
+
+        fig_havlena.add_annotation(
+            x=data["Eo+Efw"].min(),
+            y=data["F-We"].max(),
+            text="N [MMStb]: {:.2f}".format(slope / 1000000),
+            showarrow=True,
+            font=dict(size=12, color='black'),
+            bgcolor='yellow',
+            bordercolor='black'
+        )
+    else:
+        slope, intercept, outliers = regression_line(data["Eo+Efw"],
+                                                     data["F-We"], options)
+        add_regression_points(fig_havlena, data["Eo+Efw"], data["F-We"],
+                              outliers)
+        interval = regression_interval(data["Eo+Efw"][~outliers],
+                                       data["F-We"][~outliers],
+                                       options.get('intervals'))
+        if interval is not None:
+            add_confidence_band(fig_havlena, interval,
+                                'rgba(255, 0, 0, 0.2)')
+        fig_havlena.add_trace(go.Scatter(
+            x=data["Eo+Efw"],
+            y=slope * np.array(data["Eo+Efw"]) + intercept,
+            mode='lines',
+            line=dict(color='red'),
+            name='Regression Line'
+        ))
+
+        text = "N [MMStb]: {:.2f}".format(slope / 1000000)
+        if interval is not None:
+            low, high = interval['slope']
+            text += ("<br>{:g}% CI N [MMStb]: {:.2f} to {:.2f}"
+                     "<br>{:g}% CI Intercept: {:.4g} to {:.4g}").format(
+                interval['confidence'], low / 1000000, high / 1000000,
+                interval['confidence'], *interval['intercept'])
+        if outliers.any():
+            text += f"<br>Outliers: {outliers.sum()}"
+        fig_havlena.add_annotation(
+            x=data["Eo+Efw"].min(),
+            y=data["F-We"].max(),
+            text=text,
+            font=dict(size=12, color='black'),
+            bgcolor='yellow',
+            bordercolor='black'
+        )
+    return fig_havlena
+
+
+def analytic_figure(results, options):
+    data_analytic = analytic_data(options['tank'], results['mat_bal'],
+                                  options['inferred_POES'])
+    return analytic_pressure_figure(results, data_analytic)
+
+
+def analytic_fit_figure(results, options):
+    fit = options['analytic_fit']
+    fig_analytic = analytic_pressure_figure(results, fit['data'])
+    lines = ["N [MMStb]: {:.2f}".format(fit['poes'] / 1000000)]
+    lines += ["{}: {:.4g}".format(label, value)
+              for label, value in fit['parameters'].items()]
+    lines.append("RMSE [PSI]: {:.2f}".format(fit['rmse']))
+    lines.append(f"Evaluations: {fit['evaluations']}")
+    if fit['status'] == 0:
+        lines.append("Not converged, submit again to continue")
+    fig_analytic.add_annotation(
+        x=0.02,
+        y=0.98,
+        xref='paper',
+        yref='paper',
+        xanchor='left',
+        yanchor='top',
+        align='left',
+        text='<br>'.join(lines),
+        showarrow=False,
+        font=dict(size=12, color='black'),
+        bgcolor='yellow',
+        bordercolor='black'
+    )
+    return fig_analytic
+
+
+def analytic_pressure_figure(results, data_analytic):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    name_aquifer = results['name_aquifer']
+
+    fig_analytic = figure_skeleton(f"Analytic Method of {tank_name}",
+                                   'Time (Years)', 'Pressure (PSI)',
+                                   f"Pressure vs Time with {name_aquifer}",
+                                   x_type='date')
+
+    # Observed Pressure
+    fig_analytic.add_trace(go.Scatter(
+        x=data_analytic["START_DATETIME"],
+        y=data_analytic["PRESSURE_DATUM"],
+        mode='markers',
+        marker=dict(color='blue', size=10),
+        name='Observed Pressure'
+    ))
+
+    # Calculated Pressure
+    fig_analytic.add_trace(go.Scatter(
+        x=data_analytic["START_DATETIME"],
+        y=data_analytic['PRESS_CALC'],
+        mode='lines',
+        line=dict(color='green'),
+        name='Calculated Pressure'
+    ))
+    fig_analytic.update_layout(yaxis_range=[0, 4000])
+    return fig_analytic
+
+
+def avg_pressure_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    # Average Pressure Data
+    df_press_avg = results['mat_bal']
+
+    fig_avg_vs_t = figure_skeleton("Average Pressure per Date", 'Date',
+                                   'Average Pressure [PSI]',
+                                   f"Average Pressure vs Time of {tank_name}",
+                                   x_type='date')
+
+    if results['smooth']:
+        fig_avg_vs_t.add_trace(go.Scatter(
+            x=df_press_avg['START_DATETIME'],
+            y=df_press_avg['AVG_PRESS'],
+            mode='markers',
+            marker=dict(color='red'),
+            name='Avg Pressure'
+        ))
+        fig_avg_vs_t.add_trace(go.Scatter(
+            x=df_press_avg['START_DATETIME'],
+            y=df_press_avg['PRESSURE_DATUM'],
+            mode='lines',
+            line=dict(color='blue'),
+            name='Avg Pressure (Smoothed)'
+        ))
+    else:
+        fig_avg_vs_t.add_trace(go.Scatter(
+            x=df_press_avg['START_DATETIME'],
+            y=df_press_avg['PRESSURE_DATUM'],
+            mode='markers',
+            marker=dict(color='red'),
+            name='Avg Pressure'
+        ))
+    return fig_avg_vs_t
+
+
+def pressure_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    df_press = results['pressure']
+
+    fig_p_vs_t = figure_skeleton(
+        "Pressure per Date", 'Date', 'Pressure [PSI]',
+        f"Observed Pressure vs Time fof {tank_name}", x_type='date')
+
+    fig_p_vs_t.add_trace(go.Scatter(
+        x=df_press['START_DATETIME'],
+        y=df_press['PRESSURE_DATUM'],
+        mode='markers',
+        marker=dict(color='green'),
+        name='Observed Pressure',
+    ))
+    return fig_p_vs_t
+
+
+def tank_rate_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    df_prod = results['mat_bal'].copy()
+
+    df_prod['OIL_RATE'] = df_prod['OIL_CUM_TANK'].diff().fillna(0)
+    df_prod['WATER_RATE_COL'] = df_prod['WATER_CUM_TANK'].diff().fillna(0)
+
+    fig_fr_time = figure_skeleton(
+        "Production Rates vs Time", 'Date', 'Flow Rate [Stb/year]',
+        f"Flow Rate vs Time (Tank) of {tank_name}", x_type='date')
+
+    fig_fr_time.add_trace(go.Scatter(
+        x=df_prod['START_DATETIME'],
+        y=df_prod['OIL_RATE'],
+        mode='lines',
+        line=dict(color='black'),
+        name='Oil Flow Rate'
+    ))
+
+    fig_fr_time.add_trace(go.Scatter(
+        x=df_prod['START_DATETIME'],
+        y=df_prod['WATER_RATE_COL'],
+        mode='lines',
+        line=dict(color='blue'),
+        name='Water Flow Rate'
+    ))
+    return fig_fr_time
+
+
+def cum_pressure_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    df_press_avg = results['mat_bal'].sort_values(by='PRESSURE_DATUM')
+
+    colors = ["black", "blue"]
+    columns = ['OIL_CUM_TANK', 'WATER_CUM_TANK']
+
+    fig_avg_pressure = figure_skeleton(
+        "Average Pressure vs Cumulative Production", 'Average Pressure',
+        'Cumulative Production',
+        f"AVG Pressure vs Cumulative Production of {tank_name}")
+
+    for i, col in enumerate(columns):
+        fig_avg_pressure.add_trace(go.Scatter(
+            x=df_press_avg['PRESSURE_DATUM'],
+            y=df_press_avg[col],
+            mode='markers',
+            marker=dict(color=colors[i]),
+            name=col
+        ))
+    return fig_avg_pressure
+
+
+def cum_time_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    df_press_avg = results['mat_bal']
+
+    fig_cum_time = figure_skeleton(
+        f"Cumulative Production per Date - {tank_name}", 'Date',
+        'Cumulative Production',
+        f" Cumulative vs Time (Tank) of  {tank_name}", x_type='date')
+    fig_cum_time.update_yaxes(griddash='solid')
+
+    colors = ["black", "blue"]
+    columns = ["OIL_CUM_TANK", "WATER_CUM_TANK"]
+
+    for i, col in enumerate(columns):
+        fig_cum_time.add_trace(go.Scatter(
+            x=df_press_avg['START_DATETIME'],
+            y=df_press_avg[col],
+            mode='lines',
+            line=dict(color=colors[i]),
+            name=col
+        ))
+    return fig_cum_time
+
+
+# Above this number of wells the rates of all the wells are drawn as one
+# trace per fluid
+WELL_TRACES_LIMIT = 20
+
+
+def top_production_wells(df_prod, top_wells):
+    if not top_wells:
+        return df_prod
+    oil_cum = df_prod.groupby('WELL_BORE', sort=False, observed=True)[
+        'OIL_CUM'].max()
+    wells = oil_cum.nlargest(int(top_wells)).index
+    return df_prod[df_prod['WELL_BORE'].isin(wells)]
+
+
+def nan_separated(df_prod):
+    # Rows grouped by well with a NaN row after each well, which breaks the
+    # line between consecutive wells
+    df = df_prod.sort_values(by='WELL_BORE', kind='stable').reset_index(
+        drop=True)
+    breaks = df.groupby('WELL_BORE', sort=False, observed=True).tail(1)
+    breaks = breaks.assign(OIL_RATE=np.nan, WATER_RATE=np.nan)
+    breaks.index = breaks.index + 0.5
+    return pd.concat([df, breaks]).sort_index()
+
+
+def well_rate_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    # Production Data
+    df_prod = top_production_wells(results['production'],
+                                   options.get('top_wells'))
+
+    # Rates of every well in one pass
+    rates = df_prod.groupby('WELL_BORE', sort=False, observed=True)[
+        ['OIL_CUM', 'WATER_CUM']].diff().fillna(0)
+    df_prod = df_prod.assign(OIL_RATE=rates['OIL_CUM'],
+                             WATER_RATE=rates['WATER_CUM'])
+
+    fig_fr_well = figure_skeleton(
+        f"Flow Rate vs Time by Well - {tank_name}", 'Date',
+        'Flow Rate [Stb/year]',
+        f"Flow rate vs Time (by Well) of {tank_name}", x_type='date')
+    colors = px.colors.qualitative.T10
+
+    if df_prod['WELL_BORE'].nunique() > WELL_TRACES_LIMIT:
+        df_lines = nan_separated(df_prod)
+        # Typed arrays, plotly deep copies object arrays element by element
+        dates = df_lines['START_DATETIME'].to_numpy()
+        names = np.asarray(df_lines['WELL_BORE'], dtype=str)
+        fig_fr_well.add_trace(go.Scattergl(
+            x=dates,
+            y=df_lines['OIL_RATE'].to_numpy(),
+            text=names,
+            mode='lines',
+            line=dict(color='black'),
+            name="Oil Rate"
+        ))
+
+        fig_fr_well.add_trace(go.Scattergl(
+            x=dates,
+            y=df_lines['WATER_RATE'].to_numpy(),
+            text=names,
+            mode='lines',
+            line=dict(color='blue', dash='dash'),
+            name="Water Rate"
+        ))
+    else:
+        groups = df_prod.groupby('WELL_BORE', sort=False, observed=True)
+        for i, (well, well_data) in enumerate(groups):
+            dates = well_data['START_DATETIME']
+
+            fig_fr_well.add_trace(go.Scattergl(
+                x=dates,
+                y=well_data['OIL_RATE'],
+                mode='lines',
+                line=dict(color=colors[i % len(colors)]),
+                name=f"Oil Rate - {well}"
+            ))
+
+            fig_fr_well.add_trace(go.Scattergl(
+                x=dates,
+                y=well_data['WATER_RATE'],
+                mode='lines',
+                line=dict(color=colors[i % len(colors)], dash='dash'),
+                name=f"Water Rate - {well}"
+            ))
+    return fig_fr_well
+
+
+def well_cum_figure(results, options):
+    tank_name = results['tank_name'].replace('_', ' ').upper()
+    df_prod_well = results['production'].groupby('WELL_BORE')[
+        ['OIL_CUM', 'WATER_CUM']].sum().reset_index()
+
+    fig_cum_well = figure_skeleton(
+        f"Cumulative Production per Well - {tank_name}", 'Well',
+        'Cumulative Production [Stb]',
+        f"Cumulative Production per Well of {tank_name}")
+
+    bar_width = 0.35
+    r1 = list(range(len(df_prod_well)))
+    r2 = [x + bar_width for x in r1]
+
+    fig_cum_well.add_trace(go.Bar(
+        x=df_prod_well['WELL_BORE'],
+        y=df_prod_well['OIL_CUM'],
+        name='Oil Cumulative',
+        marker=dict(color='black'),
+        width=bar_width
+    ))
+
+    fig_cum_well.add_trace(go.Bar(
+        x=df_prod_well['WELL_BORE'],
+        y=df_prod_well['WATER_CUM'],
+        name='Water Cumulative',
+        marker=dict(color='blue'),
+        width=bar_width
+    ))
+
+    fig_cum_well.update_layout(barmode='group')
+    return fig_cum_well
+
+
+ANALYSIS_FIGURES = {
+    'campbell': campbell_figure,
+    'havlena': havlena_figure,
+    'analytic': analytic_figure,
+    'analytic_fit': analytic_fit_figure,
+    'avg_pressure': avg_pressure_figure,
+    'pressure': pressure_figure,
+    'tank_rate': tank_rate_figure,
+    'cum_pressure': cum_pressure_figure,
+    'cum_time': cum_time_figure,
+    'well_rate': well_rate_figure,
+    'well_cum': well_cum_figure,
+}
+
+# Figure added by each option of the graphic dropdown
+GRAPHIC_FIGURES = {
+    'Observed Pressure vs Time': 'pressure',
+    'Flow Rate vs Time (Tank)': 'tank_rate',
+    'Cumulative Production vs Pressure': 'cum_pressure',
+    'Cumulative Production vs Time (Tank)': 'cum_time',
+    'Flow Rate vs Time (by Well)': 'well_rate',
+    'Cumulative Production per well': 'well_cum',
+}
+
+
+def analysis_figure_names(analytic_method, aquifer):
+    if analytic_method == 'Yes':
+        return ['havlena', 'analytic', 'avg_pressure']
+    elif analytic_method == 'Optimize':
+        return ['havlena', 'analytic_fit', 'avg_pressure']
+    elif aquifer is None:
+        return ['campbell', 'havlena', 'avg_pressure']
+    return ['havlena', 'avg_pressure']
+
+
+def graphic_graphs(results, graphic, top_wells):
+    if graphic not in GRAPHIC_FIGURES:
+        return []
+    # The graphic figures only depend on the analysis results
+    figure = ANALYSIS_FIGURES[GRAPHIC_FIGURES[graphic]](
+        results, {'top_wells': top_wells})
+    return [dcc.Graph(figure=typed_figure(figure))]
+
+
 "--------------------------- Callback Analysis -----------------------------"
 
 
@@ -2159,12 +5008,24 @@ def update_additional_inputs_havlena(analytic_model):
         return {'display': 'none'}
 
 
+@app.callback(
+    Output('intervals-input', 'style'),
+    Input('regression-intervals', 'value')
+)
+def update_additional_inputs_intervals(intervals):
+    if intervals in RESAMPLING_METHODS:
+        return {'display': 'block'}
+    else:
+        return {'display': 'none'}
+
+
 @app.callback(
     Output('analytic-input', 'style'),
     Input('analytic-method', 'value')
 )
 def update_additional_inputs_poes(analytic_model):
-    if analytic_model == 'Yes':
+    # The optimization starts from the inferred POES
+    if analytic_model in ('Yes', 'Optimize'):
         return {'display': 'block'}
     else:
         return {'display': 'none'}
@@ -2189,11 +5050,20 @@ def update_additional_inputs_poes(analytic_model):
     State('y1-h', 'value'),
     State('x2-h', 'value'),
     State('y2-h', 'value'),
+    State('regression-method', 'value'),
+    State('regression-intervals', 'value'),
+    State('resamples', 'value'),
+    State('confidence', 'value'),
     State('analytic-method', 'value'),
     State('inferred-POES', 'value'),
-    State('graphic', 'value')
+    State('graphic', 'value'),
+    State('top-wells', 'value'),
+    State('session-id', 'data'),
+    background=True,
+    **job_controls('analysis')
 )
-def display_analysis_data(n_clicks,
+def display_analysis_data(set_progress,
+                          n_clicks,
                           freq_analysis,
                           position,
                           smooth,
@@ -2209,1108 +5079,1523 @@ def display_analysis_data(n_clicks,
                           y1_h,
                           x2_h,
                           y2_h,
+                          regression,
+                          intervals,
+                          resamples,
+                          confidence,
                           analytic_method,
                           inferred_POES,
-                          graphic):
+                          graphic,
+                          top_wells,
+                          session_id):
     if n_clicks > 0:
         if not (freq_analysis and position and smooth):
             return html.Div("Please ensure all fields are filled out "
                             "correctly.",
-                            style={'color': 'red'})
-
-        # Tank
-        global global_tank, global_analysis
-
-        # Frequency and position
-        freq_analysis = str(freq_analysis) if freq_analysis else None
-        position = str(position) if position else None
-
-        # smooth
-        if smooth == 'Yes':
-            smooth = True
-
-        elif smooth == 'No':
-            smooth = False
-
-        global_analysis = pt.Analysis(
-            tank_class=global_tank,
-            freq=freq_analysis,
-            position=position,
-            smooth=smooth,
-            s=s,
-            k=k
-        )
-
-        name_aquifer = ''
-        if isinstance(global_analysis.tank_class.aquifer, Fetkovich):
-            name_aquifer = 'Fetkovich Model'
-        elif isinstance(global_analysis.tank_class.aquifer, CarterTracy):
-            name_aquifer = 'Carter Tracy Model'
-
-        '--------------------- Campbell Plot ---------------------------'
-        data2 = global_analysis.campbell_data()
-        # Campbell Plot
-        fig_campbell = go.Figure()
-        if campbell_custom == 'Yes':
-            fig_campbell.add_trace(go.Scatter(
-                x=data2["Np"],
-                y=data2["F/Eo+Efw"],
-                mode='markers',
-                marker=dict(color='blue', size=10),
-                name='Data Points'
-            ))
-            # Custom line
-            slope = (y2_c - y1_c) / (x2_c - x1_c)
-            intercept = y1_c - slope * x1_c
-            x_values = np.linspace(min(data2["Np"]), max(data2["Np"]), 100)
-            y_values = slope * x_values + intercept
-            fig_campbell.add_trace(go.Scatter(
-                x=x_values,
-                y=y_values,
-                mode='lines',
-                line=dict(color='red'),
-                name='Custom Line'
-            ))
-
-            fig_campbell.update_layout(
-                title='Campbell Graph',
-                xaxis=dict(
-                    title='Np Cumulative Oil Production [MMStb]',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                yaxis=dict(
-                    title='F/Eo+Efw',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                template='plotly_white',
-                annotations=[
-                    go.layout.Annotation(
-                        x=data2["Np"].min(),
-                        y=data2["F/Eo+Efw"].max(),
-                        text="Graph that gives an<br>idea of the energy<br>"
-                             "contribution of an aquifer",
-                        showarrow=True,
-                        font=dict(size=12, color='black'),
-                        bgcolor='grey',
-                        bordercolor='black'
-                    ),
-                    go.layout.Annotation(
-                        text=f"Campbell of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                        xref="paper",
-                        yref="paper",
-                        x=0.5,
-                        xanchor="center",
-                        y=1.15,
-                        yanchor="top",
-                        showarrow=False,
-                        font=dict(size=22)
-                    )
-                ]
-            )
-        else:
-            fig_campbell.add_trace(go.Scatter(
-                x=data2["Np"],
-                y=data2["F/Eo+Efw"],
-                mode='markers',
-                marker=dict(color='blue', size=10),
-                name='Data Points'
-            ))
-
-            slope2, intercept2, r, p, se = stats.linregress(data2["Np"],
-                                                            data2["F/Eo+Efw"])
-            fig_campbell.add_trace(go.Scatter(
-                x=data2["Np"],
-                y=slope2 * np.array(data2["Np"]) + intercept2,
-                mode='lines',
-                line=dict(color='green'),
-                name='Regression Line'
-            ))
-
-            fig_campbell.update_layout(
-                title='Campbell Graph',
-                xaxis=dict(
-                    title='Np Cumulative Oil Production [MMStb]',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                yaxis=dict(
-                    title='F/Eo+Efw',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                template='plotly_white',
-                annotations=[
-                    go.layout.Annotation(
-                        x=data2["Np"].min(),
-                        y=data2["F/Eo+Efw"].max(),
-                        text="Graph that gives an<br>idea of the energy"
-                             "<br>contribution of an aquifer",
-                        showarrow=True,
-                        font=dict(size=12, color='black'),
-                        bgcolor='skyblue',
-                        bordercolor='black'
-                    ),
-                    go.layout.Annotation(
-                        text=f"Campbell of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                        xref="paper",
-                        yref="paper",
-                        x=0.5,
-                        xanchor="center",
-                        y=1.15,
-                        yanchor="top",
-                        showarrow=False,
-                        font=dict(size=22)
-                    )
-                ]
-            )
-
-        '---------------------- Havlena and Odeh --------------------------'
-        # Havlena Plot
-        fig_havlena = go.Figure()
-        data = global_analysis.havlena_oded_data()
-        if havlena_custom == 'Yes':
-            fig_havlena.add_trace(go.Scatter(
-                x=data["Eo+Efw"],
-                y=data["F-We"],
-                mode='markers',
-                marker=dict(color='blue', size=10),
-                name='Data Points'
-            ))
-            # Custom line with selected points
-            slope = (y2_h - y1_h) / (x2_h - x1_h)
-            intercept = y1_h - slope * x1_h
-            x_values = np.linspace(min(data["Eo+Efw"]), max(data["Eo+Efw"]),
-                                   100)
-            y_values = slope * x_values + intercept
-
-            fig_havlena.add_trace(go.Scatter(
-                x=x_values,
-                y=y_values,
-                mode='lines',
-                line=dict(color='green', width=3, dash='dash'),
-                name='Custom Line'
-            ))
+                            style={'color': 'red'})
 
-            fig_havlena.update_layout(
-                title=f'Graphical Method - {name_aquifer}',
-                xaxis=dict(
-                    title='Eo+Efw',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                yaxis=dict(
-                    title='F-We',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                template='plotly_white',
-                annotations=[
-                    go.layout.Annotation(
-                        x=data["Eo+Efw"].min(),
-                        y=data["F-We"].max(),
-                        text="N [MMStb]: {:.2f}".format(slope / 1000000),
-                        showarrow=True,
-                        font=dict(size=12, color='black'),
-                        bgcolor='yellow',
-                        bordercolor='black'
-                    ),
-                    go.layout.Annotation(
-                        text=f"Havlena and Odeh of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                        xref="paper",
-                        yref="paper",
-                        x=0.5,
-                        xanchor="center",
-                        y=1.15,
-                        yanchor="top",
-                        showarrow=False,
-                        font=dict(size=22)
-                    )
-                ]
-            )
-        else:
-            fig_havlena.add_trace(go.Scatter(
-                x=data["Eo+Efw"],
-                y=data["F-We"],
-                mode='markers',
-                marker=dict(color='blue', size=10),
-                name='Data Points'
-            ))
+        # Tank
+        tank = get_session_data(session_id, 'tank')
+        if tank is None:
+            return html.Div("Please submit the Tank module first.",
+                            style={'color': 'red'})
 
-            slope, intercept, r, p, se = stats.linregress(data["Eo+Efw"],
-                                                          data["F-We"])
-            fig_havlena.add_trace(go.Scatter(
-                x=data["Eo+Efw"],
-                y=slope * np.array(data["Eo+Efw"]) + intercept,
-                mode='lines',
-                line=dict(color='red'),
-                name='Regression Line'
-            ))
+        # Frequency and position
+        freq_analysis = str(freq_analysis) if freq_analysis else None
+        position = str(position) if position else None
 
-            fig_havlena.update_layout(
-                title=f'Graphical Method - {name_aquifer}',
-                xaxis=dict(
-                    title='Eo+Efw',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                yaxis=dict(
-                    title='F-We',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True
-                ),
-                template='plotly_white',
-                annotations=[
-                    go.layout.Annotation(
-                        x=data["Eo+Efw"].min(),
-                        y=data["F-We"].max(),
-                        text="N [MMStb]: {:.2f}".format(slope / 1000000),
-                        font=dict(size=12, color='black'),
-                        bgcolor='yellow',
-                        bordercolor='black'
-                    ),
-                    go.layout.Annotation(
-                        text=f"Havlena and Odeh of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                        xref="paper",
-                        yref="paper",
-                        x=0.5,
-                        xanchor="center",
-                        y=1.15,
-                        yanchor="top",
-                        showarrow=False,
-                        font=dict(size=22)
-                    )
-                ]
-            )
-        '--------------- Observed Pressure vs Time Plot --------------------'
-        df_press = global_analysis.tank_class.get_pressure_df()
-        df_press["START_DATETIME"] = pd.to_datetime(df_press['START_DATETIME'])
-        df_press = df_press.sort_values(by='START_DATETIME')
+        # smooth
+        if smooth == 'Yes':
+            smooth = True
 
-        fig_p_vs_t = go.Figure()
+        elif smooth == 'No':
+            smooth = False
 
-        fig_p_vs_t.add_trace(go.Scatter(
-            x=df_press['START_DATETIME'],
-            y=df_press['PRESSURE_DATUM'],
-            mode='markers',
-            marker=dict(color='green'),
-            name='Observed Pressure',
-        ))
+        # No value shows an indeterminate bar during the material balance
+        set_progress((None, None))
 
-        fig_p_vs_t.update_layout(
-            title=f"Pressure per Date",
-            xaxis=dict(
-                title='Date',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                linecolor='black',
-                gridwidth=1,
-                griddash='dash',
-                mirror=True,
-                type='date'
-            ),
-            yaxis=dict(
-                title='Pressure [PSI]',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"Observed Pressure vs Time fof {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
+        analysis = tank_analysis(
+            tank_class=tank,
+            wells_key=get_session_data(session_id, 'tank_wells_key'),
+            freq=freq_analysis,
+            position=position,
+            smooth=smooth,
+            s=s,
+            k=k
         )
-        "-------------------- Avg Pressure vs Time ------------------------"
-        # Average Pressure Data
-        df_press_avg = global_analysis.mat_bal_df()
-        df_press_avg['START_DATETIME'] = pd.to_datetime(
-            df_press_avg['START_DATETIME'])
-        df_press_avg = df_press_avg.sort_values(by='START_DATETIME')
-
-        fig_avg_vs_t = go.Figure()
-
-        if global_analysis.smooth:
-            fig_avg_vs_t.add_trace(go.Scatter(
-                x=df_press_avg['START_DATETIME'],
-                y=df_press_avg['AVG_PRESS'],
-                mode='markers',
-                marker=dict(color='red'),
-                name='Avg Pressure'
-            ))
-            fig_avg_vs_t.add_trace(go.Scatter(
-                x=df_press_avg['START_DATETIME'],
-                y=df_press_avg['PRESSURE_DATUM'],
-                mode='lines',
-                line=dict(color='blue'),
-                name='Avg Pressure (Smoothed)'
-            ))
-        else:
-            fig_avg_vs_t.add_trace(go.Scatter(
-                x=df_press_avg['START_DATETIME'],
-                y=df_press_avg['PRESSURE_DATUM'],
-                mode='markers',
-                marker=dict(color='red'),
-                name='Avg Pressure'
-            ))
+        set_session_data(session_id, 'analysis', analysis)
+
+        config_key = analysis_config_key(
+            get_session_data(session_id, 'tank_key'),
+            freq_analysis, position, smooth, k, s)
+        results = get_analysis_results(session_id, analysis, config_key)
+
+        options = {
+            'tank': analysis.tank_class,
+            'campbell_custom': campbell_custom,
+            'campbell_points': (x1_c, y1_c, x2_c, y2_c),
+            'havlena_custom': havlena_custom,
+            'havlena_points': (x1_h, y1_h, x2_h, y2_h),
+            'regression': regression,
+            'intervals': regression_interval_options(intervals, resamples,
+                                                     confidence),
+            'inferred_POES': inferred_POES,
+            'top_wells': top_wells,
+        }
+        if analytic_method == 'Optimize':
+            if analysis.tank_class.aquifer is None:
+                return html.Div("The optimization of the analytic method "
+                                "needs a tank with an aquifer model.",
+                                style={'color': 'red'})
+            options['analytic_fit'] = get_analytic_fit(
+                session_id, results, analysis.tank_class, inferred_POES)
+            if options['analytic_fit'] is None:
+                return html.Div("Please enter an inferred POES to start the "
+                                "optimization.",
+                                style={'color': 'red'})
+        names = analysis_figure_names(analytic_method,
+                                      analysis.tank_class.aquifer)
+        graphs = []
+        for i, name in enumerate(names):
+            set_progress((str(i), str(len(names) + 1)))
+            graphs.append(dcc.Graph(figure=typed_figure(
+                ANALYSIS_FIGURES[name](results, options))))
+        set_progress((str(len(names)), str(len(names) + 1)))
+        graphs.append(html.Div(graphic_graphs(results, graphic, top_wells),
+                               id='analysis-graphic-content'))
+        return html.Div(
+            graphs,
+            style={
+                'display': 'flex',
+                'flexDirection': 'column',
+                'overflowY': 'auto',
+                'maxHeight': 'calc(100vh - 400px)'
+            })
 
-        fig_avg_vs_t.update_layout(
-            title=f"Average Pressure per Date",
-            xaxis=dict(
-                title='Date',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True,
-                type='date'
-            ),
-            yaxis=dict(
-                title='Average Pressure [PSI]',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"Average Pressure vs Time of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
+    return html.Div(['Submit the form to see the analysis results.'])
+
+
+@app.callback(
+    Output('analysis-graphic-content', 'children'),
+    Input('graphic', 'value'),
+    Input('top-wells', 'value'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+def update_analysis_graphic(graphic, top_wells, session_id):
+    # Swaps the graphic of the last submitted analysis without running it
+    # again
+    results = get_session_data(session_id, 'analysis_results')
+    if results is None:
+        return dash.no_update
+    return graphic_graphs(results, graphic, top_wells)
+
+
+"------------------------------ Batch Analysis -------------------------------"
+# The tanks of the batch table are built and analyzed in a pool of processes.
+# Every process of the pool loads the wells of the Well module from their
+# Feather files and the fluid models from the session store once, and then
+# analyzes the tanks it is given.
+BATCH_WORKERS = int(os.environ.get('PYTANK_BATCH_WORKERS',
+                                   os.cpu_count() or 1))
+# Chunks of work given to each process of the pools of the Sensitivity and
+# Monte Carlo modules, more chunks report the progress more often
+POOL_CHUNKS_PER_WORKER = 4
+TANK_COLUMNS = ['pi', 'swo', 'cw', 'cf']
+AQUIFER_COLUMNS = {
+    'None': [],
+    'Fetkovich': ['aq_radius', 'res_radius', 'aq_thickness', 'aq_por', 'ct',
+                  'theta', 'k', 'water_visc'],
+    'Carter Tracy': ['aq_por', 'ct', 'res_radius', 'aq_thickness', 'theta',
+                     'k', 'water_visc'],
+}
+
+batch_context = {}
+
+
+def init_batch_worker(session_id, wells_key):
+    batch_context['wells_key'] = wells_key
+    # None when the wells expired from the cache
+    batch_context['wells'] = load_wells(wells_key)
+    batch_context['oil_model'] = get_session_data(session_id, 'oil_model')
+    batch_context['water_model'] = get_session_data(session_id, 'water_model')
+
+
+def batch_number(value):
+    # Empty and non numeric cells of the table are missing values
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+# Text values of smooth, like the options of the Analysis module
+SMOOTH_VALUES = {'Yes': True, 'No': False}
+
+
+def smooth_setting(value):
+    # Boolean of a smooth value and its error, a missing value is No
+    if value is None:
+        return False, None
+    if isinstance(value, bool):
+        return value, None
+    if isinstance(value, str) and value in SMOOTH_VALUES:
+        return SMOOTH_VALUES[value], None
+    return None, 'smooth must be true, false, "Yes" or "No".'
+
+
+def analysis_settings(freq, position, smooth, k=None, s=None):
+    # Keyword arguments of pt.Analysis, the spline is only set when smoothing
+    smooth, error = smooth_setting(smooth)
+    if error is not None:
+        raise ValueError(error)
+    settings = {'freq': str(freq), 'position': str(position),
+                'smooth': smooth}
+    if settings['smooth']:
+        settings.update(k=k, s=s)
+    return settings
+
+
+def split_wells(wells):
+    # Names of a list of wells or of a text of wells separated by commas
+    if not isinstance(wells, list):
+        wells = str(wells or '').split(',')
+    return [str(well).strip() for well in wells if str(well).strip()]
+
+
+def parse_batch_row(row, default_wells):
+    # Returns the definition of the tank and the error of the row
+    name = str(row.get('name') or '').strip()
+    if not name:
+        return None, 'The tank has no name.'
+    aquifer = row.get('aquifer') or 'None'
+    if aquifer not in AQUIFER_COLUMNS:
+        return None, f'Unknown aquifer model {aquifer}.'
+
+    tank = {'name': name, 'aquifer': aquifer}
+    for column in TANK_COLUMNS + AQUIFER_COLUMNS[aquifer]:
+        tank[column] = batch_number(row.get(column))
+    missing = [column for column, value in tank.items() if value is None]
+    if missing:
+        return None, f"Missing values: {', '.join(missing)}."
+
+    tank['wells'] = split_wells(row.get('wells')) or default_wells
+    return tank, None
+
+
+def batch_aquifer(tank):
+    if tank['aquifer'] == 'Fetkovich':
+        return pt.Fetkovich(
+            aq_radius=tank['aq_radius'],
+            res_radius=tank['res_radius'],
+            aq_thickness=tank['aq_thickness'],
+            aq_por=tank['aq_por'],
+            ct=tank['ct'],
+            theta=tank['theta'],
+            k=tank['k'],
+            water_visc=tank['water_visc'],
+        )
+    if tank['aquifer'] == 'Carter Tracy':
+        return pt.CarterTracy(
+            aq_por=tank['aq_por'],
+            ct=tank['ct'],
+            res_radius=tank['res_radius'],
+            aq_thickness=tank['aq_thickness'],
+            theta=tank['theta'],
+            aq_perm=tank['k'],
+            water_visc=tank['water_visc'],
         )
+    return None
+
+
+def build_tank(tank, wells, oil_model, water_model):
+    return pt.Tank(
+        name=tank['name'],
+        wells=wells,
+        oil_model=oil_model,
+        water_model=water_model,
+        pi=tank['pi'],
+        swo=tank['swo'],
+        cw=tank['cw'],
+        cf=tank['cf'],
+        aquifer=batch_aquifer(tank)
+    )
+
+
+def batch_summary_row(name, wells=0, aquifer='', fit=None, points=0,
+                      error=''):
+    return {
+        'Tank': name,
+        'Wells': wells,
+        'Aquifer': aquifer,
+        'N [MMStb]': None if fit is None else fit.slope / 1000000,
+        'Intercept': None if fit is None else fit.intercept,
+        'R2': None if fit is None else fit.rvalue ** 2,
+        'p-value': None if fit is None else fit.pvalue,
+        'Slope Std. Error [MMStb]':
+            None if fit is None else fit.stderr / 1000000,
+        'Points': points,
+        'Error': error,
+    }
+
+
+def run_batch_tank(tank, settings):
+    # Runs in a process of the pool
+    if batch_context['wells'] is None:
+        return batch_summary_row(tank['name'], aquifer=tank['aquifer'],
+                                 error='The uploaded files expired. Please '
+                                       'upload them again.')
+    wells = pt.search_wells(wells=batch_context['wells'],
+                            well_names=tank['wells'])
+    if not wells:
+        return batch_summary_row(tank['name'], aquifer=tank['aquifer'],
+                                 error='None of the wells were found.')
+    try:
+        analysis = tank_analysis(
+            tank_class=build_tank(tank, wells, batch_context['oil_model'],
+                                  batch_context['water_model']),
+            wells_key=batch_context['wells_key'],
+            **settings
+        )
+        results = compute_analysis_results(analysis)
+        fit = havlena_regression(results['havlena'])
+    except Exception as e:
+        return batch_summary_row(tank['name'], len(wells), tank['aquifer'],
+                                 error=str(e))
+    return batch_summary_row(tank['name'], len(wells), tank['aquifer'], fit,
+                             len(results['havlena']))
+
+
+def results_table(table_id, df, page_size=250):
+    # Text columns as they are, counts without format and the other numbers
+    # with 4 significant digits, N with 2 decimals like the figures
+    columns = []
+    for column in df.columns:
+        spec = {'name': column, 'id': column}
+        if column == 'N [MMStb]':
+            spec.update(type='numeric',
+                        format=Format(precision=2, scheme=Scheme.fixed))
+        elif pd.api.types.is_float_dtype(df[column]):
+            spec.update(type='numeric',
+                        format=Format(precision=4,
+                                      scheme=Scheme.decimal_or_exponent))
+        columns.append(spec)
+    return dash_table.DataTable(
+        id=table_id,
+        columns=columns,
+        data=df.to_dict('records'),
+        sort_action='native',
+        page_action='native',
+        page_size=page_size,
+        export_format='csv',
+        style_table={'overflowX': 'auto'},
+        style_header={
+            'backgroundColor': 'rgb(230, 230, 230)',
+            'fontWeight': 'bold',
+            'textAlign': 'center'
+        },
+        style_cell={
+            'textAlign': 'center',
+            'whiteSpace': 'normal',
+            'height': 'auto',
+        },
+        style_data_conditional=[{
+            'if': {'filter_query': '{Error} != ""'},
+            'color': 'red'
+        }] if 'Error' in df.columns else [],
+    )
+
+
+"--------------------------- Callback Batch ----------------------------------"
+
+
+@app.callback(
+    Output('batch-table', 'data'),
+    Output('batch-upload-status', 'children'),
+    Input('add-batch-tank-button', 'n_clicks'),
+    Input('upload-batch-data', 'contents'),
+    State('upload-batch-data', 'filename'),
+    State('batch-table', 'data'),
+    State('batch-table', 'columns'),
+    prevent_initial_call=True
+)
+def update_batch_table(add_clicks, contents, filename, rows, columns):
+    ctx = dash.callback_context
+    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    column_ids = [column['id'] for column in columns]
 
-        '-------------- Flow rate vs Time (Tank) --------------'
-        df_prod = global_analysis.mat_bal_df()
-        df_prod['START_DATETIME'] = pd.to_datetime(df_prod['START_DATETIME'])
-        df_prod = df_prod.sort_values(by='START_DATETIME')
+    if button_id == 'add-batch-tank-button':
+        new_row = dict.fromkeys(column_ids)
+        new_row['aquifer'] = 'None'
+        return rows + [new_row], dash.no_update
 
-        df_prod['OIL_RATE'] = df_prod['OIL_CUM_TANK'].diff().fillna(0)
-        df_prod['WATER_RATE_COL'] = df_prod['WATER_CUM_TANK'].diff().fillna(0)
+    try:
+        content = base64.b64decode(contents.split(',')[1])
+        df = pd.read_csv(io.BytesIO(content))
+    except Exception:
+        return dash.no_update, (f'There was an error processing '
+                                f'{filename}.')
+    df.columns = df.columns.str.strip()
+    df = df.reindex(columns=column_ids).astype(object)
+    df = df.where(df.notna(), None)
+    df['aquifer'] = df['aquifer'].fillna('None')
+    return (df.to_dict('records'),
+            f'{filename} uploaded successfully! {len(df)} tanks.')
 
-        fig_fr_time = go.Figure()
 
-        fig_fr_time.add_trace(go.Scatter(
-            x=df_prod['START_DATETIME'],
-            y=df_prod['OIL_RATE'],
-            mode='lines',
-            line=dict(color='black'),
-            name='Oil Flow Rate'
-        ))
+@app.callback(
+    Output('batch-info-content', 'children'),
+    Input('batch-submit-button', 'n_clicks'),
+    State('batch-table', 'data'),
+    State('batch-freq', 'value'),
+    State('batch-position', 'value'),
+    State('batch-smooth', 'value'),
+    State('batch-k', 'value'),
+    State('batch-s', 'value'),
+    State('session-id', 'data'),
+    background=True,
+    **job_controls('batch')
+)
+def display_batch_data(set_progress, n_clicks, rows, freq, position, smooth,
+                       k, s, session_id):
+    if n_clicks > 0:
+        if not (rows and freq and position and smooth) or (
+                smooth == 'Yes' and (k is None or s is None)):
+            return html.Div("Please ensure all fields are filled out "
+                            "correctly.",
+                            style={'color': 'red'})
 
-        fig_fr_time.add_trace(go.Scatter(
-            x=df_prod['START_DATETIME'],
-            y=df_prod['WATER_RATE_COL'],
-            mode='lines',
-            line=dict(color='blue'),
-            name='Water Flow Rate'
-        ))
+        wells_key = get_session_data(session_id, 'wells_key')
+        wells_info = get_session_data(session_id, 'wells_info')
+        if wells_key is None or get_session_data(
+                session_id, 'oil_model') is None:
+            return html.Div(
+                "Please submit the Well and Fluid Models modules first.",
+                style={'color': 'red'}
+            )
 
-        fig_fr_time.update_layout(
-            title="Production Rates vs Time",
-            xaxis=dict(
-                title='Date',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True,
-                type='date'
-            ),
-            yaxis=dict(
-                title='Flow Rate [Stb/year]',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"Flow Rate vs Time (Tank) of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
+        settings = analysis_settings(freq, position, smooth == 'Yes', k, s)
+
+        # Rows with errors are reported without running them
+        summary = []
+        tanks = {}
+        default_wells = [well.name for well in wells_info or []]
+        for i, row in enumerate(rows):
+            tank, error = parse_batch_row(row, default_wells)
+            if error:
+                summary.append(batch_summary_row(row.get('name') or '',
+                                                 error=error))
+            else:
+                summary.append(None)
+                tanks[i] = tank
+
+        set_progress(('0', str(len(tanks))))
+        if tanks:
+            with ProcessPoolExecutor(
+                    max_workers=min(BATCH_WORKERS, len(tanks)),
+                    initializer=init_batch_worker,
+                    initargs=(session_id, wells_key)) as executor:
+                futures = {executor.submit(run_batch_tank, tank, settings): i
+                           for i, tank in tanks.items()}
+                for done, future in enumerate(as_completed(futures), 1):
+                    summary[futures[future]] = future.result()
+                    set_progress((str(done), str(len(tanks))))
+
+        summary = pd.DataFrame(summary)
+        set_session_data(session_id, 'batch_results', summary)
+        return results_table('batch-summary-table', summary)
+
+    return html.Div(['Submit the table to see the summary of the tanks.'])
+
+
+"----------------------------- Headless Pipeline -----------------------------"
+# The Well, Fluid Models, Tank and Analysis steps without the Dash UI, for
+# cli.py. The tanks of a configuration are defined like the rows of the batch
+# table. Each process keeps the wells and fluid models of the last files it
+# read, so the tanks of a configuration share them.
+PIPELINE_MEMO_SIZE = 4
+PIPELINE_TABLES = ('mat_bal', 'campbell', 'havlena')
+
+
+@functools.lru_cache(maxsize=PIPELINE_MEMO_SIZE)
+def pipeline_wells(prod_file, press_file, freq_prod, freq_press):
+    return sorted_wells(pt.create_wells(
+        df_prod=parse_csv(prod_file),
+        df_press=parse_csv(press_file),
+        freq_prod=freq_prod,
+        freq_press=freq_press
+    ))
+
+
+@functools.lru_cache(maxsize=PIPELINE_MEMO_SIZE)
+def pipeline_fluid_models(pvt_file, temp_oil, salinity_water, temp_water,
+                          units):
+    return fluid_models(parse_csv(pvt_file), temp_oil, salinity_water,
+                        temp_water, units)
+
+
+def pipeline_options(config, tank_class):
+    # Options of the figures like the defaults of the Analysis module
+    return {
+        'tank': tank_class,
+        'campbell_custom': 'no',
+        'campbell_points': (None,) * 4,
+        'havlena_custom': 'no',
+        'havlena_points': (None,) * 4,
+        'regression': config.get('regression'),
+        'intervals': regression_interval_options(config.get('intervals'),
+                                                 config.get('resamples'),
+                                                 config.get('confidence')),
+        'inferred_POES': config.get('poes'),
+        'top_wells': config.get('top_wells'),
+    }
+
+
+def write_pipeline_results(results, options, directory):
+    os.makedirs(directory, exist_ok=True)
+    for table in PIPELINE_TABLES:
+        results[table].to_csv(os.path.join(directory, f'{table}.csv'),
+                              index=False)
+    # The analytic method of pytank needs an aquifer
+    aquifer = options['tank'].aquifer
+    names = analysis_figure_names(
+        'Yes' if options['inferred_POES'] and aquifer is not None else 'No',
+        aquifer)
+    for name in names + list(GRAPHIC_FIGURES.values()):
+        ANALYSIS_FIGURES[name](results, options).write_html(
+            os.path.join(directory, f'{name}.html'), include_plotlyjs='cdn')
+
+
+def pipeline_folder(name):
+    # Folder of a tank, the name without separators or other characters that
+    # a path cannot have
+    return re.sub(r'[^\w.-]+', '_', name).strip('._') or 'tank'
+
+
+def run_pipeline_tank(config, tank, output_dir):
+    # Runs in a process of the pool, writes the tables and figures of the
+    # tank to its folder of output_dir and returns its summary row
+    try:
+        wells = pt.search_wells(
+            wells=pipeline_wells(config['prod_file'], config['press_file'],
+                                 config.get('freq_prod'),
+                                 config.get('freq_press')),
+            well_names=tank['wells'])
+    except Exception as e:
+        # Missing files, or files without the columns of the Well module
+        return batch_summary_row(tank['name'], aquifer=tank['aquifer'],
+                                 error=f'The wells could not be built: '
+                                       f'{type(e).__name__}: {e}')
+    if not wells:
+        return batch_summary_row(tank['name'], aquifer=tank['aquifer'],
+                                 error='None of the wells were found.')
+    try:
+        oil_model, water_model = pipeline_fluid_models(
+            config['pvt_file'], config['temp_oil'], config['salinity_water'],
+            config['temp_water'], config.get('units', 'Field'))
+        analysis = pt.Analysis(
+            tank_class=build_tank(tank, wells, oil_model, water_model),
+            **analysis_settings(config['freq'], config['position'],
+                                config.get('smooth'), config.get('k'),
+                                config.get('s'))
         )
+        results = compute_analysis_results(analysis)
+        fit = havlena_regression(results['havlena'])
+        write_pipeline_results(
+            results, pipeline_options(config, analysis.tank_class),
+            os.path.join(output_dir, pipeline_folder(tank['name'])))
+    except Exception as e:
+        return batch_summary_row(tank['name'], len(wells), tank['aquifer'],
+                                 error=str(e))
+    return batch_summary_row(tank['name'], len(wells), tank['aquifer'], fit,
+                             len(results['havlena']))
+
+
+"---------------------------- Sensitivity Sweep ------------------------------"
+# Only the influx of water of the material balance depends on the aquifer, so
+# the sweep takes the material balance of the last analysis and computes the
+# cumulative We of each combination of parameters with the aquifer classes of
+# pytank, as Analysis.mat_bal_df does. The combinations are split in chunks
+# evaluated by a pool of processes.
+SWEEP_MAX_RUNS = int(os.environ.get('PYTANK_SWEEP_MAX_RUNS', 100000))
+# Ranked combinations sent to the browser
+SWEEP_TOP = 200
+
+AQUIFER_CLASSES = {'Fetkovich': pt.Fetkovich, 'Carter Tracy': pt.CarterTracy}
+# Keyword and label of the parameters of each aquifer model
+SWEEP_PARAMETERS = {
+    'Fetkovich': {
+        'aq_radius': 'Aquifer Radius [ft]',
+        'res_radius': 'Reservoir Radius [ft]',
+        'aq_thickness': 'Aquifer Thickness [ft]',
+        'aq_por': 'Aquifer Porosity [dec]',
+        'ct': 'Total Compressibility',
+        'theta': 'Theta [sexagesimal]',
+        'k': 'Permeability [darcy]',
+        'water_visc': 'Water Viscosity [cp]',
+    },
+    'Carter Tracy': {
+        'aq_por': 'Aquifer Porosity [dec]',
+        'ct': 'Total Compressibility',
+        'res_radius': 'Reservoir Radius [ft]',
+        'aq_thickness': 'Aquifer Thickness [ft]',
+        'theta': 'Theta [sexagesimal]',
+        'aq_perm': 'Permeability [darcy]',
+        'water_visc': 'Water Viscosity [cp]',
+    },
+}
+
+sweep_context = {}
+
+
+def init_sweep_worker(mat_bal):
+    sweep_context['pr'] = list(mat_bal['PRESSURE_DATUM'])
+    sweep_context['time_step'] = list(mat_bal['Time_Step'])
+    sweep_context['uw'] = mat_bal['UW'].to_numpy()
+    sweep_context['expansion'] = (mat_bal['Eo'] + mat_bal['Efw']).to_numpy()
+
+
+def aquifer_fit(aquifer):
+    # Havlena and Odeh regression of the material balance with this aquifer
+    aquifer._set_pr_and_time_step(sweep_context['pr'],
+                                  sweep_context['time_step'])
+    we = aquifer.we()['Cumulative We'].to_numpy()
+    return stats.linregress(sweep_context['expansion'],
+                            sweep_context['uw'] - we)
+
+
+def run_sweep_chunk(model, names, combinations):
+    # Runs in a process of the pool, returns slope, intercept and R2 of
+    # every combination
+    fits = np.full((len(combinations), 3), np.nan)
+    for i, values in enumerate(combinations):
+        try:
+            fit = aquifer_fit(AQUIFER_CLASSES[model](**dict(zip(names,
+                                                                values))))
+        except Exception:
+            continue
+        fits[i] = fit.slope, fit.intercept, fit.rvalue ** 2
+    return fits
+
+
+def sweep_values(row):
+    # Steps values from Min to Max, one step keeps Min
+    low = batch_number(row.get('min'))
+    high = batch_number(row.get('max'))
+    steps = batch_number(row.get('steps')) or 1
+    if low is None or (steps > 1 and high is None) or steps < 1:
+        return None
+    return np.linspace(low, high, int(steps)) if steps > 1 else np.array([low])
+
+
+def sweep_ranking(model, names, combinations, fits):
+    labels = SWEEP_PARAMETERS[model]
+    ranking = pd.DataFrame(combinations,
+                           columns=[labels[name] for name in names])
+    ranking['N [MMStb]'] = fits[:, 0] / 1000000
+    ranking['Intercept'] = fits[:, 1]
+    ranking['R2'] = fits[:, 2]
+    return ranking.sort_values('R2', ascending=False, na_position='last',
+                               kind='stable', ignore_index=True)
+
+
+def sweep_effects(ranking, swept):
+    # Mean R2 of each value of a parameter over the other combinations, the
+    # parameters whose values change the fit the most come first
+    effects = {label: ranking.groupby(label)['R2'].mean() for label in swept}
+    return sorted(effects.items(),
+                  key=lambda item: item[1].max() - item[1].min(),
+                  reverse=True)
+
+
+def sweep_tornado_figure(effects, tank_name):
+    fig = figure_skeleton(f'Sensitivity of the Fit - {tank_name}',
+                          'Mean R2 of Havlena and Odeh', 'Parameter',
+                          f"Aquifer Parameters of {tank_name}")
+    # The largest effect on top
+    effects = effects[::-1]
+    low = np.array([means.min() for _, means in effects])
+    high = np.array([means.max() for _, means in effects])
+    fig.add_trace(go.Bar(
+        y=[label for label, _ in effects],
+        x=high - low,
+        base=low,
+        orientation='h',
+        marker=dict(color='#007BFF'),
+        name='R2 range'
+    ))
+    return fig
+
+
+def sweep_heatmap_figure(ranking, x_label, y_label, tank_name):
+    # Best R2 of each pair of values over the other parameters
+    grid = ranking.pivot_table(index=y_label, columns=x_label, values='R2',
+                               aggfunc='max')
+    fig = figure_skeleton(f'Best R2 - {tank_name}', x_label, y_label,
+                          f"{y_label} vs {x_label}")
+    fig.add_trace(go.Heatmap(
+        x=grid.columns.to_numpy(),
+        y=grid.index.to_numpy(),
+        z=grid.to_numpy(),
+        colorscale='Viridis',
+        colorbar=dict(title='R2')
+    ))
+    return fig
+
+
+"--------------------------- Callback Sensitivity ----------------------------"
 
-        "----------------- Cumulative vs Pressure -----------------------"
-        df_press_avg = global_analysis.mat_bal_df()
-        df_press_avg['START_DATETIME'] = pd.to_datetime(
-            df_press_avg['START_DATETIME'])
-        df_press_avg = df_press_avg.sort_values(by='PRESSURE_DATUM')
 
-        colors = ["black", "blue"]
-        columns = ['OIL_CUM_TANK', 'WATER_CUM_TANK']
+@app.callback(
+    Output('sweep-table', 'data'),
+    Input('sweep-aquifer-model', 'value'),
+    State('session-id', 'data')
+)
+def update_sweep_table(model, session_id):
+    if model not in SWEEP_PARAMETERS:
+        return []
+    # The aquifer of the tank gives the starting values
+    tank = get_session_data(session_id, 'tank')
+    aquifer = getattr(tank, 'aquifer', None)
+    if not isinstance(aquifer, AQUIFER_CLASSES[model]):
+        aquifer = None
+    return [{'name': name, 'label': label,
+             'min': getattr(aquifer, name, None),
+             'max': getattr(aquifer, name, None),
+             'steps': 1}
+            for name, label in SWEEP_PARAMETERS[model].items()]
 
-        fig_avg_pressure = go.Figure()
 
-        for i, col in enumerate(columns):
-            fig_avg_pressure.add_trace(go.Scatter(
-                x=df_press_avg['PRESSURE_DATUM'],
-                y=df_press_avg[col],
-                mode='markers',
-                marker=dict(color=colors[i]),
-                name=col
-            ))
+@app.callback(
+    Output('sweep-info-content', 'children'),
+    Input('sweep-submit-button', 'n_clicks'),
+    State('sweep-aquifer-model', 'value'),
+    State('sweep-table', 'data'),
+    State('session-id', 'data'),
+    background=True,
+    **job_controls('sweep')
+)
+def display_sweep_data(set_progress, n_clicks, model, rows, session_id):
+    if n_clicks > 0:
+        values = [sweep_values(row) for row in rows or []]
+        if model not in SWEEP_PARAMETERS or not values or any(
+                value is None for value in values):
+            return html.Div("Please ensure all fields are filled out "
+                            "correctly.",
+                            style={'color': 'red'})
 
-        fig_avg_pressure.update_layout(
-            title=f"Average Pressure vs Cumulative Production",
-            xaxis=dict(
-                title='Average Pressure',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            yaxis=dict(
-                title='Cumulative Production',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"AVG Pressure vs Cumulative Production of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
-        )
+        results = get_session_data(session_id, 'analysis_results')
+        if results is None:
+            return html.Div("Please submit the Analysis module first.",
+                            style={'color': 'red'})
 
-        "---------------- Cumulative vs Time (Tank) --------------------"
-        df_press_avg = global_analysis.mat_bal_df()
-        df_press_avg['START_DATETIME'] = pd.to_datetime(
-            df_press_avg['START_DATETIME'])
-        df_press_avg = df_press_avg.sort_values(by='START_DATETIME')
+        runs = int(np.prod([len(value) for value in values]))
+        if runs > SWEEP_MAX_RUNS:
+            return html.Div(f"The sweep has {runs} combinations, the limit "
+                            f"is {SWEEP_MAX_RUNS}. Please reduce the steps.",
+                            style={'color': 'red'})
 
-        fig_cum_time = go.Figure()
+        names = [row['name'] for row in rows]
+        combinations = np.array(list(itertools.product(*values)))
+        workers = min(BATCH_WORKERS, runs)
+        chunks = np.array_split(combinations,
+                                min(runs, workers * POOL_CHUNKS_PER_WORKER))
+
+        # The pressures and time steps in the order pytank computed them
+        mat_bal = results['mat_bal'].sort_index()
+        fits = [None] * len(chunks)
+        set_progress(('0', str(len(chunks))))
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_sweep_worker,
+                                 initargs=(mat_bal,)) as executor:
+            futures = {executor.submit(run_sweep_chunk, model, names, chunk): i
+                       for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                fits[futures[future]] = future.result()
+                set_progress((str(done), str(len(chunks))))
+
+        ranking = sweep_ranking(model, names, combinations,
+                                np.concatenate(fits))
+        set_session_data(session_id, 'sweep_results', ranking)
+
+        tank_name = results['tank_name'].replace('_', ' ').upper()
+        swept = [SWEEP_PARAMETERS[model][name]
+                 for name, value in zip(names, values) if len(value) > 1]
+        graphs = []
+        if swept:
+            effects = sweep_effects(ranking, swept)
+            graphs.append(dcc.Graph(figure=typed_figure(
+                sweep_tornado_figure(effects, tank_name))))
+            if len(effects) > 1:
+                graphs.append(dcc.Graph(figure=typed_figure(
+                    sweep_heatmap_figure(ranking, effects[0][0],
+                                         effects[1][0], tank_name))))
+        return html.Div([
+            html.H4(f"{runs} combinations ranked by R2"),
+            results_table('sweep-ranking-table', ranking.head(SWEEP_TOP),
+                          page_size=20),
+            *graphs
+        ])
 
-        colors = ["black", "blue"]
-        columns = ["OIL_CUM_TANK", "WATER_CUM_TANK"]
+    return html.Div(['Submit the ranges to see the sensitivity of the fit.'])
+
+
+"------------------------------- Monte Carlo ---------------------------------"
+# The pressures, the withdrawal and the PVT properties of the material balance
+# of the last analysis do not depend on the sampled parameters. Each chunk of
+# realizations computes Eo and Efw as ho_terms_equation of pytank does, the
+# cumulative We of the aquifer of each realization, and the Havlena and Odeh
+# regression of all of them at once.
+MONTE_CARLO_MAX_RUNS = int(os.environ.get('PYTANK_MONTE_CARLO_MAX_RUNS',
+                                          100000))
+MONTE_CARLO_BINS = 50
+MONTE_CARLO_TANK_PARAMETERS = {
+    'pi': 'Initial Pressure [PSI]',
+    'swo': 'Initial Water Saturation',
+    'cw': 'Water Compressibility',
+    'cf': 'Formation Compressibility',
+}
+
+monte_carlo_context = {}
+
+
+def aquifer_model(aquifer):
+    # Name of the model of an aquifer of pytank, None without aquifer
+    for model, aquifer_class in AQUIFER_CLASSES.items():
+        if isinstance(aquifer, aquifer_class):
+            return model
+    return None
+
+
+def init_monte_carlo_worker(mat_bal, oil_model, aquifer):
+    monte_carlo_context['oil_model'] = oil_model
+    monte_carlo_context['aquifer'] = aquifer
+    monte_carlo_context['pr'] = list(mat_bal['PRESSURE_DATUM'])
+    monte_carlo_context['time_step'] = list(mat_bal['Time_Step'])
+    for column in ['PRESSURE_DATUM', 'Bo', 'Bg', 'GOR', 'UW']:
+        monte_carlo_context[column] = mat_bal[column].to_numpy(dtype=float)
+
+
+def realization_we(names, values):
+    aquifer = fitted_aquifer(monte_carlo_context['aquifer'], names, values)
+    aquifer._set_pr_and_time_step(monte_carlo_context['pr'],
+                                  monte_carlo_context['time_step'])
+    return aquifer.we()['Cumulative We'].to_numpy()
+
+
+def run_monte_carlo_chunk(names, samples):
+    # Runs in a process of the pool. The columns of the samples are the
+    # parameters of the tank and then the parameters of the aquifer in names,
+    # returns slope and intercept of every realization.
+    context = monte_carlo_context
+    pi, swo, cw, cf = (samples[:, [i]] for i in range(len(TANK_COLUMNS)))
+    oil_model = context['oil_model']
+    boi = np.asarray(oil_model.get_bo_at_press(pi[:, 0]),
+                     dtype=float).reshape(-1, 1)
+    rsi = np.asarray(oil_model.get_rs_at_press(pi[:, 0]),
+                     dtype=float).reshape(-1, 1)
+    eo = context['Bo'] + (context['GOR'] - rsi) * context['Bg'] - boi
+    efw = (boi * (cw * swo + cf) / (1 - swo)
+           * (pi - context['PRESSURE_DATUM']))
+
+    we = np.zeros_like(eo)
+    if context['aquifer'] is not None:
+        # Realizations with the same aquifer share its influx
+        influx = {}
+        for i, values in enumerate(samples[:, len(TANK_COLUMNS):]):
+            key = tuple(values)
+            if key not in influx:
+                try:
+                    influx[key] = realization_we(names, values)
+                except Exception:
+                    influx[key] = np.nan
+            we[i] = influx[key]
+
+    return np.column_stack(linregress_rows(eo + efw, context['UW'] - we))
+
+
+def monte_carlo_samples(row, size, rng):
+    # None when the values that the distribution needs are missing or wrong
+    low, mode, high, std = (batch_number(row.get(key))
+                            for key in ['min', 'mode', 'max', 'std'])
+    distribution = row.get('distribution')
+    if distribution == 'Fixed' and mode is not None:
+        return np.full(size, mode)
+    if (distribution == 'Uniform' and low is not None and high is not None
+            and low <= high):
+        return rng.uniform(low, high, size)
+    if (distribution == 'Triangular'
+            and None not in (low, mode, high) and low <= mode <= high
+            and low < high):
+        return rng.triangular(low, mode, high, size)
+    if distribution == 'Normal' and mode is not None and std and std > 0:
+        # Truncated to Min and Max when they are given
+        a = -np.inf if low is None else (low - mode) / std
+        b = np.inf if high is None else (high - mode) / std
+        if a < b:
+            return truncnorm.rvs(a, b, loc=mode, scale=std, size=size,
+                                 random_state=rng)
+    return None
+
+
+def monte_carlo_summary(poes):
+    # P90 is exceeded by 90% of the realizations
+    p90, p50, p10 = np.percentile(poes, [10, 50, 90])
+    return pd.DataFrame({
+        'Statistic': ['P90', 'P50', 'P10', 'Mean', 'Std. Dev.'],
+        'N [MMStb]': [p90, p50, p10, poes.mean(), poes.std()],
+    })
+
+
+def monte_carlo_histogram_figure(poes, summary, tank_name):
+    # The counts of the bins are sent instead of every realization
+    counts, edges = np.histogram(poes, bins=MONTE_CARLO_BINS)
+    fig = figure_skeleton(f'OOIP Distribution - {tank_name}', 'N [MMStb]',
+                          'Realizations', f"Monte Carlo of {tank_name}")
+    fig.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        marker=dict(color='#007BFF'),
+        name='Realizations'
+    ))
+    for statistic, color in [('P90', 'red'), ('P50', 'green'),
+                             ('P10', 'orange')]:
+        value = summary.set_index('Statistic').loc[statistic, 'N [MMStb]']
+        fig.add_vline(x=value, line=dict(color=color, dash='dash'),
+                      annotation_text=f"{statistic}: {value:.2f}",
+                      annotation_position='top')
+    return fig
+
+
+"--------------------------- Callback Monte Carlo ----------------------------"
 
-        for i, col in enumerate(columns):
-            fig_cum_time.add_trace(go.Scatter(
-                x=df_press_avg['START_DATETIME'],
-                y=df_press_avg[col],
-                mode='lines',
-                line=dict(color=colors[i]),
-                name=col
-            ))
 
-        fig_cum_time.update_layout(
-            title=f"Cumulative Production per Date - {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-            xaxis=dict(
-                title='Date',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True,
-                type='date'
-            ),
-            yaxis=dict(
-                title='Cumulative Production',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f" Cumulative vs Time (Tank) of  {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
-        )
+@app.callback(
+    Output('mc-table', 'data'),
+    Input('tank-info-content', 'children'),
+    State('session-id', 'data')
+)
+def update_monte_carlo_table(tank_info, session_id):
+    # The values of the last submitted tank are the most likely ones
+    tank = get_session_data(session_id, 'tank')
+    if tank is None:
+        return []
+    model = aquifer_model(tank.aquifer)
+    rows = [{'name': name, 'label': label, 'distribution': 'Fixed',
+             'mode': getattr(tank, name)}
+            for name, label in MONTE_CARLO_TANK_PARAMETERS.items()]
+    rows += [{'name': name, 'label': label, 'distribution': 'Fixed',
+              'mode': getattr(tank.aquifer, name)}
+             for name, label in SWEEP_PARAMETERS.get(model, {}).items()]
+    return rows
 
-        "--------------- Flow rate vs Time (by Well) -------------------"
-        # Production Data
-        df_prod = global_analysis.tank_class.get_production_df()
-        df_prod['START_DATETIME'] = pd.to_datetime(df_prod['START_DATETIME'])
-        df_prod = df_prod.sort_values(by='START_DATETIME')
 
-        df_prod['OIL_RATE'] = df_prod.groupby('WELL_BORE')[
-            'OIL_CUM'].diff().fillna(
-            0)
-        df_prod['WATER_RATE'] = df_prod.groupby('WELL_BORE')[
-            'WATER_CUM'].diff().fillna(0)
+@app.callback(
+    Output('mc-info-content', 'children'),
+    Input('mc-submit-button', 'n_clicks'),
+    State('mc-runs', 'value'),
+    State('mc-seed', 'value'),
+    State('mc-table', 'data'),
+    State('session-id', 'data'),
+    background=True,
+    **job_controls('mc')
+)
+def display_monte_carlo_data(set_progress, n_clicks, runs, seed, rows,
+                             session_id):
+    if n_clicks > 0:
+        runs = batch_number(runs)
+        seed = batch_number(seed)
+        if not rows or runs is None or runs < 1:
+            return html.Div("Please ensure all fields are filled out "
+                            "correctly.",
+                            style={'color': 'red'})
+        runs = int(runs)
+        if runs > MONTE_CARLO_MAX_RUNS:
+            return html.Div(f"The limit of realizations is "
+                            f"{MONTE_CARLO_MAX_RUNS}.",
+                            style={'color': 'red'})
 
-        fig_fr_well = go.Figure()
-        wells = df_prod['WELL_BORE'].unique()
-        colors = px.colors.qualitative.T10
+        results = get_session_data(session_id, 'analysis_results')
+        tank = get_session_data(session_id, 'tank')
+        if results is None or tank is None:
+            return html.Div("Please submit the Analysis module first.",
+                            style={'color': 'red'})
 
-        for i, well in enumerate(wells):
-            well_data = df_prod[df_prod['WELL_BORE'] == well]
-            dates = well_data['START_DATETIME']
+        rng = np.random.default_rng(None if seed is None else int(seed))
+        samples = {}
+        for row in rows:
+            samples[row['name']] = monte_carlo_samples(row, runs, rng)
+            if samples[row['name']] is None:
+                return html.Div(f"Please check the distribution of "
+                                f"{row['label']}.",
+                                style={'color': 'red'})
+        names = [name for name in samples if name not in TANK_COLUMNS]
+        if any(name not in samples for name in TANK_COLUMNS):
+            return html.Div("Please ensure all fields are filled out "
+                            "correctly.",
+                            style={'color': 'red'})
+        samples = np.column_stack([samples[name]
+                                   for name in TANK_COLUMNS + names])
+
+        workers = min(BATCH_WORKERS, runs)
+        chunks = np.array_split(samples,
+                                min(runs, workers * POOL_CHUNKS_PER_WORKER))
+
+        # The pressures and time steps in the order pytank computed them
+        mat_bal = results['mat_bal'].sort_index()
+        fits = [None] * len(chunks)
+        set_progress(('0', str(len(chunks))))
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_monte_carlo_worker,
+                                 initargs=(mat_bal, tank.oil_model,
+                                           tank.aquifer)) as executor:
+            futures = {executor.submit(run_monte_carlo_chunk, names, chunk): i
+                       for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                fits[futures[future]] = future.result()
+                set_progress((str(done), str(len(chunks))))
+
+        fits = np.concatenate(fits)
+        labels = {row['name']: row['label'] for row in rows}
+        realizations = pd.DataFrame(samples, columns=[
+            labels[name] for name in TANK_COLUMNS + names])
+        realizations['N [MMStb]'] = fits[:, 0] / 1000000
+        realizations['Intercept'] = fits[:, 1]
+        set_session_data(session_id, 'monte_carlo_results', realizations)
+
+        poes = realizations['N [MMStb]'].to_numpy()
+        poes = poes[np.isfinite(poes)]
+        if not len(poes):
+            return html.Div("No realization could be solved, please check "
+                            "the distributions.",
+                            style={'color': 'red'})
+        tank_name = results['tank_name'].replace('_', ' ').upper()
+        summary = monte_carlo_summary(poes)
+        return html.Div([
+            html.H4(f"{len(poes)} of {runs} realizations solved"),
+            results_table('mc-summary-table', summary),
+            dcc.Graph(figure=typed_figure(
+                monte_carlo_histogram_figure(poes, summary, tank_name)))
+        ])
 
-            fig_fr_well.add_trace(go.Scatter(
-                x=dates,
-                y=well_data['OIL_RATE'],
-                mode='lines',
-                line=dict(color=colors[i % len(colors)]),
-                name=f"Oil Rate - {well}"
-            ))
+    return html.Div(['Submit the distributions to see the uncertainty of '
+                     'the original oil in place.'])
 
-            fig_fr_well.add_trace(go.Scatter(
-                x=dates,
-                y=well_data['WATER_RATE'],
-                mode='lines',
-                line=dict(color=colors[i % len(colors)], dash='dash'),
-                name=f"Water Rate - {well}"
-            ))
 
-        fig_fr_well.update_layout(
-            title=f"Flow Rate vs Time by Well - {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-            xaxis=dict(
-                title='Date',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True,
-                type='date'
-            ),
-            yaxis=dict(
-                title='Flow Rate [Stb/year]',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"Flow rate vs Time (by Well) of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
-        )
+"----------------------------- Project Snapshot ------------------------------"
+# A project is a zip with the resolved state of a session: the Feather tables
+# of the wells and of their interpolations, the PVT table, the definition of
+# the tank and the frames of the last analysis, compressed with zstd, and a
+# JSON with the values of the forms and the keys of the files. Opening it
+# saves the tables back to the well cache and rebuilds the session from
+# them, without pt.create_wells or the material balance.
+PROJECT_VERSION = 1
+PROJECT_FIELDS = [
+    # Well module
+    'freq-prod', 'freq-press',
+    # Fluid Models module
+    'temp-oil', 'salinity-water', 'temp-water', 'units',
+    # Tank module
+    'tank-name', 'initial-pressure', 'initial-water-saturation',
+    'water-compressibility', 'formation-compressibility', 'aquifer-model',
+    'fetkovich-aq-radius', 'fetkovich-res-radius', 'fetkovich-aq-thickness',
+    'fetkovich-aq-por', 'fetkovich-ct', 'fetkovich-theta', 'fetkovich-k',
+    'fetkovich-water-visc', 'carter-tracy-aq-por', 'carter-tracy-ct',
+    'carter-tracy-res-radius', 'carter-tracy-aq-thickness',
+    'carter-tracy-theta', 'carter-tracy-aq-perm', 'carter-tracy-water-visc',
+    # Analysis module
+    'freq-analysis', 'position', 'smooth', 'k', 's', 'campbell-custom',
+    'x1-c', 'y1-c', 'x2-c', 'y2-c', 'havlena-custom', 'x1-h', 'y1-h', 'x2-h',
+    'y2-h', 'regression-method', 'regression-intervals', 'resamples',
+    'confidence', 'analytic-method', 'inferred-POES', 'graphic', 'top-wells',
+]
+PROJECT_WELL_TABLES = ('prod_data', 'press_data', 'interp')
+PROJECT_RESULT_FRAMES = ('mat_bal', 'campbell', 'havlena', 'pressure',
+                         'production')
+PROJECT_RESULT_VALUES = ('key', 'tank_name', 'name_aquifer', 'smooth')
+# Values that every project has, and those of its fluid models
+PROJECT_VALUES = ('version', 'fields', 'well_inputs', 'keys', 'wells')
+PROJECT_KEYS = ('prod', 'press', 'fluid', 'wells')
+PROJECT_FLUID_VALUES = ('temp_oil', 'salinity', 'temp_water', 'unit')
+PROJECT_RESTORE_ERROR = 'The project data could not be restored.'
+
+
+def tank_definition(tank):
+    # Inverse of build_tank
+    definition = {'name': tank.name,
+                  'wells': [well.name for well in tank.wells],
+                  'pi': tank.pi, 'swo': tank.swo, 'cw': tank.cw,
+                  'cf': tank.cf, 'aquifer': 'None'}
+    if isinstance(tank.aquifer, Fetkovich):
+        definition['aquifer'] = 'Fetkovich'
+    elif isinstance(tank.aquifer, CarterTracy):
+        definition['aquifer'] = 'Carter Tracy'
+    for column in AQUIFER_COLUMNS[definition['aquifer']]:
+        if definition['aquifer'] == 'Carter Tracy' and column == 'k':
+            definition[column] = tank.aquifer.aq_perm
+        else:
+            definition[column] = getattr(tank.aquifer, column)
+    return definition
+
+
+def project_snapshot(session_id, fields, well_inputs, keys):
+    # Returns the zip of the session and its error
+    wells_key = get_session_data(session_id, 'wells_key')
+    wells_info = get_session_data(session_id, 'wells_info')
+    if wells_key is None or wells_info is None:
+        return None, 'Please submit the Well module first.'
+    frames = {}
+    for attribute in PROJECT_WELL_TABLES:
+        table = read_well_table(wells_key, attribute)
+        if table is not None:
+            frames[attribute] = table
+    if not frames:
+        return None, 'The wells expired. Please submit the Well module again.'
+    project = {
+        'version': PROJECT_VERSION,
+        'fields': fields,
+        'well_inputs': well_inputs,
+        'keys': dict(keys, wells=wells_key),
+        'wells': [well.name for well in wells_info],
+    }
+
+    oil_model = get_session_data(session_id, 'oil_model')
+    water_model = get_session_data(session_id, 'water_model')
+    if oil_model is not None and water_model is not None:
+        frames['pvt'] = oil_model.data_pvt
+        project['fluid'] = {'temp_oil': oil_model.temperature,
+                            'salinity': water_model.salinity,
+                            'temp_water': water_model.temperature,
+                            'unit': water_model.unit}
+
+    # The tank is only kept if it was built with these wells
+    tank = get_session_data(session_id, 'tank')
+    if tank is not None and 'fluid' in project and get_session_data(
+            session_id, 'tank_wells_key') == wells_key:
+        project['tank'] = tank_definition(tank)
+        project['tank_key'] = get_session_data(session_id, 'tank_key')
+        analysis = get_session_data(session_id, 'analysis')
+        results = get_session_data(session_id, 'analysis_results')
+        if analysis is not None and results is not None:
+            project['analysis'] = {'freq': analysis.freq,
+                                   'position': analysis.position,
+                                   'smooth': analysis.smooth,
+                                   'k': analysis.k, 's': analysis.s}
+            project['results'] = {name: results[name]
+                                  for name in PROJECT_RESULT_VALUES}
+            for name in PROJECT_RESULT_FRAMES:
+                frames[name] = results[name]
+
+    buffer = io.BytesIO()
+    # The tables are already compressed
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('project.json', json.dumps(project))
+        for name, frame in frames.items():
+            sink = io.BytesIO()
+            feather.write_feather(frame, sink, compression='zstd')
+            archive.writestr(f'{name}.feather', sink.getvalue())
+    return buffer.getvalue(), None
+
+
+def project_complete(project, tables):
+    # Every part of the project has its values and tables
+    if not all(key in project for key in PROJECT_VALUES) or not (
+            isinstance(project['keys'], dict)
+            and isinstance(project['fields'], dict)
+            and isinstance(project['wells'], list)):
+        return False
+    if not all(key in project['keys'] for key in PROJECT_KEYS) or not (
+            'prod_data' in tables or 'press_data' in tables):
+        return False
+    if 'fluid' in project and not (
+            'pvt' in tables
+            and all(key in project['fluid'] for key in PROJECT_FLUID_VALUES)):
+        return False
+    if 'tank' in project and not ('fluid' in project
+                                  and 'tank_key' in project):
+        return False
+    if 'analysis' in project and not (
+            'tank' in project and 'results' in project
+            and all(name in tables for name in PROJECT_RESULT_FRAMES)
+            and all(name in project['results']
+                    for name in PROJECT_RESULT_VALUES)):
+        return False
+    return True
+
+
+def read_project(contents):
+    # Returns the JSON, the tables and the error of an uploaded project
+    try:
+        archive = zipfile.ZipFile(
+            io.BytesIO(base64.b64decode(contents.split(',', 1)[1])))
+        project = json.loads(archive.read('project.json'))
+        tables = {name[:-len('.feather')]: feather.read_table(
+                      io.BytesIO(archive.read(name)))
+                  for name in archive.namelist() if name.endswith('.feather')}
+    except (zipfile.BadZipFile, KeyError, ValueError, IndexError,
+            pa.ArrowInvalid):
+        return None, None, 'The file is not a project of Pytank View.'
+    if not isinstance(project, dict):
+        return None, None, 'The file is not a project of Pytank View.'
+    if project.get('version') != PROJECT_VERSION:
+        return None, None, ('The project was saved by another version of '
+                            'Pytank View.')
+    if not project_complete(project, tables):
+        return None, None, 'The project file is incomplete.'
+    return project, tables, None
+
+
+def project_wells(tables):
+    # Wells of the tables of a project, validated like the wells built from
+    # uploaded files
+    vectors = {attribute: table_vectors(tables[attribute], vector_class,
+                                        validate=True)
+               if attribute in tables else {}
+               for attribute, vector_class in (('prod_data', pt.ProdVector),
+                                               ('press_data', pt.PressVector))}
+    return sorted_wells(
+        pt.Well(name=name, prod_data=vectors['prod_data'].get(name),
+                press_data=vectors['press_data'].get(name))
+        for name in set(vectors['prod_data']).union(vectors['press_data']))
+
+
+def project_interpolations(table, wells):
+    # The saved interpolations, with the columns that load_interpolations
+    # reads and only the wells of the project
+    table = table.select([WELL_COL, DATE_COL, *INTERP_COLUMNS])
+    types = table.schema.types
+    if not (pa.types.is_string(types[0])
+            and pa.types.is_timestamp(types[1])
+            and all(pa.types.is_floating(type_) for type_ in types[2:])
+            and set(table.column(WELL_COL).to_pylist())
+            <= {well.name for well in wells}):
+        raise ValueError('The interpolations of the project are not valid.')
+    return table
+
+
+def delete_project_data(wells_key, fluid_key):
+    for attribute in PROJECT_WELL_TABLES:
+        well_cache.delete(f'{wells_key}:{attribute}')
+    if fluid_key is not None:
+        upload_cache.delete(fluid_key)
+
+
+def restore_project(session_id, project, tables, project_key):
+    # Returns the keys of the files and the error of the restore. The keys
+    # saved in the project are the keys of the uploads of other sessions, so
+    # the data of the file is validated and saved under keys of the project.
+    keys = {'prod': f'{project_key}:prod', 'press': f'{project_key}:press',
+            'fluid': f'{project_key}:fluid' if 'fluid' in project else None}
+    fields = project['fields']
+    # The key that the Well module computes for the restored keys
+    wells_key = well_cache_key(keys['prod'], keys['press'],
+                               well_freq(fields.get('freq-prod')),
+                               well_freq(fields.get('freq-press')))
+    session = {}
+    try:
+        wells = project_wells(tables)
+        interp = (project_interpolations(tables['interp'], wells)
+                  if 'interp' in tables else None)
+        session['wells_key'] = wells_key
+        session['wells_info'] = pt.search_wells(wells=wells,
+                                                well_names=project['wells'])
+        if 'fluid' in project:
+            fluid = project['fluid']
+            pvt = tables['pvt'].to_pandas()
+            session['oil_model'] = InterpolatedOilModel(
+                data_pvt=pvt, temperature=fluid['temp_oil'])
+            session['water_model'] = pt.WaterModel(
+                salinity=fluid['salinity'], temperature=fluid['temp_water'],
+                unit=fluid['unit'])
+        if 'tank' in project:
+            definition = project['tank']
+            session['tank'] = build_tank(
+                definition,
+                pt.search_wells(wells=wells, well_names=definition['wells']),
+                session['oil_model'], session['water_model'])
+            session['tank_key'] = project['tank_key']
+            session['tank_wells_key'] = wells_key
+    except (KeyError, TypeError, ValueError, SchemaError):
+        return None, PROJECT_RESTORE_ERROR
+
+    save_wells(wells_key, wells)
+    if interp is not None:
+        save_well_table(wells_key, 'interp', interp)
+    if keys['fluid'] is not None:
+        # The PVT table is the parsed file, so the Fluid Models module can
+        # use it
+        upload_cache.set(keys['fluid'], pvt, expire=CACHE_TTL)
+    try:
+        if 'analysis' in project:
+            # The results keep their key, so the Analysis module reuses them
+            session['analysis'] = tank_analysis(
+                tank_class=session['tank'], wells_key=wells_key,
+                **project['analysis'])
+            results = dict(project['results'])
+            for name in PROJECT_RESULT_FRAMES:
+                results[name] = tables[name].to_pandas()
+            session['analysis_results'] = results
+    except (KeyError, TypeError, ValueError, SchemaError):
+        delete_project_data(wells_key, keys['fluid'])
+        return None, PROJECT_RESTORE_ERROR
+    # The wells can be evicted at once from a full cache
+    if load_wells(wells_key) is None:
+        delete_project_data(wells_key, keys['fluid'])
+        return None, PROJECT_RESTORE_ERROR
+
+    for name, value in session.items():
+        set_session_data(session_id, name, value)
+    return keys, None
 
-        "------------------- Cumulative per Well --------------------"
-        df_prod = global_analysis.tank_class.get_production_df()
-        df_prod['START_DATETIME'] = pd.to_datetime(df_prod['START_DATETIME'])
-        df_prod = df_prod.sort_values(by='START_DATETIME')
 
-        df_prod_well = df_prod.groupby('WELL_BORE')[
-            ['OIL_CUM', 'WATER_CUM']].sum().reset_index()
+@app.callback(
+    [Output('project-download', 'data'),
+     Output('project-status', 'children', allow_duplicate=True)],
+    Input('save-project-button', 'n_clicks'),
+    [State(field, 'value') for field in PROJECT_FIELDS]
+    + [State('dynamic-well-inputs', 'children'),
+       State('prod-data-key', 'data'),
+       State('press-data-key', 'data'),
+       State('fluid-data-key', 'data'),
+       State('session-id', 'data')],
+    prevent_initial_call=True
+)
+def save_project(n_clicks, *values):
+    *fields, well_inputs, prod_key, press_key, fluid_key, session_id = values
+    data, error = project_snapshot(
+        session_id,
+        dict(zip(PROJECT_FIELDS, fields)),
+        [well_input['props'].get('value') for well_input in well_inputs],
+        {'prod': prod_key, 'press': press_key, 'fluid': fluid_key}
+    )
+    if error is not None:
+        return dash.no_update, error
+    return (dcc.send_bytes(data, 'pytank_project.zip'),
+            'The project was saved.')
 
-        fig_cum_well = go.Figure()
 
-        bar_width = 0.35
-        r1 = list(range(len(df_prod_well)))
-        r2 = [x + bar_width for x in r1]
+@app.callback(
+    [Output('project-status', 'children', allow_duplicate=True),
+     Output('dynamic-well-inputs', 'children', allow_duplicate=True),
+     Output('prod-data-key', 'data', allow_duplicate=True),
+     Output('press-data-key', 'data', allow_duplicate=True),
+     Output('fluid-data-key', 'data', allow_duplicate=True)]
+    + [Output(field, 'value') for field in PROJECT_FIELDS],
+    Input('open-project', 'contents'),
+    [State('open-project', 'filename'),
+     State('session-id', 'data')],
+    prevent_initial_call=True
+)
+def open_project(contents, filename, session_id):
+    project, tables, error = read_project(contents)
+    if error is None:
+        keys, error = restore_project(session_id, project, tables,
+                                      f'project:{content_hash(contents)}')
+    if error is not None:
+        return [error] + [dash.no_update] * (4 + len(PROJECT_FIELDS))
+
+    well_inputs = [well_name_input(index, value) for index, value in
+                   enumerate(project['well_inputs'] or [None])]
+    return ([f'{filename} opened. Submit the modules to see their results.',
+             well_inputs, keys['prod'], keys['press'], keys['fluid']]
+            + [project['fields'].get(field) for field in PROJECT_FIELDS])
+
+
+"------------------------------------ API ------------------------------------"
+# JSON and Arrow endpoints of the material balance frames for machine
+# clients, on the Flask server of Dash. A client uploads its CSV files to
+# /api/files and posts the configuration of a tank to /api/<frame>, like a
+# tank of cli.py with the keys of the files instead of their paths. The
+# results are cached by the hash of the configuration in a store shared by
+# the gunicorn workers, and a lock per configuration makes concurrent requests
+# of the same tank wait for a single analysis. The analysis runs in the
+# request, so it must finish within the gunicorn worker timeout.
+API_CACHE_SIZE_LIMIT = int(os.environ.get('PYTANK_API_CACHE_SIZE_LIMIT',
+                                          2 ** 30))
+API_FRAMES = ('mat_bal', 'campbell', 'havlena', 'analytic')
+API_FORMATS = ('json', 'arrow')
+API_CONFIG_KEYS = ['prod_key', 'press_key', 'pvt_key', 'temp_oil',
+                   'salinity_water', 'temp_water', 'freq', 'position']
+API_OPTIONAL_KEYS = ['freq_prod', 'freq_press', 'units', 'smooth', 'k', 's']
+# Seconds a lock is kept if the worker holding it dies
+API_LOCK_EXPIRE = 600
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+api_cache = diskcache.Cache(
+    os.path.join(CACHE_DIR, 'api'),
+    size_limit=API_CACHE_SIZE_LIMIT,
+    eviction_policy='least-recently-used'
+)
 
-        fig_cum_well.add_trace(go.Bar(
-            x=df_prod_well['WELL_BORE'],
-            y=df_prod_well['OIL_CUM'],
-            name='Oil Cumulative',
-            marker=dict(color='black'),
-            width=bar_width
-        ))
 
-        fig_cum_well.add_trace(go.Bar(
-            x=df_prod_well['WELL_BORE'],
-            y=df_prod_well['WATER_CUM'],
-            name='Water Cumulative',
-            marker=dict(color='blue'),
-            width=bar_width
-        ))
+def api_error(message, status=400):
+    return jsonify(error=message), status
 
-        fig_cum_well.update_layout(
-            title=f"Cumulative Production per Well - {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-            xaxis=dict(
-                title='Well',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            yaxis=dict(
-                title='Cumulative Production [Stb]',
-                titlefont=dict(size=18, family='Arial, sans-serif'),
-                tickfont=dict(size=14, family='Arial, sans-serif'),
-                showgrid=True,
-                gridcolor='#D1D1D1',
-                gridwidth=1,
-                griddash='dash',
-                linecolor='black',
-                mirror=True
-            ),
-            barmode='group',
-            template='plotly_white',
-            annotations=[
-                go.layout.Annotation(
-                    text=f"Cumulative Production per Well of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                    xref="paper",
-                    yref="paper",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.15,
-                    yanchor="top",
-                    showarrow=False,
-                    font=dict(size=22)
-                )
-            ]
-        )
 
-        '----------------------- OPTIONS ------------------------------------'
-        if analytic_method == 'Yes':
-            # Analytic Method
-            data_analytic = global_analysis.analytic_method(inferred_POES,
-                                                            option='data')
-
-            fig_analytic = go.Figure()
-
-            # Observed Pressure
-            fig_analytic.add_trace(go.Scatter(
-                x=data_analytic["START_DATETIME"],
-                y=data_analytic["PRESSURE_DATUM"],
-                mode='markers',
-                marker=dict(color='blue', size=10),
-                name='Observed Pressure'
-            ))
+def api_config(body):
+    # Configuration of a request and its error
+    if not isinstance(body, dict):
+        return None, 'The body must be a JSON object.'
+    missing = [key for key in API_CONFIG_KEYS if body.get(key) is None]
+    if missing:
+        return None, f"Missing values: {', '.join(missing)}."
+    # The name only labels the tank in the frames
+    tank, error = parse_batch_row({'name': 'Tank', **body}, [])
+    if error is not None:
+        return None, error
+    if not tank['wells']:
+        return None, 'The tank has no wells.'
+    config = {key: body.get(key) for key in API_CONFIG_KEYS +
+              API_OPTIONAL_KEYS}
+    config['smooth'], error = smooth_setting(config.get('smooth'))
+    if error is not None:
+        return None, error
+    config['tank'] = tank
+    return config, None
 
-            # Calculated Pressure
-            fig_analytic.add_trace(go.Scatter(
-                x=data_analytic["START_DATETIME"],
-                y=data_analytic['PRESS_CALC'],
-                mode='lines',
-                line=dict(color='green'),
-                name='Calculated Pressure'
-            ))
-            fig_analytic.update_layout(
-                title=f"Analytic Method of {global_analysis.tank_class.name.replace('_', ' ').upper()}",
-                xaxis=dict(
-                    title='Time (Years)',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True,
-                    type='date'
-                ),
-                yaxis=dict(
-                    title='Pressure (PSI)',
-                    titlefont=dict(size=18, family='Arial, sans-serif'),
-                    tickfont=dict(size=14, family='Arial, sans-serif'),
-                    showgrid=True,
-                    gridcolor='#D1D1D1',
-                    gridwidth=1,
-                    griddash='dash',
-                    linecolor='black',
-                    mirror=True,
-                    range=[0, 4000]
-                ),
-                template='plotly_white',
-                annotations=[
-                    go.layout.Annotation(
-                        text=f"Pressure vs Time with {name_aquifer}",
-                        xref="paper",
-                        yref="paper",
-                        x=0.5,
-                        xanchor="center",
-                        y=1.15,
-                        yanchor="top",
-                        showarrow=False,
-                        font=dict(size=22)
-                    )
-                ]
-            )
-            if graphic == 'None':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Observed Pressure vs Time':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_p_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Pressure':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_avg_pressure),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (by Well)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production per well':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_analytic),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
 
-        elif analytic_method == 'No' and global_analysis.tank_class.aquifer is None:
-            if graphic == 'None':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Observed Pressure vs Time':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_p_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Pressure':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_avg_pressure),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (by Well)':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production per well':
-                return html.Div([
-                    dcc.Graph(figure=fig_campbell),
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
+def api_config_hash(config):
+    return hashlib.sha1(
+        json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
 
-        elif (analytic_method == 'No'
-              and (isinstance(global_analysis.tank_class.aquifer, Fetkovich)
-                   or isinstance(global_analysis.tank_class.aquifer,
-                                 CarterTracy))):
-            if graphic == 'None':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Observed Pressure vs Time':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_p_vs_t),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Pressure':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_avg_pressure),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production vs Time (Tank)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_time),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Flow Rate vs Time (by Well)':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_fr_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
-            elif graphic == 'Cumulative Production per well':
-                return html.Div([
-                    dcc.Graph(figure=fig_havlena),
-                    dcc.Graph(figure=fig_avg_vs_t),
-                    dcc.Graph(figure=fig_cum_well),
-                ], style={
-                    'display': 'flex',
-                    'flexDirection': 'column',
-                    'overflowY': 'auto',
-                    'maxHeight': 'calc(100vh - 400px)'
-                })
 
-    return html.Div(['Submit the form to see the analysis results.'])
+def api_tank(config):
+    # Tank of a configuration, from the wells and fluid models of its files
+    try:
+        wells = get_wells(config['prod_key'], config['press_key'],
+                          config.get('freq_prod'), config.get('freq_press'))
+    except Exception as e:
+        # Files without the columns of the Well module
+        return None, (f'The wells could not be built: '
+                      f'{type(e).__name__}: {e}')
+    fluid_df = get_uploaded_data(config['pvt_key'])
+    if wells is None or fluid_df is None:
+        return None, ('The files expired or were not uploaded. Please upload '
+                      'them again.')
+    wells = pt.search_wells(wells=wells, well_names=config['tank']['wells'])
+    if not wells:
+        return None, 'None of the wells were found.'
+    oil_model, water_model = fluid_models(
+        fluid_df, config['temp_oil'], config['salinity_water'],
+        config['temp_water'], config.get('units') or 'Field')
+    return build_tank(config['tank'], wells, oil_model, water_model), None
+
+
+def api_cached(key, compute_value):
+    # Value of the key, computed once while the other requests wait
+    value = api_cache.get(key)
+    if value is not None:
+        return dill.loads(value), None
+    with diskcache.Lock(api_cache, f'lock:{key}', expire=API_LOCK_EXPIRE):
+        value = api_cache.get(key)
+        if value is not None:
+            return dill.loads(value), None
+        value, error = compute_value()
+        if error is None:
+            api_cache.set(key, dill.dumps(value), expire=CACHE_TTL)
+        return value, error
+
+
+def api_results(config):
+    def compute_value():
+        try:
+            tank, error = api_tank(config)
+            if error is not None:
+                return None, error
+            analysis = tank_analysis(
+                tank_class=tank,
+                wells_key=well_cache_key(config['prod_key'],
+                                         config['press_key'],
+                                         config.get('freq_prod'),
+                                         config.get('freq_press')),
+                **analysis_settings(config['freq'], config['position'],
+                                    config.get('smooth'), config.get('k'),
+                                    config.get('s'))
+            )
+            return compute_analysis_results(analysis), None
+        except Exception as e:
+            return None, str(e)
+    return api_cached(api_config_hash(config), compute_value)
+
+
+def api_analytic(config, results, poes):
+    def compute_value():
+        try:
+            tank, error = api_tank(config)
+            if error is not None:
+                return None, error
+            return analytic_data(tank, results['mat_bal'], poes), None
+        except Exception as e:
+            return None, str(e)
+    return api_cached(f'{api_config_hash(config)}:analytic:{poes!r}',
+                      compute_value)
+
+
+def frame_response(df, data_format):
+    if data_format == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = io.BytesIO()
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue(), mimetype=ARROW_MIMETYPE)
+    return Response(df.to_json(orient='records', date_format='iso',
+                               double_precision=15),
+                    mimetype='application/json')
+
+
+@app.server.route('/api/files', methods=['POST'])
+def api_upload_file():
+    # The body is a CSV file, parsed like an upload of the Well module. With
+    # ?append=<key> its rows are appended to the file of that key.
+    body = request.get_data()
+    if not body:
+        return api_error('The body must be a CSV file.')
+    key = hashlib.sha1(body).hexdigest()
+    if not upload_cache.touch(key, expire=CACHE_TTL):
+        try:
+            df = parse_csv(io.BytesIO(body))
+        except Exception as e:
+            return api_error(f'The CSV file could not be parsed: {e}')
+        upload_cache.set(key, df, expire=CACHE_TTL)
+    base_key = request.args.get('append')
+    if base_key:
+        key = append_data(base_key, key)
+        if key is None:
+            return api_error('The file could not be appended. The file of '
+                             'the key expired or has other columns.')
+    return jsonify(key=key)
+
+
+@app.server.route('/api/<frame>', methods=['POST'])
+def api_frame(frame):
+    if frame not in API_FRAMES:
+        return api_error(f'Unknown frame {frame}.', 404)
+    data_format = request.args.get('format', 'json')
+    if data_format not in API_FORMATS:
+        return api_error(f'Unknown format {data_format}.')
+    body = request.get_json(silent=True)
+    config, error = api_config(body)
+    if error is not None:
+        return api_error(error)
+    poes = batch_number(body.get('poes'))
+    if frame == 'analytic':
+        if config['tank']['aquifer'] == 'None':
+            return api_error('The analytic method needs a tank with an '
+                             'aquifer model.')
+        if poes is None:
+            return api_error('The analytic method needs the poes.')
+
+    results, error = api_results(config)
+    if error is not None:
+        return api_error(error)
+    if frame == 'analytic':
+        data, error = api_analytic(config, results, poes)
+        if error is not None:
+            return api_error(error)
+        return frame_response(data, data_format)
+    return frame_response(results[frame], data_format)
 
 
 "----------------------------------- Run -----------------------------------"
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import app
+
+# Keys that every configuration needs, the tanks are defined like the rows of
+# the table of the Batch module
+CONFIG_KEYS = ['prod_file', 'press_file', 'pvt_file', 'temp_oil',
+               'salinity_water', 'temp_water', 'freq', 'position']
+CONFIG_FILES = ['prod_file', 'press_file', 'pvt_file']
+
+
+def load_config(path):
+    with open(path) as file:
+        config = json.load(file)
+    # The CSV paths are relative to the configuration file
+    folder = os.path.dirname(os.path.abspath(path))
+    for key in CONFIG_FILES:
+        if config.get(key):
+            config[key] = os.path.join(folder, config[key])
+    config['smooth'], error = app.smooth_setting(config.get('smooth'))
+    if error is not None:
+        raise ValueError(error)
+    return config
+
+
+def config_tanks(config):
+    # Definition and error of each tank, a configuration without tanks is a
+    # single tank
+    default_wells = app.split_wells(config.get('wells'))
+    for row in config.get('tanks') or [config]:
+        tank, error = app.parse_batch_row(row, default_wells)
+        yield row.get('name') or '', tank, error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Runs the Well, Fluid Models, Tank and Analysis steps of '
+                    'Pytank View for the tanks of JSON configuration files, '
+                    'and writes their tables and figures.')
+    parser.add_argument('configs', nargs='+', help='configuration files')
+    parser.add_argument('-o', '--output', default='results',
+                        help='folder of the results (default: results)')
+    parser.add_argument('-w', '--workers', type=int,
+                        default=app.BATCH_WORKERS,
+                        help='parallel processes (default: '
+                             'PYTANK_BATCH_WORKERS or the number of CPUs)')
+    args = parser.parse_args(argv)
+
+    # Configurations and tanks with errors are reported without running them
+    summary = []
+    jobs = []
+    # Lower case, for the file systems that ignore the case of the names
+    folders = {'summary.csv'}
+    for path in args.configs:
+        try:
+            config = load_config(path)
+        except (OSError, ValueError) as e:
+            summary.append(app.batch_summary_row(path, error=str(e)))
+            continue
+        missing = [key for key in CONFIG_KEYS if config.get(key) is None]
+        if missing:
+            summary.append(app.batch_summary_row(
+                path, error=f"Missing values: {', '.join(missing)}."))
+            continue
+        for name, tank, error in config_tanks(config):
+            folder = app.pipeline_folder(name).lower()
+            if error is None and folder in folders:
+                error = ('Another tank has the same name or the same folder '
+                         'of results.')
+            if error is not None:
+                summary.append(app.batch_summary_row(name, error=error))
+                continue
+            folders.add(folder)
+            jobs.append((config, tank))
+
+    os.makedirs(args.output, exist_ok=True)
+    if jobs:
+        with ProcessPoolExecutor(
+                max_workers=max(1, min(args.workers, len(jobs)))) as executor:
+            futures = {executor.submit(app.run_pipeline_tank, config, tank,
+                                       args.output): tank
+                       for config, tank in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                tank = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    # A worker that died, the other tanks keep running
+                    row = app.batch_summary_row(
+                        tank['name'], aquifer=tank['aquifer'],
+                        error=f'{type(e).__name__}: {e}')
+                summary.append(row)
+                result = row['Error'] or 'N [MMStb]: {:.2f}'.format(
+                    row['N [MMStb]'])
+                print(f"[{done}/{len(jobs)}] {row['Tank']}: {result}")
+
+    pd.DataFrame(summary).to_csv(os.path.join(args.output, 'summary.csv'),
+                                 index=False)
+    return 1 if any(row['Error'] for row in summary) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
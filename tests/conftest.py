@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+
+# The stores of the app are opened when it is imported
+os.environ['PYTANK_CACHE_DIR'] = tempfile.mkdtemp(prefix='pytank_tests_')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+WELL_NAMES = [f'W{well}' for well in range(3)]
+TANK = {'name': 'tank_a', 'aquifer': 'None', 'pi': 3000, 'swo': 0.2,
+        'cw': 3e-6, 'cf': 4e-6, 'wells': WELL_NAMES}
+FETKOVICH = {'aquifer': 'Fetkovich', 'aq_radius': 20000, 'res_radius': 2000,
+             'aq_thickness': 50, 'aq_por': 0.2, 'ct': 7e-6, 'theta': 360,
+             'k': 100, 'water_visc': 0.5}
+
+
+def write_files(folder):
+    # Monthly cumulative production, quarterly pressures and a PVT table
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2000-01-01', '2006-12-01', freq='MS')
+    prod = []
+    for well, name in enumerate(WELL_NAMES):
+        oil = np.cumsum(rng.uniform(800, 1200, len(dates)) * (well + 1))
+        water = np.cumsum(rng.uniform(100, 400, len(dates)))
+        prod.append(pd.DataFrame({
+            'START_DATETIME': dates.strftime('%Y-%m-%d'), 'ITEM_NAME': name,
+            'OIL_CUM': oil, 'WATER_CUM': water, 'GAS_CUM': oil * 5000}))
+    press_dates = pd.date_range('2000-02-01', '2006-11-01', freq='QS')
+    press = [pd.DataFrame({
+        'DATE': press_dates.strftime('%Y-%m-%d'), 'WELLBORE': name,
+        'PRESSURE_DATUM': (3000 - 20 * np.arange(len(press_dates))
+                           + rng.normal(0, 15, len(press_dates)))})
+        for name in WELL_NAMES]
+    pressure = np.linspace(500, 4000, 15)
+    pvt = pd.DataFrame({'Pressure': pressure, 'Bo': 1.1 + pressure / 20000,
+                        'Bg': 20 / pressure, 'GOR': 100 + pressure / 10,
+                        'uo': 1.0})
+
+    files = {'prod': folder / 'prod.csv', 'press': folder / 'press.csv',
+             'pvt': folder / 'pvt.csv'}
+    pd.concat(prod).to_csv(files['prod'], index=False)
+    pd.concat(press).to_csv(files['press'], index=False)
+    pvt.to_csv(files['pvt'], index=False)
+    return {name: str(path) for name, path in files.items()}
+
+
+@pytest.fixture(scope='session')
+def data_files(tmp_path_factory):
+    return write_files(tmp_path_factory.mktemp('data'))
+
+
+@pytest.fixture(scope='session')
+def wells(data_files):
+    return app.pipeline_wells(data_files['prod'], data_files['press'],
+                              None, None)
+
+
+@pytest.fixture(scope='session')
+def fluid(data_files):
+    return app.pipeline_fluid_models(data_files['pvt'], 200, 30000, 200,
+                                     'Field')
+
+
+@pytest.fixture(scope='session')
+def make_tank(wells, fluid):
+    def make(**values):
+        definition = dict(TANK, **values)
+        return app.build_tank(
+            definition,
+            app.pt.search_wells(wells=wells,
+                                well_names=definition['wells']),
+            *fluid)
+    return make
+
+
+@pytest.fixture(scope='session')
+def analyze():
+    def run(tank, freq='12M', position='end'):
+        return app.compute_analysis_results(app.tank_analysis(
+            tank_class=tank, **app.analysis_settings(freq, position, False)))
+    return run
@@ -0,0 +1,45 @@
+import pytest
+
+import app
+from conftest import FETKOVICH, TANK
+
+
+@pytest.fixture(scope='module')
+def keys(data_files):
+    client = app.server.test_client()
+    keys = {}
+    for name, path in data_files.items():
+        with open(path, 'rb') as file:
+            keys[name] = client.post('/api/files',
+                                     data=file.read()).json['key']
+    return keys
+
+
+def post_tank(frame, files, **values):
+    config = {**TANK, **FETKOVICH, 'wells': ','.join(TANK['wells']),
+              'prod_key': files['prod'], 'press_key': files['press'],
+              'pvt_key': files['pvt'], 'temp_oil': 200,
+              'salinity_water': 30000, 'temp_water': 200, 'freq': '12M',
+              'position': 'end', 'poes': 50e6, **values}
+    return app.server.test_client().post(f'/api/{frame}', json=config)
+
+
+@pytest.mark.parametrize('frame', app.API_FRAMES)
+def test_frames(keys, frame):
+    response = post_tank(frame, keys)
+    assert response.status_code == 200, response.json
+    assert response.json
+
+
+@pytest.mark.parametrize('frame, files', [
+    ('mat_bal', {'prod': 'pvt'}),
+    ('havlena', {'press': 'prod'}),
+    ('mat_bal', {'pvt': 'press'}),
+    ('analytic', {'prod': 'press'}),
+])
+def test_files_with_other_columns(keys, frame, files):
+    # The keys of files of another kind are errors of the request
+    response = post_tank(frame, dict(keys, **{
+        name: keys[other] for name, other in files.items()}))
+    assert response.status_code == 400
+    assert response.is_json and response.json['error']
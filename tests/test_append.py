@@ -0,0 +1,75 @@
+import io
+
+import pandas as pd
+import pytest
+
+import app
+from conftest import TANK
+
+
+def vector(dates, values):
+    return pd.DataFrame({'OIL_CUM': values},
+                        index=pd.DatetimeIndex(dates, name='DATE'))
+
+
+def test_merge_vector_data_without_old_data():
+    new = vector(['2001-01-01'], [1.0])
+    assert app.merge_vector_data(None, new) is new
+
+
+def test_merge_vector_data_replaces_duplicates():
+    old = vector(['2001-01-01', '2001-02-01', '2001-03-01', '2001-04-01'],
+                 [1.0, 2.0, 3.0, 4.0])
+    # A revised month and a new one, out of order
+    new = vector(['2001-05-01', '2001-02-01'], [5.0, 20.0])
+    merged = app.merge_vector_data(old, new)
+    assert merged.index.is_monotonic_increasing
+    assert not merged.index.has_duplicates
+    assert merged['OIL_CUM'].tolist() == [1.0, 20.0, 3.0, 4.0, 5.0]
+
+
+def upload(client, df, append=None):
+    response = client.post(
+        '/api/files' + (f'?append={append}' if append else ''),
+        data=df.to_csv(index=False).encode('utf-8'))
+    assert response.status_code == 200, response.json
+    return response.json['key']
+
+
+def mat_bal(client, config, prod_key, press_key):
+    response = client.post('/api/mat_bal',
+                           json=dict(config, prod_key=prod_key,
+                                     press_key=press_key))
+    assert response.status_code == 200, response.json
+    return pd.DataFrame(response.json)
+
+
+@pytest.mark.parametrize('freq_prod', ['MS', None])
+def test_appended_files_give_the_full_analysis(data_files, freq_prod):
+    client = app.server.test_client()
+    prod = pd.read_csv(data_files['prod'])
+    press = pd.read_csv(data_files['press'])
+    with open(data_files['pvt'], 'rb') as file:
+        pvt_key = client.post('/api/files', data=file.read()).json['key']
+    cut = '2004-01-01'
+    # The delta has new periods, a revised month and a well that was missing
+    new_prod = (prod['START_DATETIME'] >= cut) | (prod['ITEM_NAME'] == 'W2')
+    revised = ((prod['START_DATETIME'] == '2002-01-01')
+               & (prod['ITEM_NAME'] == 'W1'))
+    new_press = (press['DATE'] >= cut) | (press['WELLBORE'] == 'W2')
+    prod_key = upload(client, prod[~new_prod])
+    press_key = upload(client, press[~new_press])
+    prod = prod.copy()
+    prod.loc[revised, 'OIL_CUM'] *= 1.01
+    prod_key = upload(client, prod[new_prod | revised], prod_key)
+    press_key = upload(client, press[new_press], press_key)
+
+    config = dict(TANK, wells=','.join(TANK['wells']), pvt_key=pvt_key,
+                  temp_oil=200, salinity_water=30000, temp_water=200,
+                  freq='12M', position='end', freq_prod=freq_prod)
+    appended = mat_bal(client, config, prod_key, press_key)
+    full = mat_bal(client, config, upload(client, prod), upload(client, press))
+    wells_key = app.well_cache_key(prod_key, press_key, freq_prod, None)
+    assert f'{wells_key}:interp' in app.well_cache
+    pd.testing.assert_frame_equal(appended, full, check_exact=False,
+                                  rtol=1e-12)
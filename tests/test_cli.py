@@ -0,0 +1,52 @@
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+import app
+import cli
+from conftest import TANK
+
+
+@pytest.mark.parametrize('name, folder', [
+    ('tank_a', 'tank_a'),
+    ('../other/tank b', 'other_tank_b'),
+    ('C:\\tank:c', 'C_tank_c'),
+    ('..', 'tank'),
+])
+def test_pipeline_folder(name, folder):
+    assert app.pipeline_folder(name) == folder
+
+
+def write_config(folder, file_name, **values):
+    config = {**TANK, 'prod_file': 'prod.csv', 'press_file': 'press.csv',
+              'pvt_file': 'pvt.csv', 'temp_oil': 200,
+              'salinity_water': 30000, 'temp_water': 200, 'freq': '12M',
+              'position': 'end', **values}
+    path = folder / f'{file_name}.json'
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def test_failed_tanks_keep_the_summary(data_files, tmp_path):
+    folder = tmp_path / 'configs'
+    folder.mkdir()
+    for name in ('prod', 'press', 'pvt'):
+        shutil.copy(data_files[name], folder / f'{name}.csv')
+    configs = [
+        write_config(folder, 'good', name='../tank a'),
+        write_config(folder, 'missing', name='tank_b',
+                     prod_file='missing.csv'),
+        write_config(folder, 'columns', name='tank_c', prod_file='pvt.csv'),
+        write_config(folder, 'same', name='Tank A'),
+    ]
+    output = tmp_path / 'results'
+    assert cli.main(configs + ['-o', str(output), '-w', '1']) == 1
+
+    summary = pd.read_csv(output / 'summary.csv').set_index('Tank')
+    assert summary['Error'].isna()['../tank a']
+    assert (output / 'tank_a' / 'mat_bal.csv').exists()
+    assert 'FileNotFoundError' in summary.loc['tank_b', 'Error']
+    assert 'KeyError' in summary.loc['tank_c', 'Error']
+    assert summary.loc['Tank A', 'Error'].startswith('Another tank')
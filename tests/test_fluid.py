@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+def pvt_data(seed=0):
+    # A PVT table out of order with curved properties
+    rng = np.random.default_rng(seed)
+    pressure = rng.permutation(np.linspace(400, 5000, 25))
+    return pd.DataFrame({'Pressure': pressure,
+                         'Bo': 1.05 + 0.2 * np.sqrt(pressure / 5000),
+                         'Bg': 15 / pressure,
+                         'GOR': 50 + 0.08 * pressure,
+                         'uo': 1.0})
+
+
+@pytest.mark.parametrize('method', ['get_bo_at_press', 'get_bg_at_press',
+                                    'get_rs_at_press'])
+def test_interpolated_oil_model_matches_oil_model(method):
+    data = pvt_data()
+    interpolated = app.InterpolatedOilModel(data_pvt=data, temperature=200)
+    model = app.pt.OilModel(data_pvt=data, temperature=200)
+    # Table pressures, pressures between them and out of the table
+    pressure = np.concatenate([data['Pressure'], np.linspace(100, 6000, 301)])
+    np.testing.assert_allclose(getattr(interpolated, method)(pressure),
+                               getattr(model, method)(pressure), rtol=1e-12)
+    assert getattr(interpolated, method)(3210.5) == pytest.approx(
+        float(getattr(model, method)(3210.5)), rel=1e-12)
+
+
+def test_interpolated_oil_model_shares_the_table():
+    first = app.InterpolatedOilModel(data_pvt=pvt_data(), temperature=200)
+    second = app.InterpolatedOilModel(data_pvt=pvt_data(), temperature=150)
+    assert first._table is second._table
+    assert not first._table['Bo'].flags.writeable
+
+
+@pytest.mark.parametrize('pressure, message', [
+    ([1000], 'at least two pressures'),
+    ([1000, 2000, 2000], 'must be different'),
+])
+def test_pvt_table_errors(pressure, message):
+    data = pd.DataFrame({'Pressure': pressure, 'Bo': 1.1, 'Bg': 0.01,
+                         'GOR': 100})
+    with pytest.raises(ValueError, match=message):
+        app.pvt_table(data)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import app
+from conftest import FETKOVICH
+
+
+def fits_of_pytank(make_tank, analyze, realizations, **base):
+    # Slope and intercept of the Havlena and Odeh line of each tank
+    fits = []
+    for values in realizations:
+        fit = app.havlena_regression(
+            analyze(make_tank(**base, **values))['havlena'])
+        fits.append([fit.slope, fit.intercept])
+    return np.array(fits)
+
+
+def test_monte_carlo_chunk_matches_pytank(make_tank, analyze):
+    realizations = [
+        {'pi': 3000, 'swo': 0.2, 'cw': 3e-6, 'cf': 4e-6},
+        {'pi': 3400, 'swo': 0.3, 'cw': 2e-6, 'cf': 7e-6},
+        {'pi': 2900, 'swo': 0.1, 'cw': 5e-6, 'cf': 1e-6},
+    ]
+    results = analyze(make_tank())
+    tank = make_tank()
+    app.init_monte_carlo_worker(results['mat_bal'].sort_index(),
+                                tank.oil_model, tank.aquifer)
+    samples = np.array([[values[name] for name in app.TANK_COLUMNS]
+                        for values in realizations])
+    np.testing.assert_allclose(
+        app.run_monte_carlo_chunk([], samples),
+        fits_of_pytank(make_tank, analyze, realizations), rtol=1e-8)
+
+
+def test_monte_carlo_chunk_matches_pytank_with_aquifer(make_tank, analyze):
+    realizations = [
+        {'pi': 3000, 'swo': 0.2, 'cw': 3e-6, 'cf': 4e-6, 'aq_radius': 20000},
+        {'pi': 3100, 'swo': 0.25, 'cw': 3e-6, 'cf': 5e-6, 'aq_radius': 8000},
+    ]
+    tank = make_tank(**FETKOVICH)
+    results = analyze(tank)
+    app.init_monte_carlo_worker(results['mat_bal'].sort_index(),
+                                tank.oil_model, tank.aquifer)
+    names = ['aq_radius']
+    samples = np.array([[values[name] for name in app.TANK_COLUMNS + names]
+                        for values in realizations])
+    base = {key: value for key, value in FETKOVICH.items()
+            if key != 'aq_radius'}
+    np.testing.assert_allclose(
+        app.run_monte_carlo_chunk(names, samples),
+        fits_of_pytank(make_tank, analyze, realizations, **base), rtol=1e-8)
+
+
+@pytest.mark.parametrize('row, check', [
+    ({'distribution': 'Fixed', 'mode': 5}, lambda x: (x == 5).all()),
+    ({'distribution': 'Uniform', 'min': 1, 'max': 2},
+     lambda x: ((x >= 1) & (x <= 2)).all()),
+    ({'distribution': 'Triangular', 'min': 1, 'mode': 1.5, 'max': 3},
+     lambda x: ((x >= 1) & (x <= 3)).all()),
+    ({'distribution': 'Normal', 'mode': 10, 'std': 5, 'min': 8, 'max': 11},
+     lambda x: ((x >= 8) & (x <= 11)).all()),
+])
+def test_monte_carlo_samples(row, check):
+    values = app.monte_carlo_samples(row, 1000, np.random.default_rng(0))
+    assert len(values) == 1000 and check(values)
+
+
+@pytest.mark.parametrize('row', [
+    {'distribution': 'Uniform', 'min': 2, 'max': 1},
+    {'distribution': 'Triangular', 'min': 1, 'mode': 5, 'max': 3},
+    {'distribution': 'Normal', 'mode': 10, 'std': 0},
+    {'distribution': 'Fixed', 'mode': ''},
+])
+def test_monte_carlo_samples_invalid(row):
+    assert app.monte_carlo_samples(row, 10, np.random.default_rng(0)) is None
+
+
+def test_monte_carlo_summary():
+    summary = app.monte_carlo_summary(np.arange(1, 101, dtype=float))
+    values = summary.set_index('Statistic')['N [MMStb]']
+    # P90 is exceeded by 90% of the realizations
+    assert values['P90'] < values['P50'] < values['P10']
+    assert values['P90'] == pytest.approx(np.percentile(np.arange(1, 101),
+                                                        10))
@@ -0,0 +1,192 @@
+import base64
+import io
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from pyarrow import feather
+
+import app
+from conftest import TANK
+
+FIELDS = {'temp-oil': 200, 'freq-analysis': '12M'}
+
+
+def zip_contents(data):
+    return 'data:application/zip;base64,' + base64.b64encode(data).decode()
+
+
+@pytest.fixture(scope='module')
+def project(data_files):
+    # A session with every module submitted and the zip of its project
+    keys = {}
+    for name in ('prod', 'press', 'pvt'):
+        with open(data_files[name], 'rb') as file:
+            keys[name] = app.parse_data(
+                'data:text/csv;base64,' + base64.b64encode(
+                    file.read()).decode(), f'{name}.csv')[0]
+    wells_key = app.well_cache_key(keys['prod'], keys['press'], None, None)
+    wells = app.get_wells(keys['prod'], keys['press'], None, None)
+    oil_model, water_model = app.fluid_models(
+        app.get_uploaded_data(keys['pvt']), 200, 30000, 200, 'Field')
+    tank = app.build_tank(dict(TANK, aquifer='None'),
+                          app.pt.search_wells(wells=wells,
+                                              well_names=TANK['wells']),
+                          oil_model, water_model)
+    analysis = app.tank_analysis(tank_class=tank, wells_key=wells_key,
+                                 **app.analysis_settings('12M', 'end', 'No'))
+
+    session_id = 'project-source'
+    for name, value in [('wells_key', wells_key), ('wells_info', wells),
+                        ('oil_model', oil_model),
+                        ('water_model', water_model), ('tank', tank),
+                        ('tank_key', 'tank-key'),
+                        ('tank_wells_key', wells_key),
+                        ('analysis', analysis)]:
+        app.set_session_data(session_id, name, value)
+    results = app.get_analysis_results(session_id, analysis, 'config-key')
+    data, error = app.project_snapshot(
+        session_id, FIELDS, ['W0', 'W1'],
+        {'prod': keys['prod'], 'press': keys['press'], 'fluid': keys['pvt']})
+    assert error is None
+    return {'data': data, 'keys': keys, 'wells_key': wells_key,
+            'results': results, 'oil_model': oil_model}
+
+
+def test_project_round_trip(project):
+    # A new server without the files or the wells in its caches
+    app.well_cache.clear()
+    app.upload_cache.clear()
+    contents = zip_contents(project['data'])
+    outputs = app.open_project(contents, 'field.zip', 'project-restored')
+    assert outputs[0].startswith('field.zip opened.')
+    # The data is saved under keys of the project, not the keys of uploads
+    project_key = f'project:{app.content_hash(contents)}'
+    prod_key, press_key, fluid_key = outputs[2:5]
+    assert (prod_key, press_key, fluid_key) == (
+        f'{project_key}:prod', f'{project_key}:press', f'{project_key}:fluid')
+    assert f"{project['wells_key']}:prod_data" not in app.well_cache
+    assert dict(zip(app.PROJECT_FIELDS, outputs[5:])) == {
+        field: FIELDS.get(field) for field in app.PROJECT_FIELDS}
+
+    def restored(name):
+        return app.get_session_data('project-restored', name)
+
+    wells_key = app.well_cache_key(prod_key, press_key, None, None)
+    assert restored('wells_key') == wells_key
+    assert [well.name for well in restored('wells_info')] == TANK['wells']
+    # The Well module finds the wells of the restored keys
+    wells = app.get_wells(prod_key, press_key, None, None)
+    assert [well.name for well in wells] == TANK['wells']
+    pressure = np.linspace(1000, 3500, 7)
+    np.testing.assert_array_equal(
+        restored('oil_model').get_bo_at_press(pressure),
+        project['oil_model'].get_bo_at_press(pressure))
+    assert app.get_uploaded_data(fluid_key) is not None
+
+    tank = restored('tank')
+    assert app.tank_definition(tank) == app.tank_definition(
+        app.get_session_data('project-source', 'tank'))
+    assert restored('analysis').freq == '12M'
+    results = restored('analysis_results')
+    for name in app.PROJECT_RESULT_VALUES:
+        assert results[name] == project['results'][name]
+    for name in app.PROJECT_RESULT_FRAMES:
+        pd.testing.assert_frame_equal(results[name], project['results'][name])
+
+
+def rewrite(data, project=None, drop=()):
+    # The zip of a project with another manifest or without some tables
+    source = zipfile.ZipFile(io.BytesIO(data))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in source.namelist():
+            if name == 'project.json' and project is not None:
+                archive.writestr(name, json.dumps(project))
+            elif name not in drop:
+                archive.writestr(name, source.read(name))
+    return buffer.getvalue()
+
+
+def manifest(data):
+    return json.loads(zipfile.ZipFile(io.BytesIO(data)).read('project.json'))
+
+
+@pytest.mark.parametrize('change, error', [
+    (lambda data: b'not a zip', 'The file is not a project of Pytank View.'),
+    (lambda data: rewrite(data, drop=['project.json']),
+     'The file is not a project of Pytank View.'),
+    (lambda data: rewrite(data, dict(manifest(data), version=0)),
+     'The project was saved by another version of Pytank View.'),
+    (lambda data: rewrite(data, {k: v for k, v in manifest(data).items()
+                                 if k != 'keys'}),
+     'The project file is incomplete.'),
+    (lambda data: rewrite(data, drop=['havlena.feather']),
+     'The project file is incomplete.'),
+    (lambda data: rewrite(data, drop=['pvt.feather']),
+     'The project file is incomplete.'),
+])
+def test_open_project_errors(project, change, error):
+    outputs = app.open_project(zip_contents(change(project['data'])),
+                               'field.zip', 'project-errors')
+    assert outputs[0] == error
+    assert all(output is app.dash.no_update for output in outputs[1:])
+
+
+def test_open_project_without_the_wells(project, monkeypatch):
+    monkeypatch.setattr(app, 'load_wells', lambda key: None)
+    outputs = app.open_project(zip_contents(project['data']), 'field.zip',
+                               'project-errors')
+    assert outputs[0] == app.PROJECT_RESTORE_ERROR
+
+
+def replace_table(data, name, change):
+    # The zip of a project with a table changed
+    source = zipfile.ZipFile(io.BytesIO(data))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for member in source.namelist():
+            content = source.read(member)
+            if member == f'{name}.feather':
+                table = change(feather.read_table(io.BytesIO(content)))
+                sink = io.BytesIO()
+                feather.write_feather(table, sink)
+                content = sink.getvalue()
+            archive.writestr(member, content)
+    return buffer.getvalue()
+
+
+def project_entries(contents):
+    project_key = f'project:{app.content_hash(contents)}'
+    return [key for cache in (app.well_cache, app.upload_cache)
+            for key in cache.iterkeys() if key.startswith(project_key)]
+
+
+@pytest.mark.parametrize('name, change', [
+    ('prod_data', lambda table: table.drop_columns(['OIL_CUM'])),
+    ('prod_data', lambda table: table.set_column(
+        table.column_names.index('OIL_CUM'), 'OIL_CUM',
+        pa.array(['x'] * len(table)))),
+    ('prod_data', lambda table: table.set_column(
+        table.column_names.index(app.FREQ_COL), app.FREQ_COL,
+        pa.array(['QS'] * len(table)))),
+    ('press_data', lambda table: table.drop_columns([app.WELL_COL])),
+    ('pvt', lambda table: table.drop_columns(['Bo'])),
+])
+def test_open_project_with_tables_that_are_not_valid(project, name, change):
+    contents = zip_contents(replace_table(project['data'], name, change))
+    outputs = app.open_project(contents, 'field.zip', 'project-errors')
+    assert outputs[0] == app.PROJECT_RESTORE_ERROR
+    assert project_entries(contents) == []
+
+
+def test_failed_restore_removes_its_data(project):
+    data = rewrite(project['data'], dict(manifest(project['data']),
+                                         analysis={'unknown': 1}))
+    contents = zip_contents(data)
+    outputs = app.open_project(contents, 'field.zip', 'project-errors')
+    assert outputs[0] == app.PROJECT_RESTORE_ERROR
+    assert project_entries(contents) == []
@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import app
+
+
+def noisy_line(n=40, seed=1):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(0, 10, n))
+    return x, 3 * x + 2 + rng.normal(0, 1, n)
+
+
+def test_interval_options():
+    assert app.regression_interval_options('None', 100, 95) is None
+    assert app.regression_interval_options('Bootstrap', None, 95) is None
+    assert app.regression_interval_options('Bootstrap', 100, 100) is None
+    assert app.regression_interval_options('Jackknife', None, 90) == {
+        'method': 'Jackknife', 'resamples': 0, 'confidence': 90}
+    options = app.regression_interval_options('Bootstrap', 10 ** 9, '95')
+    assert options['resamples'] == app.REGRESSION_MAX_RESAMPLES
+
+
+def test_linregress_rows_matches_scipy():
+    x, y = noisy_line()
+    slope, intercept = app.linregress_points(x, y)
+    fit = stats.linregress(x, y)
+    assert slope == pytest.approx(fit.slope)
+    assert intercept == pytest.approx(fit.intercept)
+
+
+def test_bootstrap_interval_matches_loop(monkeypatch):
+    # Small blocks so the resamples are drawn in several of them
+    monkeypatch.setattr(app, 'REGRESSION_BLOCK_SIZE', 40 * 7)
+    x, y = noisy_line()
+    options = {'method': 'Bootstrap', 'resamples': 500, 'confidence': 90}
+    interval = app.regression_interval(x, y, options)
+
+    rng = np.random.default_rng(0)
+    slopes = []
+    intercepts = []
+    for start in range(0, 500, 7):
+        for index in rng.integers(0, len(x), size=(min(7, 500 - start),
+                                                   len(x))):
+            fit = stats.linregress(x[index], y[index])
+            slopes.append(fit.slope)
+            intercepts.append(fit.intercept)
+    np.testing.assert_allclose(interval['slope'],
+                               np.percentile(slopes, [5, 95]))
+    np.testing.assert_allclose(interval['intercept'],
+                               np.percentile(intercepts, [5, 95]))
+    assert interval['slope'][0] < 3 < interval['slope'][1]
+    assert (interval['lower'] <= interval['upper']).all()
+
+
+def test_jackknife_interval_matches_loop():
+    x, y = noisy_line()
+    n = len(x)
+    options = {'method': 'Jackknife', 'resamples': 0, 'confidence': 95}
+    interval = app.regression_interval(x, y, options)
+
+    slopes = np.array([stats.linregress(np.delete(x, i), np.delete(y, i)).slope
+                       for i in range(n)])
+    error = np.sqrt((n - 1) / n * np.sum((slopes - slopes.mean()) ** 2))
+    error *= stats.t.ppf(0.975, n - 2)
+    slope = stats.linregress(x, y).slope
+    np.testing.assert_allclose(interval['slope'],
+                               (slope - error, slope + error))
+
+
+def test_interval_of_exact_line_is_the_line():
+    x = np.arange(10, dtype=float)
+    for method in app.RESAMPLING_METHODS:
+        interval = app.regression_interval(
+            x, 2 * x + 1, {'method': method, 'resamples': 200,
+                           'confidence': 95})
+        np.testing.assert_allclose(interval['slope'], (2, 2))
+        np.testing.assert_allclose(interval['lower'], 2 * interval['x'] + 1)
+
+
+def test_interval_needs_three_points():
+    options = {'method': 'Jackknife', 'resamples': 0, 'confidence': 95}
+    assert app.regression_interval([1, 2], [1, 2], options) is None
+    assert app.regression_interval([1, 2, 3], [1, 2, 4], None) is None
+
+
+def line_with_outliers():
+    x, y = noisy_line(60, seed=2)
+    y = y.copy()
+    outliers = np.array([5, 17, 33, 48])
+    y[outliers] += np.array([60, -50, 80, 70])
+    return x, y, outliers
+
+
+@pytest.mark.parametrize('method', app.REGRESSION_METHODS[1:])
+def test_robust_fit_ignores_outliers(method):
+    x, y, outliers = line_with_outliers()
+    slope, intercept, marked = app.robust_fit(x, y, method)
+    assert slope == pytest.approx(3, abs=0.15)
+    assert intercept == pytest.approx(2, abs=0.8)
+    assert set(np.flatnonzero(marked)) == set(outliers)
+    # Least squares is pulled away by the same points
+    assert abs(stats.linregress(x, y).slope - 3) > abs(slope - 3)
+
+
+def test_theil_sen_matches_scipy():
+    x, y, _ = line_with_outliers()
+    slope, intercept, _ = app.robust_fit(x, y, 'Theil-Sen')
+    fit = stats.theilslopes(y, x)
+    assert slope == pytest.approx(fit.slope)
+    assert intercept == pytest.approx(np.median(y - fit.slope * x))
+
+
+def test_huber_fit_is_a_fixed_point():
+    # The weights of the final residuals give back the same line
+    x, y, _ = line_with_outliers()
+    slope, intercept = app.huber_fit(x, y)
+    residuals = y - intercept - slope * x
+    weights = np.minimum(1, app.HUBER_C * app.mad_scale(residuals) /
+                         np.abs(residuals))
+    fit = np.polyfit(x, y, 1, w=np.sqrt(weights))
+    np.testing.assert_allclose(fit, [slope, intercept], rtol=1e-6)
+
+
+def test_robust_fit_is_repeatable():
+    x, y, _ = line_with_outliers()
+    for method in ('Theil-Sen', 'RANSAC'):
+        first = app.robust_fit(x, y, method)
+        second = app.robust_fit(x, y, method)
+        assert first[:2] == second[:2]
+
+
+def test_regression_line_least_squares():
+    x, y, _ = line_with_outliers()
+    slope, intercept, outliers = app.regression_line(
+        x, y, {'regression': 'Least Squares'})
+    assert slope == pytest.approx(stats.linregress(x, y).slope)
+    assert not outliers.any()
@@ -0,0 +1,68 @@
+import base64
+import io
+
+import pandas as pd
+import pytest
+
+import app
+
+PROD_CSV = """START_DATETIME,ITEM_NAME,OIL_CUM,WATER_CUM,GAS_CUM
+2000-01-01,W0,100.5,10,500
+2000-02-01,W0,200.25,20,1000
+2000-01-01,W1,50,5.5,250
+2000-02-01,W1,120,11,600
+2000-03-01,W1,190,,950
+"""
+
+
+def data_uri(text):
+    return 'data:text/csv;base64,' + base64.b64encode(
+        text.encode('utf-8')).decode()
+
+
+def test_base64_stream_decodes_across_blocks(monkeypatch):
+    monkeypatch.setattr(app.Base64Stream, 'block_size', 8)
+    stream = io.BufferedReader(app.Base64Stream(data_uri(PROD_CSV)))
+    assert stream.read().decode('utf-8') == PROD_CSV
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 1000])
+def test_parse_contents_matches_read_csv(monkeypatch, chunk_rows):
+    monkeypatch.setattr(app, 'INGEST_CHUNK_ROWS', chunk_rows)
+    monkeypatch.setattr(app.Base64Stream, 'block_size', 12)
+    shares = []
+    df = app.parse_contents(data_uri(PROD_CSV),
+                            lambda share, rows: shares.append(share))
+
+    expected = pd.read_csv(io.StringIO(PROD_CSV),
+                           parse_dates=['START_DATETIME'])
+    assert isinstance(df['ITEM_NAME'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(
+        df.astype({'ITEM_NAME': str}), expected.astype({'ITEM_NAME': str}),
+        check_dtype=False)
+    assert df['START_DATETIME'].dtype == expected['START_DATETIME'].dtype
+    assert shares == sorted(shares) and 0 < shares[-1] <= 1
+
+
+def test_parse_csv_memory_limit(monkeypatch):
+    monkeypatch.setattr(app, 'INGEST_MEMORY_LIMIT', 10)
+    with pytest.raises(MemoryError):
+        app.parse_csv(io.StringIO(PROD_CSV))
+
+
+def test_parse_data_errors(monkeypatch):
+    key, error = app.parse_data(data_uri('OIL_CUM\nnot a number\n'),
+                                'prod.csv')
+    assert key is None and error.startswith('prod.csv could not be read:')
+
+    monkeypatch.setattr(app, 'INGEST_MEMORY_LIMIT', 10)
+    key, error = app.parse_data(data_uri(PROD_CSV), 'big.csv')
+    assert key is None and error.startswith('big.csv is too large.')
+
+
+def test_parse_data_caches_by_content():
+    contents = data_uri(PROD_CSV.replace('100.5', '101.5'))
+    key, error = app.parse_data(contents, 'prod.csv')
+    assert error is None
+    assert app.get_uploaded_data(key)['OIL_CUM'].iloc[0] == 101.5
+    assert app.parse_data(contents, 'other.csv') == (key, None)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+import app
+
+
+def test_min_max_downsample_keeps_short_series():
+    x = np.arange(5)
+    y = np.array([3., 1., 4., 1., 5.])
+    out_x, out_y = app.min_max_downsample(x, y, 10)
+    np.testing.assert_array_equal(out_x, x)
+    np.testing.assert_array_equal(out_y, y)
+
+
+def test_min_max_downsample_keeps_extremes_of_each_bucket():
+    rng = np.random.default_rng(0)
+    n, n_out = 10007, 200
+    x = np.arange(n)
+    y = rng.normal(size=n)
+    out_x, out_y = app.min_max_downsample(x, y, n_out)
+
+    assert len(out_x) <= n_out + 2
+    assert out_x[0] == 0 and out_x[-1] == n - 1
+    assert (np.diff(out_x) > 0).all()
+    np.testing.assert_array_equal(out_y, y[out_x])
+    assert y.min() in out_y and y.max() in out_y
+    # Every bucket keeps its minimum and its maximum
+    size = -(-n // (n_out // 2))
+    for start in range(0, n, size):
+        bucket = y[start:start + size]
+        assert bucket.min() in out_y and bucket.max() in out_y
+
+
+def test_min_max_downsample_missing_values():
+    y = np.arange(1000, dtype=float)
+    y[100:300] = np.nan
+    out_x, out_y = app.min_max_downsample(np.arange(1000), y, 20)
+    # Missing values are only kept for buckets without any value
+    assert np.isnan(out_y).sum() >= 1
+    assert np.nanmax(out_y) == 999 and np.nanmin(out_y) == 0
+
+
+def test_well_figure_window():
+    dates = pd.date_range('1990-01-01', periods=20000, freq='D')
+    df = pd.DataFrame({'PRESSURE_DATUM': np.linspace(4000, 2000, 20000)},
+                      index=dates)
+    fig = app.well_figure(df, 'press_data')
+    assert len(fig.data) == 1
+    assert len(fig.data[0].x) <= app.WELL_PLOT_POINTS + 2
+    assert fig.layout.uirevision == 'press_data'
+
+    fig = app.well_figure(df, 'press_data', ('2000-01-01', '2000-12-31'))
+    x = pd.to_datetime(fig.data[0].x)
+    assert len(x) == 366
+    assert x.min() == pd.Timestamp('2000-01-01')
+    assert x.max() == pd.Timestamp('2000-12-31')